@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import mips_isa as iset
+from mipsAssambler import mipsAssambler
+
+# Instruction classes of the generated programs, derived from the ISA tables
+INST_CLASSES = {
+    'R'   : [inst for inst, fields in iset.instructionTable.items() if fields[0] == iset.OP_CODE_R and inst not in ('JR', 'JALR')],
+    'I'   : [inst for inst, layout in iset.formatTable.items() if iset.INM in layout],
+    'MEM' : [inst for inst, layout in iset.formatTable.items() if iset.MEM in layout],
+    'BR'  : [inst for inst, layout in iset.formatTable.items() if iset.BRANCH in layout],
+    'J'   : [inst for inst, layout in iset.formatTable.items() if iset.TARGET in layout]
+}
+DEFAULT_MIX = {'R': 45, 'I': 25, 'MEM': 20, 'BR': 7, 'J': 3}
+REGRESSION_THRESHOLD = 0.10 # Slower than the baseline by more than 10% is reported as a regression
+
+def generate_program(size: int, mix: dict = DEFAULT_MIX, label_every: int = 16, defines: int = 8, seed: int = 0) -> str:
+    """
+    Generate a valid program of size instructions (plus a final HALT) with the given instruction class mix.
+    A label is placed every label_every instructions and branches and jumps target nearby labels.
+    """
+    rng = random.Random(seed)
+    classes = [cls for cls in mix if mix[cls] > 0]
+    weights = [mix[cls] for cls in classes]
+    registers = list(iset.registerTable)
+    variables = [f"var{i}" for i in range(defines)]
+    labels = (size + label_every - 1) // label_every
+
+    def operand(kind: str, index: int) -> str:
+        if kind in (iset.RD, iset.RS, iset.RT):
+            return rng.choice(registers)
+        if kind == iset.SHAMT:
+            return str(rng.randrange(32))
+        if kind == iset.INM:
+            return rng.choice((str(rng.randrange(-32768, 32768)), hex(rng.randrange(0x10000)), bin(rng.randrange(0x100))))
+        if kind == iset.MEM:
+            offset = rng.choice(variables) if variables and rng.random() < 0.5 else str(rng.randrange(0, 256, 4))
+            return f"{offset}({rng.choice(registers)})"
+        # Branch and jump targets: a label at most two blocks away
+        block = index // label_every
+        return f"L{min(labels - 1, max(0, block + rng.randint(-2, 2)))}"
+
+    lines = [f"# Generated program: {size} instructions, mix {mix}, seed {seed}"]
+    lines += [f"DEFINE INT16 {name} = {rng.randrange(0, 1024, 4)}" for name in variables]
+    for index in range(size):
+        inst = rng.choice(INST_CLASSES[rng.choices(classes, weights)[0]])
+        args = ','.join(operand(kind, index) for kind in iset.formatTable[inst])
+        text = f"{inst} {args}" if args else inst
+        lines.append(f"L{index // label_every}: {text}" if index % label_every == 0 else text)
+    lines.append("HALT")
+    return '\n'.join(lines) + '\n'
+
+def run_stages(source: str) -> dict:
+    """
+    Run every assembler stage once on a fresh assembler and return the time of each one in seconds.
+    """
+    assembler = mipsAssambler()
+    times = {}
+    start = time.perf_counter()
+    assembler.validate_asm_syntax(source, verbose=False)
+    times['validate_asm_syntax'] = time.perf_counter() - start
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        assembler.assamble(source)
+        times['assamble'] = time.perf_counter() - start
+    start = time.perf_counter()
+    assembler.get_compiled_code()
+    times['get_compiled_code'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in mipsAssambler().assemble_stream(source.splitlines()):
+        pass
+    times['assemble_stream'] = time.perf_counter() - start
+    return times
+
+def peak_memory(source: str) -> int:
+    """
+    Peak memory in bytes allocated while validating and assembling the program.
+    """
+    tracemalloc.start()
+    try:
+        assembler = mipsAssambler()
+        assembler.validate_asm_syntax(source, verbose=False)
+        assembler.encode()
+        assembler.get_compiled_code()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark(sizes: list, mix: dict = DEFAULT_MIX, repeat: int = 5, seed: int = 0) -> dict:
+    """
+    Benchmark every program size. Times are the best of repeat runs.
+    Returns {size: {'stages': {stage: {'seconds', 'inst_per_sec'}}, 'peak_bytes': int}}.
+    """
+    results = {}
+    for size in sizes:
+        source = generate_program(size, mix, seed=seed)
+        runs = [run_stages(source) for _ in range(repeat)]
+        stages = {}
+        for stage in runs[0]:
+            best = min(run[stage] for run in runs)
+            stages[stage] = {'seconds': best, 'inst_per_sec': size / best if best > 0 else float('inf')}
+        results[str(size)] = {'stages': stages, 'peak_bytes': peak_memory(source)}
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Compare results against a baseline. Returns (size, stage, ratio) for every stage slower than threshold.
+    Ratio is current time / baseline time.
+    """
+    regressions = []
+    for size, result in results.items():
+        if size not in baseline:
+            continue
+        for stage, measure in result['stages'].items():
+            base = baseline[size]['stages'].get(stage)
+            if base is None or base['seconds'] <= 0:
+                continue
+            ratio = measure['seconds'] / base['seconds']
+            if ratio > 1 + threshold:
+                regressions.append((size, stage, ratio))
+    return regressions
+
+def print_report(results: dict, baseline: dict = None):
+    """
+    Print time, instructions per second and peak memory of every stage, with the change against the baseline.
+    """
+    print(f"{'Size':>8} {'Stage':<20} {'Time (ms)':>10} {'Inst/s':>12} {'vs base':>8}")
+    print("-" * 62)
+    for size, result in results.items():
+        for stage, measure in result['stages'].items():
+            change = ''
+            if baseline and size in baseline and stage in baseline[size]['stages']:
+                change = f"{measure['seconds'] / baseline[size]['stages'][stage]['seconds']:.2f}x"
+            print(f"{size:>8} {stage:<20} {measure['seconds'] * 1000:>10.2f} {measure['inst_per_sec']:>12.0f} {change:>8}")
+        print(f"{size:>8} {'peak memory (KiB)':<20} {result['peak_bytes'] / 1024:>10.1f}")
+
+def parse_mix(text: str) -> dict:
+    """
+    Parse an instruction mix such as 'R=45,I=25,MEM=20,BR=7,J=3'.
+    """
+    mix = {}
+    for item in text.split(','):
+        cls, _, weight = item.partition('=')
+        if cls not in INST_CLASSES:
+            raise argparse.ArgumentTypeError("Invalid class, classes supported: " + ", ".join(INST_CLASSES))
+        mix[cls] = float(weight)
+    return mix
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the MIPS32 assembler on generated programs.")
+    parser.add_argument('-s', '--sizes', type=int, nargs='+', default=[1000, 10000, 50000], help="program sizes in instructions")
+    parser.add_argument('-m', '--mix', type=parse_mix, default=DEFAULT_MIX, help="instruction mix, e.g. R=45,I=25,MEM=20,BR=7,J=3")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="runs per size, the best one is reported")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the program generator")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--save', help="write the results as JSON to this path")
+    parser.add_argument('--emit', help="only write a generated program of the first size to this path")
+    args = parser.parse_args(argv)
+
+    if args.emit:
+        with open(args.emit, 'w') as file:
+            file.write(generate_program(args.sizes[0], args.mix, seed=args.seed))
+        return 0
+
+    results = benchmark(args.sizes, args.mix, args.repeat, args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+    print_report(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if baseline:
+        regressions = compare(results, baseline)
+        for size, stage, ratio in regressions:
+            print(f"REGRESSION: {stage} with {size} instructions is {ratio:.2f}x slower than the baseline")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
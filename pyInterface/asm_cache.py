@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import tempfile
+from array import array
+import mips_isa as iset
+from mipsAssambler import mipsAssambler, listing_lines
+
+# Default location and size of the assembly cache
+CACHE_DIR = os.environ.get('MIPS32_ASM_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'mips32_asm'))
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_EXT = '.json'
+
+class AssemblyCache():
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        """
+        Content-addressed cache of assembled programs stored in cache_dir.
+        Entries are evicted least recently used first once the directory grows past max_bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source: str) -> str:
+        """
+        Return the cache key of a program: hash of the ISA tables version and the source text.
+        """
+        digest = hashlib.sha256(iset.ISA_VERSION.encode())
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def assemble(self, source: str) -> (array, str):
+        """
+        Return the machine code image and listing of a program, assembling it only on a cache miss.
+        Assembler exceptions are propagated and failed programs are never cached. A cache that can't be
+        written (read-only or full directory) is skipped: the program is still returned.
+        """
+        cached = self.get(source)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        assembler = mipsAssambler()
+        words = assembler.assemble_to_words(source)
+        listing = '\n'.join(listing_lines(assembler.listing_rows()))
+        try:
+            self.put(source, words, listing)
+        except OSError:
+            pass
+        return words, listing
+
+    def get(self, source: str):
+        """
+        Return (image, listing) for a cached program or None. A hit refreshes the entry for the LRU.
+        """
+        path = self._path(self.key(source))
+        try:
+            with open(path, 'r') as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if entry.get('isa') != iset.ISA_VERSION:
+            return None
+        return array('I', entry['words']), entry['listing']
+
+    def put(self, source: str, words, listing: str):
+        """
+        Store a program atomically and evict the least recently used entries if the cache is full.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {'isa': iset.ISA_VERSION, 'words': list(words), 'listing': listing}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(entry, file)
+            os.replace(tmp_path, self._path(self.key(source)))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Remove entries, oldest access first, until the cache fits in max_bytes.
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_EXT):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """
+        Remove every entry of the cache.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_EXT):
+                os.remove(entry.path)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_EXT)
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import time
+import serial
+from interface import InterfaceBase, StepRun, Command, ExecMode, Result, Utils, ResponseTimeoutException
+from frame_reader import Frame, FrameBatch
+from serial_com import Uart
+
+READ_CHUNK_BYTES = 65536
+TCP_PREFIX = 'tcp://'
+
+class FdTransport():
+    def __init__(self, fd: int, owner=None):
+        """
+        Asyncio transport over a file descriptor (serial port or pty) driven by the event loop's
+        add_reader/add_writer, without a thread. owner (e.g. the serial.Serial that opened fd) is closed
+        with the transport; otherwise fd is. Must be created inside a running event loop (POSIX only).
+        """
+        self.fd = fd
+        self.owner = owner
+        self.loop = asyncio.get_running_loop()
+        self.reader = asyncio.StreamReader()
+        os.set_blocking(fd, False)
+        self.loop.add_reader(fd, self._readable)
+
+    def _readable(self):
+        try:
+            data = os.read(self.fd, READ_CHUNK_BYTES)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.loop.remove_reader(self.fd)
+            self.reader.set_exception(e)
+            return
+        if not data:
+            self.loop.remove_reader(self.fd)
+            self.reader.feed_eof()
+            return
+        self.reader.feed_data(data)
+
+    async def write(self, data):
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self.fd, view):]
+            except BlockingIOError:
+                pass
+            if view:
+                await self._writable()
+
+    async def _writable(self):
+        ready = self.loop.create_future()
+        self.loop.add_writer(self.fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            self.loop.remove_writer(self.fd)
+
+    def close(self):
+        self.loop.remove_reader(self.fd)
+        if self.owner is not None:
+            self.owner.close()
+        else:
+            os.close(self.fd)
+
+class StreamTransport():
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Asyncio transport over a stream pair, e.g. a TCP connection to an emulated board.
+        """
+        self.reader = reader
+        self.writer = writer
+
+    async def write(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def close(self):
+        self.writer.close()
+
+async def open_transport(port: str, baudrate: int = Uart.baudrate):
+    """
+    Open a transport to a board: 'tcp://host:port' connects to a TCP stand-in, anything else is a serial
+    port or pty opened with pyserial (8N1 at baudrate) and served through its file descriptor.
+    """
+    if port.startswith(TCP_PREFIX):
+        host, _, tcp_port = port[len(TCP_PREFIX):].rpartition(':')
+        return StreamTransport(*await asyncio.open_connection(host, int(tcp_port)))
+    ser = serial.Serial(port=port, baudrate=baudrate, parity=serial.PARITY_NONE, stopbits=serial.STOPBITS_ONE,
+                        bytesize=serial.EIGHTBITS, timeout=0)
+    return FdTransport(ser.fileno(), ser)
+
+class AsyncInterface(InterfaceBase):
+    def __init__(self, transport, timeout: float = Utils.RESPONSE_TIMEOUT.value):
+        """
+        Asyncio counterpart of Interface: load_program, run_program, run_next_step, run_until and next_info
+        are coroutines and frames() is an async iterator, so one event loop can drive many boards.
+        The protocol bookkeeping and the results (registers, memory, pc, latency and the get_* accessors)
+        come from InterfaceBase, as in Interface; only the I/O is done here.
+        """
+        super().__init__(timeout)
+        self.transport = transport
+
+    def start_reader(self):
+        pass # The event loop already reads in the background
+
+    def close(self):
+        self.transport.close()
+
+    async def load_program(self, program):
+        """
+        Load a program to the board (see Interface.load_program).
+        Raises LoadProgramException if there's an error during the process.
+        """
+        payload = self._load_payload(program)
+        cmd_start = await self._send_cmd(Command.LOAD.value)
+        start = time.perf_counter()
+        await self.transport.write(payload)
+        sent = time.perf_counter()
+        response = await self.next_info()
+        loaded = time.perf_counter()
+        self._load_done(cmd_start, start, sent, loaded, len(payload))
+        self._check_loaded(response)
+
+    async def _send_cmd(self, cmd: int, count: int = 1) -> float:
+        await self.transport.write(self._command_bytes(cmd, count))
+        return time.monotonic()
+
+    async def _read_batch(self) -> FrameBatch:
+        """
+        Await at least one whole frame and decode everything received with self.parser (frames left over
+        come first).
+        Raises ResponseTimeoutException if nothing arrives in self.timeout seconds.
+        """
+        if self._pending is not None:
+            return self._take_pending()
+        while True:
+            batch = self._decode_rx()
+            if batch is not None:
+                return batch
+            try:
+                data = await asyncio.wait_for(self.transport.reader.read(READ_CHUNK_BYTES), self.timeout)
+            except asyncio.TimeoutError:
+                raise ResponseTimeoutException(f"No response from the board in {self.timeout} s")
+            if not data:
+                raise ConnectionError("Board connection closed")
+            self._rx += data
+
+    async def _read_result(self) -> bool:
+        self._start_result()
+        while True:
+            ended = self._process_batch(await self._read_batch())
+            if ended is not None:
+                return ended
+
+    async def _timed_result(self, cmd: Command) -> bool:
+        start = await self._send_cmd(cmd.value)
+        return self._command_done(cmd, start, await self._read_result())
+
+    async def run_program(self, mode: ExecMode) -> bool:
+        """
+        Start the execution of the program in the specified mode (RUN or STEP), see Interface.run_program.
+        """
+        return await self._timed_result(self._start_run(mode))
+
+    async def run_next_step(self) -> bool:
+        self._start_step()
+        return await self._timed_result(Command.NEXT_STEP)
+
+    async def run_until(self, condition, max_steps: int = None, window: int = Utils.STEPS_IN_FLIGHT.value) -> dict:
+        """
+        Step until condition holds, the program ends or max_steps steps are run (see Interface.run_until).
+        cancel() stops it at the next dump.
+        """
+        run = StepRun(self, condition, max_steps, window)
+        self.cancelled.clear()
+        try:
+            while not run.stopped:
+                count = run.commands()
+                if count:
+                    await self._send_cmd(Command.NEXT_STEP.value, count)
+                run.step_done(await self._read_result())
+            while run.draining():
+                run.drained(await self._read_result())
+        finally:
+            run.close()
+        return run.result()
+
+    async def read_frame(self) -> Frame:
+        """
+        Await the next response frame.
+        """
+        batch = await self._read_batch()
+        self._keep_pending(batch, 1)
+        return Frame(batch.type[0], batch.cycle[0], batch.addr[0], batch.data[0])
+
+    async def next_info(self):
+        """
+        Await the next INFO or ERROR response and return it as (response type, cycle, address, data).
+        Responses before it are dropped.
+        """
+        while True:
+            frame = await self.read_frame()
+            if frame.type in (Result.INFO.value, Result.ERROR.value):
+                return tuple(frame)
+
+    async def frames(self):
+        """
+        Async iterator of the response frames as they stream in.
+        """
+        while True:
+            yield await self.read_frame()
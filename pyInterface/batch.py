@@ -0,0 +1,108 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from mipsAssambler import mipsAssambler
+from image_formats import FORMATS, build_image
+
+ASM_EXT = '.asm'
+DEFAULT_FORMATS = ('mem',)
+
+def find_sources(targets: list, ext: str = ASM_EXT) -> list:
+    """
+    Expand directories (recursively), glob patterns and plain file paths into a sorted list of sources.
+    """
+    sources = set()
+    for target in targets:
+        if os.path.isdir(target):
+            sources.update(glob.glob(os.path.join(target, '**', '*' + ext), recursive=True))
+        elif os.path.isfile(target):
+            sources.add(target)
+        else:
+            sources.update(path for path in glob.glob(target, recursive=True) if os.path.isfile(path))
+    return sorted(sources)
+
+def output_path(source: str, fmt: str) -> str:
+    """
+    Return the path of the output written next to a source file for one of the image formats.
+    """
+    return os.path.splitext(source)[0] + FORMATS[fmt][1]
+
+def assemble_file(source: str, formats: tuple = DEFAULT_FORMATS) -> tuple:
+    """
+    Assemble one file with the streaming assembler and write its image next to it in every format.
+    Runs in a worker process. Returns (source, words, seconds, error); error is None on success.
+    """
+    start = time.perf_counter()
+    words = array('I')
+    try:
+        with open(source, 'r') as src:
+            words.extend(mipsAssambler().assemble_stream(src))
+        for fmt in formats:
+            out_path = output_path(source, fmt)
+            with open(out_path + '.tmp', 'wb') as out:
+                out.write(build_image(words, fmt))
+            os.replace(out_path + '.tmp', out_path)
+        error = None
+    except Exception as e:
+        for fmt in formats:
+            if os.path.exists(output_path(source, fmt) + '.tmp'):
+                os.remove(output_path(source, fmt) + '.tmp')
+        error = f"{type(e).__name__}: {e}"
+    return source, len(words), time.perf_counter() - start, error
+
+def assemble_batch(sources: list, workers: int = None, formats: tuple = DEFAULT_FORMATS) -> list:
+    """
+    Assemble every source in a process pool. Returns the results of assemble_file in source order.
+    """
+    if not sources:
+        return []
+    task = partial(assemble_file, formats=tuple(formats))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [task(source) for source in sources]
+    chunksize = max(1, len(sources) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(task, sources, chunksize=chunksize))
+
+def print_summary(results: list, elapsed: float):
+    """
+    Print per-file timing and errors, followed by the totals of the batch.
+    """
+    width = max([len(source) for source, _, _, _ in results] + [4])
+    print(f"{'File':<{width}} {'Words':>7} {'Time (ms)':>10}  Status")
+    print("-" * (width + 28))
+    failed = 0
+    total_words = 0
+    for source, words, seconds, error in results:
+        status = "OK" if error is None else error
+        failed += error is not None
+        total_words += words
+        print(f"{source:<{width}} {words:>7} {seconds * 1000:>10.2f}  {status}")
+    print("-" * (width + 28))
+    print(f"{len(results)} files, {failed} failed, {total_words} words in {elapsed:.2f} s")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Assemble every MIPS32 program found in directories or glob patterns.")
+    parser.add_argument('targets', nargs='+', help="directories, glob patterns or .asm files")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--ext', default=ASM_EXT, help="source extension searched in directories (default: .asm)")
+    parser.add_argument('-f', '--format', action='append', choices=list(FORMATS), dest='formats',
+                        help="output image format, may be repeated (default: mem)")
+    args = parser.parse_args(argv)
+
+    sources = find_sources(args.targets, args.ext)
+    if not sources:
+        print("No source files found.")
+        return 1
+    start = time.perf_counter()
+    results = assemble_batch(sources, args.jobs, args.formats or DEFAULT_FORMATS)
+    print_summary(results, time.perf_counter() - start)
+    return 1 if any(error is not None for _, _, _, error in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
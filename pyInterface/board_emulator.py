@@ -0,0 +1,341 @@
+import argparse
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+import tty
+from interface import Command, Response, Result, BoardError
+from serial_com import PORT_ENV
+from pipeline_sim import PipelineSimulator, INSTRUCTION_MEMORY_WORDS, DATA_MEMORY_WORDS, CLK_COUNTER_MASK, HALT_WORD
+from isa_interpreter import Interpreter
+
+CMD_SIZE_BYTES = 4       # command byte + 3 fill bytes
+WORD_SIZE_BYTES = 4      # instruction words are received little endian
+BITS_PER_BYTE = 10       # start + 8 data + stop bits
+RUN_CHUNK_CYCLES = 100000 # EXEC runs in chunks of cycles so a program that never halts can be stopped
+POLL_SECONDS = 0.1       # stop() is noticed within this time while waiting for the host
+FRAME = struct.Struct('<IBBB') # data, addr, cycle, type: the 56 bit response sent LSB first
+
+class EmulatorStopped(Exception):
+    pass
+
+def pack_frame(res_type: int, cycle: int, addr: int, data: int) -> bytes:
+    """
+    Response frame as the debug unit sends it: 7 bytes, data first, type last.
+    """
+    return FRAME.pack(data & 0xffffffff, addr & 0xff, cycle & 0xff, res_type & 0xff)
+
+def code_frame(res_type: int, code: int) -> bytes:
+    """
+    INFO or ERROR frame: the debug unit sends them with cycle and address 0 (CODE_NO_CICLE_MASK and
+    CODE_NO_ADDRESS_MASK of interface.v), only the dumps carry the cycle counter.
+    """
+    return pack_frame(res_type, 0, 0, code)
+
+class FunctionalCpu():
+    def __init__(self, instruction_memory_words: int = INSTRUCTION_MEMORY_WORDS, data_base: int = None):
+        """
+        Adapter that lets the functional interpreter stand in for the pipeline model on the emulated board.
+        One instruction runs per cycle, so the cycle counter counts instructions. Loads and stores go to the
+        data memory at data_base (right after the instruction memory by default), apart from the program as
+        on the board; the data memory reported is its DATA_MEMORY_WORDS words. Data is byte addressed as in
+        the ISA: word n is at address 4 * n, where the board's data memory takes the low bits of the address
+        as the word (see pipeline_sim), and byte and half word stores keep the rest of the word.
+        """
+        self.instruction_memory_words = instruction_memory_words
+        self.data_base = instruction_memory_words * WORD_SIZE_BYTES if data_base is None else data_base
+        self.interpreter = Interpreter(data_base=self.data_base)
+        self.program = []
+        self.clk_counter = 1
+
+    def load_program(self, words) -> bool:
+        """
+        Store words until HALT is stored or the instruction memory is full (see PipelineSimulator.load_program).
+        """
+        self.program = []
+        loaded = False
+        for word in words:
+            self.program.append(word)
+            if word == HALT_WORD:
+                loaded = True
+                break
+            if len(self.program) == self.instruction_memory_words:
+                break
+        self.flush()
+        return loaded
+
+    def is_empty(self) -> bool:
+        return not self.program
+
+    def flush(self):
+        self.interpreter.load_program(self.program)
+        self.clk_counter = 1
+
+    @property
+    def registers(self) -> list:
+        return self.interpreter.registers
+
+    @property
+    def memory(self) -> list:
+        start = self.data_base >> 2
+        return self.interpreter.memory[start:start + DATA_MEMORY_WORDS]
+
+    @property
+    def pc(self) -> int:
+        return self.interpreter.pc
+
+    @property
+    def end_program(self) -> bool:
+        return self.interpreter.halted
+
+    def step(self) -> bool:
+        self.interpreter.step()
+        self.clk_counter = (self.interpreter.instructions + 1) & CLK_COUNTER_MASK
+        return self.end_program
+
+    def run(self, max_cycles: int) -> bool:
+        self.interpreter.run(max_cycles)
+        self.clk_counter = (self.interpreter.instructions + 1) & CLK_COUNTER_MASK
+        return self.end_program
+
+CPUS = {
+    'pipeline'   : PipelineSimulator,
+    'functional' : FunctionalCpu
+}
+
+class BoardEmulator():
+    def __init__(self, cpu=None, baudrate: int = None, max_cycles: int = None, connection=None):
+        """
+        Virtual board on a pseudo terminal: answers the debug unit UART protocol (LOAD, EXEC, EXEC_BY_STEPS,
+        NEXT_STEP) with the same frames as the FPGA, so Uart, Interface, the CLI and the GUI can be pointed at port.
+        cpu is any object with the PipelineSimulator API (load_program, is_empty, flush, step, run, registers,
+        memory, pc, clk_counter, end_program); the pipeline model by default. With baudrate, bytes are paced
+        at the speed of a real link (10 bits per byte); without it they go as fast as the pty allows.
+        max_cycles bounds an EXEC of a program that never halts (the board would run forever).
+        With connection (a connected socket), the protocol is served on it instead of a pty.
+        """
+        self.cpu = cpu if cpu is not None else PipelineSimulator()
+        self.baudrate = baudrate
+        self.max_cycles = max_cycles
+        self.connection = connection
+        if connection is not None:
+            self.master, self.slave = connection.fileno(), None
+            self.port = None
+        else:
+            self.master, self.slave = os.openpty()
+            tty.setraw(self.slave)
+            self.port = os.ttyname(self.slave)
+        self.stats = {'commands': 0, 'bytes_received': 0, 'bytes_sent': 0, 'frames_sent': 0}
+        self._stop = threading.Event()
+        self._thread = None
+        self._rx_free = 0.0 # time at which the emulated line is free again, per direction
+        self._tx_free = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """
+        Serve the protocol in a daemon thread.
+        """
+        self._thread = threading.Thread(target=self._serve_until_stopped, name='board-emulator', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop serving and close the pty.
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self.connection is not None:
+            self.connection.close()
+            return
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _serve_until_stopped(self):
+        try:
+            self.serve()
+        except EmulatorStopped:
+            pass
+
+    def serve(self):
+        """
+        State machine of the debug unit (mips32/sources/debug/interface.v). Returns when stop() is called.
+        """
+        while True:
+            cmd = self._read_cmd()
+            if cmd == Command.LOAD.value:
+                self._load()
+            elif cmd == Command.EXEC.value:
+                self._exec()
+            elif cmd == Command.EXEC_BY_STEPS.value:
+                self._exec_by_steps()
+            # Any other command is ignored, as the board does
+
+    def _load(self):
+        if self.cpu.load_program(self._words()):
+            self._send(code_frame(Result.INFO.value, Response.LOAD_OK.value))
+        else:
+            self._send(code_frame(Result.ERROR.value, BoardError.INSTRUCTION_MEMORY_FULL.value))
+
+    def _exec(self):
+        cpu = self.cpu
+        cpu.flush()
+        if cpu.is_empty():
+            self._send(code_frame(Result.ERROR.value, BoardError.EMPTY_PROGRAM.value))
+            return
+        cycles = 0
+        while not cpu.run(RUN_CHUNK_CYCLES):
+            cycles += RUN_CHUNK_CYCLES
+            if self._stop.is_set():
+                raise EmulatorStopped()
+            if self.max_cycles is not None and cycles >= self.max_cycles:
+                return # No response: the host sees a board still running
+        self._send(self._dump() + code_frame(Result.INFO.value, Response.END.value))
+
+    def _exec_by_steps(self):
+        cpu = self.cpu
+        cpu.flush()
+        frames = self._dump()
+        while True:
+            if cpu.end_program:
+                self._send(frames + code_frame(Result.INFO.value, Response.END.value))
+                return
+            self._send(frames + code_frame(Result.INFO.value, Response.STEP_END.value))
+            while self._read_cmd() != Command.NEXT_STEP.value:
+                pass # Waits for NEXT_STEP, anything else is ignored
+            if cpu.is_empty():
+                self._send(code_frame(Result.ERROR.value, BoardError.EMPTY_PROGRAM.value))
+                return
+            cpu.step()
+            frames = self._dump()
+
+    def _dump(self) -> bytes:
+        """
+        Frames of the register and memory printers: 32 registers, PC, 32 memory words, PC.
+        """
+        cpu = self.cpu
+        cycle = cpu.clk_counter
+        pc = pack_frame(Result.PC.value, cycle, 0, cpu.pc)
+        frames = [pack_frame(Result.REG.value, cycle, addr, data) for addr, data in enumerate(cpu.registers)]
+        frames.append(pc)
+        frames += [pack_frame(Result.MEM.value, cycle, addr, data) for addr, data in enumerate(cpu.memory)]
+        frames.append(pc)
+        return b''.join(frames)
+
+    def _words(self):
+        while True:
+            yield int.from_bytes(self._read(WORD_SIZE_BYTES), 'little')
+
+    def _read_cmd(self) -> int:
+        self.stats['commands'] += 1
+        return self._read(CMD_SIZE_BYTES)[0]
+
+    def _read(self, size: int) -> bytes:
+        """
+        Read exactly size bytes from the host. Raises EmulatorStopped once stop() is called.
+        """
+        data = bytearray()
+        while len(data) < size:
+            if self._stop.is_set():
+                raise EmulatorStopped()
+            ready, _, _ = select.select([self.master], [], [], POLL_SECONDS)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self.master, size - len(data))
+            except OSError:
+                raise EmulatorStopped()
+            if not chunk:
+                raise EmulatorStopped() # Connection closed by the host
+            data += chunk
+        self.stats['bytes_received'] += size
+        self._rx_free = self._pace(self._rx_free, size)
+        return bytes(data)
+
+    def _send(self, data: bytes):
+        self.stats['frames_sent'] += len(data) // FRAME.size
+        view = memoryview(data)
+        while view:
+            if self._stop.is_set():
+                raise EmulatorStopped()
+            # Paced in chunks of about 10 ms of line time
+            size = len(view) if self.baudrate is None else max(1, self.baudrate // (BITS_PER_BYTE * 100))
+            try:
+                written = os.write(self.master, view[:size])
+            except OSError:
+                raise EmulatorStopped()
+            self.stats['bytes_sent'] += written
+            self._tx_free = self._pace(self._tx_free, written)
+            view = view[written:]
+
+    def _pace(self, line_free: float, size: int) -> float:
+        """
+        Sleep until size bytes would have gone through the emulated link. Returns when the line is free again.
+        """
+        if self.baudrate is None:
+            return 0.0
+        now = time.monotonic()
+        line_free = max(line_free, now) + size * BITS_PER_BYTE / self.baudrate
+        if line_free > now:
+            time.sleep(line_free - now)
+        return line_free
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Emulate the MIPS32 board on a pseudo terminal.")
+    parser.add_argument('-b', '--baud', type=int, default=None, help="simulated baud rate (default: unthrottled)")
+    parser.add_argument('--cpu', choices=list(CPUS), default='pipeline',
+                        help="CPU model behind the debug unit: pipeline (cycle accurate, as the RTL) or functional (one "
+                             "instruction per cycle; byte addressed data memory, word n at address 4 * n, where the "
+                             "board takes the low 5 bits of the address as the word)")
+    parser.add_argument('--max-cycles', type=int, default=None, help="cycle limit of EXEC for programs that never halt")
+    parser.add_argument('--imem-words', type=int, default=INSTRUCTION_MEMORY_WORDS, help="instruction memory size in words")
+    parser.add_argument('--tcp', type=int, metavar='PORT', help="serve on localhost:PORT over TCP instead of a pty")
+    args = parser.parse_args(argv)
+
+    if args.tcp is not None:
+        # One host at a time; the board (CPU and loaded program) is kept between connections
+        cpu = CPUS[args.cpu](args.imem_words)
+        server = socket.create_server(('127.0.0.1', args.tcp))
+        print(f"Emulated board on tcp://127.0.0.1:{args.tcp}")
+        try:
+            while True:
+                connection, _ = server.accept()
+                emulator = BoardEmulator(cpu, args.baud, args.max_cycles, connection)
+                try:
+                    emulator.serve()
+                except EmulatorStopped:
+                    pass
+                connection.close()
+        except KeyboardInterrupt:
+            pass
+        server.close()
+        return 0
+
+    emulator = BoardEmulator(CPUS[args.cpu](args.imem_words), args.baud, args.max_cycles)
+    print(f"Emulated board on {emulator.port}")
+    print(f"Point the interface at it with: {PORT_ENV}={emulator.port}")
+    emulator.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    emulator.stop()
+    print(f"Stopped: {emulator.stats}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
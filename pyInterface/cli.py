@@ -1,22 +1,33 @@
 import shutil
 import os
-from mipsAssambler import mipsAssambler
+from asm_cache import AssemblyCache
 import serial_com
 from serial_com import Uart
 from interface import Interface, ExecMode
+from trace_file import TraceReader, TraceWriter, ReplayInterface
+from stop_conditions import parse_condition
 from colorama import Fore, Style, init
 init(autoreset=True)
 
 class Cli():
-    def __init__(self):
+    def __init__(self, replay: str = None, record: str = None):
         uart = None
         interface = None
+        self.replay = replay # trace file played back instead of a board
+        self.record = record # trace file the session is recorded to
         self.set_up()
 
     def set_up(self):
         clear_screen()
-        self.uart = self.uart_init()
-        self.interface = self.Interface_init(self.uart)
+        self.asm_cache = AssemblyCache()
+        if self.replay:
+            self.uart = None
+            self.interface = ReplayInterface(TraceReader(self.replay))
+        else:
+            self.uart = self.uart_init()
+            self.interface = self.Interface_init(self.uart)
+            if self.record:
+                self.interface.record(TraceWriter(self.record))
         self.main_menu()
 
     def main_menu(self):
@@ -54,20 +65,18 @@ class Cli():
     # Compile and load program
     def compile_and_load(self):
         clear_screen()
-        assembler = mipsAssambler()
 
         input_file = input("Enter the file path: ")
         file = self.input_file(input_file)
         try:
-            if assembler.validate_asm_syntax(file):
-                print("Syntaxis OK!\n")
-                assembler.assamble(file)
+            words, listing = self.asm_cache.assemble(file)
+            print("Syntaxis OK!\n")
+            print(listing)
         except Exception as e:
             print(e)
             print("\nCompilation failed...")
             exit(1)
-        code = self.prepare_code(assembler.get_compiled_code())
-        self.interface.load_program(code)
+        self.interface.load_program(words)
         print("\nProgram loaded successfully.")
         input("\nPress Enter to continue...")
         self.main_menu()
@@ -88,26 +97,40 @@ class Cli():
     def step_program(self):
         try:
             program_state = self.interface.run_program(ExecMode.STEP)
+            view = 0 # step shown, taken from the host side history
             while not program_state:
                 clear_screen()
                 print("Stepping program...\n")
-                reg = self.interface.get_reg_last_cycle()
-                mem = self.interface.get_reg_last_cycle()
-                pc = self.interface.get_pc()
+                reg, mem, pc = self.interface.get_step(view)
+                print(f"Step {view} of {len(self.interface.history) - 1}\n")
                 print("Printing table...\n")
                 self.print_table(reg, mem, pc, True)
 
-                while usr_input := input("N to next step: "):
+                while usr_input := input("N to next step, B to step back, U to run until: "):
                     if usr_input.lower() == 'n':
-                        program_state = self.interface.run_next_step()
+                        if view < len(self.interface.history) - 1:
+                            view += 1 # Already run, no need to ask the board
+                        else:
+                            program_state = self.interface.run_next_step()
+                            view = len(self.interface.history) - 1
+                        break
+                    elif usr_input.lower() == 'b':
+                        if view > 0:
+                            view -= 1
+                            break
+                        print("Already at the first step.")
+                    elif usr_input.lower() == 'u':
+                        result = self.run_until()
+                        if result is not None:
+                            program_state = result['ended']
+                            view = result['cycle'] # The steps the board ran past the stop come next
                         break
                     else:
                         print("Invalid input.")
             
             clear_screen()
             if program_state: # Program finished
-                reg = self.interface.get_reg_last_cycle()
-                mem = self.interface.get_reg_last_cycle()
+                reg, mem, pc = self.interface.get_step(-1)
                 self.print_table(reg, mem, pc, True)
                 print("Program finished.")
             else:
@@ -118,6 +141,20 @@ class Cli():
         input("\nPress Enter to continue...")
         self.main_menu()
 
+    # Step until a breakpoint, watchpoint or cycle, without drawing the steps in between
+    def run_until(self) -> dict:
+        text = input("Stop at (pc=0x20, r3=81, m5 to stop on change, cycle=500): ")
+        try:
+            condition = parse_condition(text)
+        except ValueError as e:
+            print(e)
+            return None
+        result = self.interface.run_until(condition)
+        print(f"Stopped by {result['reason']} at cycle {result['cycle']} after {result['steps']} steps "
+              f"({result['seconds'] * 1000:.1f} ms)")
+        input("\nPress Enter to continue...")
+        return result
+
     # Read file content
     def input_file(self, file_path: str) -> str:
         try:
@@ -137,16 +174,9 @@ class Cli():
 
     def Interface_init(self, uart: Uart) -> Interface:
         interface = Interface(uart)
+        interface.start_reader()
         return interface
 
-    def prepare_code(self, codes: str) -> list:
-        byte_list = []
-        for code in codes:
-            hex_byte = code[2:].zfill(8)
-            byte_list.extend([hex_byte[i:i+2] for i in range(0, len(hex_byte), 2)])
-        #print(byte_list)
-        return byte_list
-
     def print_table(self, register: list, memory: list, pc: int, by_cicle: bool):
         terminal_width = os.get_terminal_size().columns
         half_twidth = terminal_width // 2
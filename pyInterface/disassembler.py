@@ -0,0 +1,168 @@
+import numpy as np
+import mips_isa as iset
+
+# Reverse tables derived from mips_isa: every mnemonic gets an id, opcodes and func codes map to ids
+MNEMONICS = list(iset.instructionTable)
+MNEMONIC_ID = {inst: i for i, inst in enumerate(MNEMONICS)}
+UNKNOWN = -1
+NOP_WORD = iset.fixedFieldTable['NOP']
+HALT_WORD = iset.fixedFieldTable['HALT']
+
+OPCODE_LUT = np.full(64, UNKNOWN, dtype=np.int16) # opcode -> mnemonic id (I and J type)
+FUNCT_LUT = np.full(64, UNKNOWN, dtype=np.int16)  # func code -> mnemonic id (R type)
+for _inst, _fields in iset.instructionTable.items():
+    if _fields[0].startswith('0x'): # NOP and HALT are matched by full word
+        continue
+    if _fields[0] == iset.OP_CODE_R:
+        FUNCT_LUT[iset.field_value(_fields[1])] = MNEMONIC_ID[_inst]
+    else:
+        OPCODE_LUT[iset.field_value(_fields[0])] = MNEMONIC_ID[_inst]
+
+# Immediates shown in hexadecimal: the ones the hardware zero-extends (see instructionTable)
+UNSIGNED_INM = ('ANDI', 'ORI', 'XORI', 'LUI')
+
+REG_NAMES = np.array(sorted(iset.registerTable, key=iset.registerTable.get))
+HEX_BYTE = np.array([f"{i:02x}" for i in range(256)])
+
+def to_uint32(words) -> np.ndarray:
+    """
+    Return the image as a uint32 array (no copy for uint32 arrays, array('I') or bytes in native order).
+    """
+    if isinstance(words, (bytes, bytearray, memoryview)):
+        return np.frombuffer(words, dtype=np.uint32)
+    return np.asarray(words, dtype=np.uint32)
+
+def decode_fields(words) -> dict:
+    """
+    Split every word of the image into its fields with vectorized masks.
+    Returns {'opcode', 'rs', 'rt', 'rd', 'shamt', 'funct', 'inm', 'target', 'mnemonic'} arrays;
+    'mnemonic' holds ids into MNEMONICS, UNKNOWN (-1) for words that are not instructions.
+    """
+    words = to_uint32(words)
+    opcode = (words >> iset.OPCODE_SHIFT) & 0x3f
+    funct = words & 0x3f
+    mnemonic = np.where(opcode == 0, FUNCT_LUT[funct], OPCODE_LUT[opcode])
+    mnemonic[words == NOP_WORD] = MNEMONIC_ID['NOP']
+    mnemonic[words == HALT_WORD] = MNEMONIC_ID['HALT']
+    return {
+        'opcode'   : opcode,
+        'rs'       : (words >> iset.RS_SHIFT) & 0x1f,
+        'rt'       : (words >> iset.RT_SHIFT) & 0x1f,
+        'rd'       : (words >> iset.RD_SHIFT) & 0x1f,
+        'shamt'    : (words >> iset.SHAMT_SHIFT) & iset.SHAMT_MASK,
+        'funct'    : funct,
+        'inm'      : words & iset.INM_MASK,
+        'target'   : words & iset.DIR_MASK,
+        'mnemonic' : mnemonic
+    }
+
+def hex32(values: np.ndarray) -> np.ndarray:
+    """
+    Format 32 bit values as '0x%08x' strings with a byte lookup table.
+    """
+    values = np.asarray(values, dtype=np.uint32)
+    out = np.full(values.shape, '0x', dtype='<U10')
+    for shift in (24, 16, 8, 0):
+        out = np.char.add(out, HEX_BYTE[(values >> shift) & 0xff])
+    return out
+
+def hex_short(values: np.ndarray) -> np.ndarray:
+    """
+    Format values as hex() does ('0x0', '0x4c', ...) with the same lookup table.
+    """
+    digits = np.char.lstrip(np.char.replace(hex32(values), '0x', ''), '0')
+    return np.char.add('0x', np.where(digits == '', '0', digits))
+
+def branch_targets(fields: dict) -> np.ndarray:
+    """
+    Absolute word address of every word, assuming it is a branch: PC + 1 + sigextend(INM).
+    """
+    address = np.arange(len(fields['inm']), dtype=np.int64)
+    return address + 1 + fields['inm'].astype(np.uint16).view(np.int16)
+
+def _operands(fields: dict, kind: str, inst: str, mask: np.ndarray, label_of) -> np.ndarray:
+    if kind in (iset.RD, iset.RS, iset.RT):
+        return REG_NAMES[fields[kind][mask]]
+    if kind == iset.SHAMT:
+        return fields['shamt'][mask].astype(str)
+    if kind == iset.INM:
+        inm = fields['inm'][mask]
+        if inst in UNSIGNED_INM:
+            return hex_short(inm)
+        return inm.astype(np.uint16).view(np.int16).astype(str)
+    if kind == iset.MEM:
+        return np.char.add(np.char.add(fields['inm'][mask].astype(str), '('), np.char.add(REG_NAMES[fields['rs'][mask]], ')'))
+    if kind == iset.BRANCH:
+        return label_of(branch_targets(fields)[mask])
+    return label_of(fields['target'][mask].astype(np.int64))
+
+def disassemble(words, labels: bool = True) -> np.ndarray:
+    """
+    Disassemble a whole image. Returns one assembly line per word.
+    Each mnemonic present in the image is formatted as a vectorized group. With labels, branch and jump
+    targets inside the image get 'L<address>' labels; targets outside it, and every target without labels,
+    are word addresses. Words that are not instructions are shown as '.word 0x...'. The labelled output
+    assembles back to the same image when every word is an instruction and every target is inside it.
+    """
+    fields = decode_fields(words)
+    mnemonic = fields['mnemonic']
+    size = len(mnemonic)
+    text = np.full(size, '', dtype=object)
+
+    present = np.unique(mnemonic)
+    label_names = np.array([], dtype=str)
+    targets = np.array([], dtype=np.int64)
+    if labels:
+        branch_ids = [MNEMONIC_ID[inst] for inst, layout in iset.formatTable.items() if iset.BRANCH in layout]
+        jump_ids = [MNEMONIC_ID[inst] for inst, layout in iset.formatTable.items() if iset.TARGET in layout]
+        targets = np.unique(np.concatenate((branch_targets(fields)[np.isin(mnemonic, branch_ids)],
+                                            fields['target'][np.isin(mnemonic, jump_ids)].astype(np.int64))))
+        targets = targets[(targets >= 0) & (targets < size)] # no line to put a label on outside the image
+        label_names = np.char.add('L', targets.astype(str))
+
+    def label_of(addresses: np.ndarray) -> np.ndarray:
+        if not len(targets):
+            return addresses.astype(str)
+        index = np.minimum(np.searchsorted(targets, addresses), len(targets) - 1)
+        return np.where(targets[index] == addresses, label_names[index], addresses.astype(str))
+
+    for inst_id in present:
+        mask = mnemonic == inst_id
+        if inst_id == UNKNOWN:
+            text[mask] = np.char.add('.word ', hex32(to_uint32(words)[mask]))
+            continue
+        inst = MNEMONICS[inst_id]
+        layout = iset.formatTable[inst]
+        if not layout:
+            text[mask] = inst
+            continue
+        args = _operands(fields, layout[0], inst, mask, label_of)
+        for kind in layout[1:]:
+            args = np.char.add(np.char.add(args, ','), _operands(fields, kind, inst, mask, label_of))
+        text[mask] = np.char.add(inst + ' ', args)
+
+    if len(targets):
+        text[targets] = np.char.add(np.char.add(label_names, ': '), text[targets].astype(str))
+    return text.astype(str)
+
+def listing(words, labels: bool = True) -> str:
+    """
+    Listing of the image with the same columns as the assembler (address, machine code, instruction).
+    """
+    words = to_uint32(words)
+    address = np.char.add(hex_short(np.arange(len(words), dtype=np.uint32) * 4), ':')
+    rows = np.char.add(np.char.add(np.char.ljust(address, 9), np.char.ljust(hex32(words), 16)), disassemble(words, labels))
+    header = f"{'Address':<8} {'Machine Code':<15} {'Instruction':<20}\n" + "-" * 43 + "\n"
+    return header + '\n'.join(rows.tolist())
+
+def annotate_pcs(pcs, words, labels: bool = False) -> np.ndarray:
+    """
+    Return the instruction at every PC (byte address) of a trace, '' for PCs outside the image.
+    """
+    pcs = np.asarray(pcs, dtype=np.int64)
+    text = disassemble(words, labels)
+    index = pcs >> 2
+    inside = (index >= 0) & (index < len(text))
+    out = np.full(pcs.shape, '', dtype=text.dtype)
+    out[inside] = text[index[inside]]
+    return out
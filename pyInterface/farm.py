@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+from mipsAssambler import mipsAssambler
+from serial_com import Uart, list_usb_ports, USB_MATCH
+from interface import ExecMode, ResponseTimeoutException
+from async_interface import AsyncInterface, open_transport
+from batch import find_sources
+
+LINK_ERRORS = (ResponseTimeoutException, ConnectionError, OSError) # the board stopped answering, not the program
+PROGRAM_ATTEMPTS = 2 # boards a program may lose before it is the suspect (a program that never halts)
+
+class UsbPorts():
+    def __init__(self, match: str = USB_MATCH):
+        """
+        Port source of a rack of boards: every serial port whose device name contains match
+        (serial.tools.list_ports).
+        """
+        self.match = match
+
+    def ports(self) -> list:
+        return list_usb_ports(self.match)
+
+    def close(self):
+        pass
+
+class EmulatedPorts():
+    def __init__(self, count: int, **options):
+        """
+        Port source of count emulated boards on ptys (see board_emulator.BoardEmulator, which gets options),
+        to run the farm without hardware.
+        """
+        from board_emulator import BoardEmulator # POSIX only, imported when emulated boards are used
+        self.boards = [BoardEmulator(**options) for _ in range(count)]
+        for board in self.boards:
+            board.start()
+
+    def ports(self) -> list:
+        return [board.port for board in self.boards]
+
+    def close(self):
+        for board in self.boards:
+            board.stop()
+
+class BoardStats():
+    def __init__(self, port: str):
+        self.port = port
+        self.programs = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.bytes_uploaded = 0
+        self.error = None # why the board could not be used, None if it could
+
+    def as_dict(self) -> dict:
+        return {
+            'port'             : self.port,
+            'programs'         : self.programs,
+            'errors'           : self.errors,
+            'busy_seconds'     : self.busy_seconds,
+            'bytes_uploaded'   : self.bytes_uploaded,
+            'error'            : self.error,
+            'programs_per_sec' : self.programs / self.busy_seconds if self.busy_seconds > 0 else 0.0
+        }
+
+class Farm():
+    def __init__(self, ports: list, baudrate: int = Uart.baudrate, timeout: float = None):
+        """
+        Runs a queue of assembled programs on several boards at once: one AsyncInterface per port, all
+        driven by one event loop. Each board takes the next program as soon as it is free.
+        """
+        self.ports = ports
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.stats = {port: BoardStats(port) for port in ports}
+
+    def run(self, programs: list) -> list:
+        """
+        Run every (name, words) program in RUN mode. Returns one result per program, in order:
+        {'program', 'port', 'registers', 'memory', 'pc', 'seconds', 'error'}; registers and memory are
+        lists of data words, error is None on success.
+        """
+        # The messages Interface prints for every command are dropped (one redirection for all the boards)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.run(self._run(programs))
+
+    async def _run(self, programs: list) -> list:
+        queue = asyncio.Queue()
+        for index, program in enumerate(programs):
+            queue.put_nowait((index, program))
+        results = [None] * len(programs)
+        attempts = [0] * len(programs)
+        workers = asyncio.gather(*(self._board(port, queue, results, attempts) for port in self.ports),
+                                 return_exceptions=True)
+        # Done when every program has a result, or when no board is left to take the rest
+        done = asyncio.ensure_future(queue.join())
+        await asyncio.wait([workers, done], return_when=asyncio.FIRST_COMPLETED)
+        done.cancel()
+        workers.cancel() # boards still waiting for a program
+        with contextlib.suppress(asyncio.CancelledError):
+            await workers
+        # Programs no board could take (every port failed)
+        for index, (name, _) in enumerate(programs):
+            if results[index] is None:
+                results[index] = {'program': name, 'port': None, 'registers': None, 'memory': None, 'pc': None,
+                                  'seconds': 0.0, 'error': "No board available"}
+        return results
+
+    async def _board(self, port: str, queue: asyncio.Queue, results: list, attempts: list):
+        stats = self.stats[port]
+        options = {} if self.timeout is None else {'timeout': self.timeout}
+        try:
+            board = AsyncInterface(await open_transport(port, self.baudrate), **options)
+        except Exception as e:
+            # Unreachable or busy port: its programs are left to the other boards
+            stats.error = f"{type(e).__name__}: {e}"
+            return
+        try:
+            while True:
+                index, (name, words) = await queue.get()
+                start = time.perf_counter()
+                result = {'program': name, 'port': port, 'registers': None, 'memory': None, 'pc': None, 'error': None}
+                try:
+                    await board.load_program(words)
+                    await board.run_program(ExecMode.RUN)
+                    result['registers'] = [reg['data'] for reg in board.get_reg_last_cycle() or []]
+                    result['memory'] = [mem['data'] for mem in board.get_mem_last_cycle() or []]
+                    result['pc'] = board.get_pc()
+                    stats.bytes_uploaded += board.upload_stats['bytes']
+                except LINK_ERRORS as e:
+                    # The board is retired; its program goes back to the healthy ones unless it already
+                    # cost PROGRAM_ATTEMPTS boards
+                    stats.error = f"{type(e).__name__}: {e}"
+                    stats.errors += 1
+                    attempts[index] += 1
+                    if attempts[index] < PROGRAM_ATTEMPTS:
+                        queue.put_nowait((index, (name, words)))
+                    else:
+                        result['error'] = stats.error
+                        result['seconds'] = time.perf_counter() - start
+                        results[index] = result
+                    queue.task_done()
+                    return
+                except Exception as e:
+                    result['error'] = f"{type(e).__name__}: {e}"
+                    stats.errors += 1
+                result['seconds'] = time.perf_counter() - start
+                stats.programs += 1
+                stats.busy_seconds += result['seconds']
+                results[index] = result
+                queue.task_done()
+        finally:
+            board.close()
+
+def print_stats(farm: Farm, elapsed: float, results: list):
+    """
+    Print the per board throughput and the totals of the run.
+    """
+    print(f"{'Port':<20} {'Programs':>8} {'Errors':>7} {'Busy (s)':>9} {'Prog/s':>8} {'Bytes':>9}")
+    print("-" * 66)
+    for stats in farm.stats.values():
+        row = stats.as_dict()
+        print(f"{row['port']:<20} {row['programs']:>8} {row['errors']:>7} {row['busy_seconds']:>9.3f} "
+              f"{row['programs_per_sec']:>8.1f} {row['bytes_uploaded']:>9}")
+        if row['error'] is not None:
+            print(f"    not used: {row['error']}")
+    print("-" * 66)
+    failed = sum(result['error'] is not None for result in results)
+    print(f"{len(results)} programs on {len(farm.ports)} boards, {failed} failed, in {elapsed:.2f} s "
+          f"({len(results) / elapsed if elapsed > 0 else 0:.1f} programs/s)")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run MIPS32 programs on every board of a farm at once.")
+    parser.add_argument('targets', nargs='+', help="directories, glob patterns or .asm files")
+    parser.add_argument('--match', default=USB_MATCH, help="substring of the board serial port names (default: USB)")
+    parser.add_argument('--emulate', type=int, metavar='N', help="use N emulated boards (paced at --baud) instead of serial ports")
+    parser.add_argument('-b', '--baud', type=int, default=Uart.baudrate, help="baud rate of the boards")
+    parser.add_argument('-t', '--timeout', type=float, default=None, help="seconds to wait for each response")
+    parser.add_argument('--json', help="write the results and per board stats as JSON to this path")
+    args = parser.parse_args(argv)
+
+    sources = find_sources(args.targets)
+    if not sources:
+        print("No source files found.")
+        return 1
+    programs = []
+    for source in sources:
+        with open(source, 'r') as src:
+            programs.append((source, mipsAssambler().assemble_to_words(src.read())))
+
+    port_source = EmulatedPorts(args.emulate, baudrate=args.baud) if args.emulate else UsbPorts(args.match)
+    try:
+        ports = port_source.ports()
+        if not ports:
+            print("No boards found.")
+            return 1
+        farm = Farm(ports, args.baud, args.timeout)
+        start = time.perf_counter()
+        results = farm.run(programs)
+        elapsed = time.perf_counter() - start
+    finally:
+        port_source.close()
+
+    for result in results:
+        status = "OK" if result['error'] is None else result['error']
+        print(f"{result['program']} on {result['port'] or '-'}: PC {result['pc']} {status}")
+    print_stats(farm, elapsed, results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'results': results, 'boards': [stats.as_dict() for stats in farm.stats.values()]}, file, indent=2)
+    return 1 if any(result['error'] is not None for result in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import queue
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+FRAME_SIZE_BYTES = 7           # data (4 bytes, little endian), addr, cycle, type: the 56 bit response, LSB first
+DATA_SIZE_BYTES = 4
+ADDR_OFFSET, CYCLE_OFFSET, TYPE_OFFSET = 4, 5, 6
+RING_SIZE_BYTES = 1 << 16      # multiple of FRAME_SIZE_BYTES is not required
+POLL_SECONDS = 0.05            # the reader thread notices stop() within this time
+
+Frame = namedtuple('Frame', ['type', 'cycle', 'addr', 'data'])
+FrameBatch = namedtuple('FrameBatch', ['type', 'cycle', 'addr', 'data']) # columns: array('B') x 3, array('I')
+
+def decode_frames(buffer) -> (FrameBatch, int):
+    """
+    Decode every whole frame of buffer at once into typed columns with strided slices (no per frame work).
+    Returns the batch and the number of bytes consumed; a trailing partial frame is left for the caller.
+    """
+    whole = len(buffer) - len(buffer) % FRAME_SIZE_BYTES
+    view = bytes(buffer[:whole])
+    data = bytearray(whole // FRAME_SIZE_BYTES * DATA_SIZE_BYTES)
+    for byte in range(DATA_SIZE_BYTES):
+        data[byte::DATA_SIZE_BYTES] = view[byte::FRAME_SIZE_BYTES]
+    data = array('I', data)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return FrameBatch(array('B', view[TYPE_OFFSET::FRAME_SIZE_BYTES]), array('B', view[CYCLE_OFFSET::FRAME_SIZE_BYTES]),
+                      array('B', view[ADDR_OFFSET::FRAME_SIZE_BYTES]), data), whole
+
+def encode_frames(batch: FrameBatch) -> bytes:
+    """
+    Inverse of decode_frames: the bytes the board sent for batch.
+    """
+    count = len(batch.type)
+    data = array('I', batch.data)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    data = data.tobytes()
+    out = bytearray(count * FRAME_SIZE_BYTES)
+    for byte in range(DATA_SIZE_BYTES):
+        out[byte::FRAME_SIZE_BYTES] = data[byte::DATA_SIZE_BYTES]
+    out[ADDR_OFFSET::FRAME_SIZE_BYTES] = bytes(batch.addr)
+    out[CYCLE_OFFSET::FRAME_SIZE_BYTES] = bytes(batch.cycle)
+    out[TYPE_OFFSET::FRAME_SIZE_BYTES] = bytes(batch.type)
+    return bytes(out)
+
+def slice_batch(batch: FrameBatch, start: int, stop: int = None) -> FrameBatch:
+    return FrameBatch(*(column[start:stop] for column in batch))
+
+class RingBuffer():
+    def __init__(self, capacity: int = RING_SIZE_BYTES):
+        """
+        Fixed size byte FIFO over a preallocated buffer. Used by a single thread.
+        """
+        self.buffer = bytearray(capacity)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+
+    def free(self) -> int:
+        return self.capacity - self.size
+
+    def write(self, data):
+        """
+        Append data; it must fit in free().
+        """
+        count = len(data)
+        if count > self.free():
+            raise ValueError("Ring buffer overflow")
+        end = (self.start + self.size) % self.capacity
+        first = min(count, self.capacity - end)
+        self.buffer[end:end + first] = data[:first]
+        self.buffer[:count - first] = data[first:]
+        self.size += count
+
+    def read(self, count: int) -> bytes:
+        """
+        Remove and return the count oldest bytes (count <= size).
+        """
+        first = min(count, self.capacity - self.start)
+        data = bytes(self.buffer[self.start:self.start + first]) + bytes(self.buffer[:count - first])
+        self.start = (self.start + count) % self.capacity
+        self.size -= count
+        return data
+
+class FrameReader():
+    def __init__(self, uart, ring_size: int = RING_SIZE_BYTES, parser=None):
+        """
+        Background reader of the board responses: a thread drains the port into a ring buffer and decodes
+        all the whole 7 byte frames it holds as one FrameBatch, pushed onto a thread safe queue.
+        parser (e.g. interface.FrameParser) decodes instead of decode_frames, from the reader thread only;
+        the bytes it leaves over are decoded with the next ones.
+        """
+        self.uart = uart
+        self.ring = RingBuffer(ring_size)
+        self.parser = parser
+        self._tail = b'' # bytes left over by the parser
+        self.batches = queue.Queue()
+        self._pending = None # batch being consumed by get(), and its next frame
+        self._index = 0
+        self.error = None # exception that stopped the thread, raised again to the consumers
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='frame-reader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                # Whatever is waiting (at least one byte, or nothing after POLL_SECONDS), bounded by the ring space
+                waiting = max(1, self.uart.bytes_waiting())
+                data = self.uart.read_bytes(min(waiting, self.ring.free()), timeout=POLL_SECONDS)
+                if not data:
+                    continue
+                self.ring.write(data)
+                if self.parser is not None:
+                    buffer = self._tail + self.ring.read(self.ring.size)
+                    batch, consumed = self.parser.decode(buffer)
+                    self._tail = buffer[consumed:]
+                    if len(batch.type):
+                        self.batches.put(batch)
+                    continue
+                whole = self.ring.size - self.ring.size % FRAME_SIZE_BYTES
+                if whole:
+                    self.batches.put(decode_frames(self.ring.read(whole))[0])
+        except Exception as e:
+            self.error = e
+
+    def available(self) -> bool:
+        """
+        True if a decoded frame is waiting.
+        """
+        return self._pending is not None or not self.batches.empty()
+
+    def get(self, timeout: float = None) -> Frame:
+        """
+        Next frame, waiting timeout seconds at most (None waits forever). Raises TimeoutError, or the
+        exception that stopped the reader thread.
+        """
+        if self._pending is None:
+            self._pending = self.get_batch(timeout)
+            self._index = 0
+        batch, index = self._pending, self._index
+        frame = Frame(batch.type[index], batch.cycle[index], batch.addr[index], batch.data[index])
+        self._index += 1
+        if self._index == len(batch.type):
+            self._pending = None
+        return frame
+
+    def get_batch(self, timeout: float = None) -> FrameBatch:
+        """
+        Next decoded batch (what is left of it if get() already took some frames). Timeouts as get().
+        """
+        if self._pending is not None:
+            batch = slice_batch(self._pending, self._index)
+            self._pending = None
+            return batch
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = POLL_SECONDS if deadline is None else max(0, min(POLL_SECONDS, deadline - time.monotonic()))
+            try:
+                return self.batches.get(timeout=wait)
+            except queue.Empty:
+                if self.error is not None:
+                    raise self.error
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"No frame received in {timeout} s")
+
+    def __iter__(self):
+        """
+        Iterate the frames as they stream in (blocks until the next one).
+        """
+        while True:
+            yield self.get()
+
+    def until(self, types: tuple, timeout: float = None):
+        """
+        Yield the frames up to and including the next one whose type is in types (e.g. INFO and ERROR).
+        timeout applies to each frame.
+        """
+        while True:
+            frame = self.get(timeout)
+            yield frame
+            if frame.type in types:
+                return
+
+    def next_of(self, types: tuple, timeout: float = None) -> Frame:
+        """
+        Block until the next frame whose type is in types and return it; the frames before it are dropped.
+        """
+        for frame in self.until(types, timeout):
+            pass
+        return frame
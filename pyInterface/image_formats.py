@@ -0,0 +1,95 @@
+import sys
+from array import array
+
+# Output formats of an assembled program: {name: (builder, file extension)}
+#   bin-be : raw words, big endian
+#   bin-le : raw words, little endian (byte order of Instruction_Memory.v and of the UART loader)
+#   ihex   : Intel HEX, byte addressed, little endian words
+#   mem    : $readmemh file, one 32 bit word per line
+#   coe    : Xilinx memory initialization file, one 32 bit word per entry
+
+IHEX_RECORD_SIZE = 16
+IHEX_DATA = 0x00
+IHEX_EOF = 0x01
+IHEX_EXT_LINEAR_ADDR = 0x04
+
+def to_words(words) -> array:
+    """
+    Return the program as an array of 32 bit words, without copying if it already is one.
+    """
+    if isinstance(words, array) and words.typecode == 'I':
+        return words
+    return array('I', words)
+
+def to_bin(words, byteorder: str = 'big') -> bytes:
+    """
+    Raw image of the program with every word in the given byte order.
+    """
+    image = to_words(words)
+    if byteorder != sys.byteorder:
+        image = array('I', image)
+        image.byteswap()
+    return image.tobytes()
+
+def to_bin_be(words) -> bytes:
+    return to_bin(words, 'big')
+
+def to_bin_le(words) -> bytes:
+    return to_bin(words, 'little')
+
+def to_intel_hex(words, byteorder: str = 'little') -> bytes:
+    """
+    Intel HEX image of the program. Extended linear address records are added every 64 KiB.
+    """
+    view = memoryview(to_bin(words, byteorder))
+    out = bytearray()
+    upper = 0
+    for offset in range(0, len(view), IHEX_RECORD_SIZE):
+        if offset >> 16 != upper:
+            upper = offset >> 16
+            out += _ihex_record(0, IHEX_EXT_LINEAR_ADDR, upper.to_bytes(2, 'big'))
+        out += _ihex_record(offset & 0xffff, IHEX_DATA, view[offset:offset + IHEX_RECORD_SIZE])
+    out += _ihex_record(0, IHEX_EOF, b'')
+    return bytes(out)
+
+def _ihex_record(address: int, record_type: int, data) -> bytes:
+    record = bytes((len(data), address >> 8, address & 0xff, record_type)) + bytes(data)
+    checksum = -sum(record) & 0xff
+    return b':' + (record + bytes((checksum,))).hex().upper().encode() + b'\n'
+
+def to_readmemh(words) -> bytes:
+    """
+    $readmemh image of the program: one 8 digit hexadecimal word per line.
+    """
+    return ''.join(f"{word:08x}\n" for word in to_words(words)).encode()
+
+def to_coe(words) -> bytes:
+    """
+    Xilinx .coe image of the program in radix 16.
+    """
+    vector = ',\n'.join(f"{word:08x}" for word in to_words(words))
+    return f"memory_initialization_radix=16;\nmemory_initialization_vector=\n{vector};\n".encode()
+
+FORMATS = {
+    'bin-be' : (to_bin_be,    '.bin'),
+    'bin-le' : (to_bin_le,    '.le.bin'),
+    'ihex'   : (to_intel_hex, '.hex'),
+    'mem'    : (to_readmemh,  '.mem'),
+    'coe'    : (to_coe,       '.coe')
+}
+
+def build_image(words, fmt: str) -> bytes:
+    """
+    Build the image of the program in one of the FORMATS.
+    """
+    if fmt not in FORMATS:
+        raise ValueError("Invalid format, formats supported: " + ", ".join(FORMATS))
+    return FORMATS[fmt][0](words)
+
+def write_image(path: str, words, fmt: str):
+    """
+    Write the image of the program in one of the FORMATS to path.
+    """
+    image = build_image(words, fmt)
+    with open(path, 'wb') as file:
+        file.write(image)
@@ -1,5 +1,11 @@
 from serial_com import Uart
+from frame_reader import FrameReader, FrameBatch, FRAME_SIZE_BYTES, decode_frames, slice_batch
+from trace_store import TraceStore
+from step_history import StepHistory
 from enum import Enum, auto
+from array import array
+import sys
+import threading
 import time
 
 # Enum to define the available commands for the board
@@ -19,6 +25,10 @@ class Response(Enum):
     END = 0x1
     LOAD_OK = 0x2
     STEP_END = 0x3
+
+# Enum to define the error codes of the ERROR frames, apart from Response: their values overlap
+class BoardError(Enum):
+    INSTRUCTION_MEMORY_FULL = 0x1
     EMPTY_PROGRAM = 0x2
 
 # Enum to define the result types
@@ -47,142 +57,353 @@ class Shift(Enum):
 class Utils(Enum):
     FILL_BYTES_ZERO = 0x00
     RES_SIZE_BYTES = 7
+    WORD_SIZE_BYTES = 4
+    UPLOAD_CHUNK_BYTES = 4096
+    RESPONSE_TIMEOUT = 5.0 # seconds without a frame before the board is considered unresponsive
+    CANCEL_POLL = 0.05     # seconds between checks of cancel() while waiting for the board
+    STEPS_IN_FLIGHT = 8    # NEXT_STEP commands sent ahead at most by run_until: enough to keep the link busy, few to drain after cancel()
+
+# Result types as plain ints, compared once per frame
+RESULT_ERROR = Result.ERROR.value
+RESULT_INFO = Result.INFO.value
+RESULT_REG = Result.REG.value
+RESULT_MEM = Result.MEM.value
+RESULT_PC = Result.PC.value
+
+# Data of the INFO and ERROR frames the debug unit sends
+INFO_CODES = frozenset(code.value for code in Response)
+ERROR_CODES = frozenset(code.value for code in BoardError)
 
-class Interface:
-    def __init__(self, uart: Uart):
+def upload_payload(program) -> bytes:
+    """
+    Build the bytes sent after the LOAD command: every word little endian, as the debug unit stores them.
+    program is an array('I') or list of words, bytes with big endian words or a list of hex byte strings
+    ('20', '01', ...) of big endian words, as the CLI and GUI used to send.
+    """
+    if isinstance(program, (list, tuple)) and program and isinstance(program[0], str):
+        program = bytes.fromhex(''.join(program)) # hex byte strings, big endian words
+    if isinstance(program, (bytes, bytearray, memoryview)):
+        data = bytes(program) # array('I', memoryview) would take every byte as a word
+        if len(data) % Utils.WORD_SIZE_BYTES.value:
+            raise LoadProgramException("Program size is not a multiple of the word size")
+        words = array('I')
+        words.frombytes(data)
+        if sys.byteorder == 'little':
+            words.byteswap() # big endian words read as host words
+    else:
+        words = program if isinstance(program, array) and program.typecode == 'I' else array('I', program)
+    if sys.byteorder != 'little':
+        words = array('I', words)
+        words.byteswap()
+    return words.tobytes()
+
+class FrameParser():
+    def __init__(self):
         """
-        Initialize the interface with a UART object and prepare internal state.
+        Decoder of the response stream that checks the frame alignment. A frame is accepted if its type is a
+        Result and it fits the frames before it: a dump is sent as registers 0, 1, ... then PC, memory 0, 1, ...
+        then PC, all at the same cycle and with PC at address 0, and INFO and ERROR frames carry a known code
+        at address 0. When a frame does not fit, a byte was lost or added on the link: the parser drops bytes
+        until it finds two consecutive frames that fit, or an INFO or ERROR frame (the end of a response),
+        and goes on from there. discarded_bytes and resyncs count what was dropped.
         """
-        self.uart = uart
+        self.discarded_bytes = 0
+        self.resyncs = 0
+        self.syncing = False # looking for a frame boundary
+        self._last = None    # (type, cycle, addr) of the last frame accepted, None if unknown
+
+    def stats(self) -> dict:
+        return {'discarded_bytes': self.discarded_bytes, 'resyncs': self.resyncs}
+
+    def _fits(self, last, res_type: int, res_cycle: int, res_addr: int, res_data: int) -> bool:
+        """
+        True if the frame can follow last (a (type, cycle, addr) tuple, or None if nothing is known).
+        """
+        if res_type == RESULT_INFO:
+            return res_addr == 0 and res_data in INFO_CODES
+        if res_type == RESULT_ERROR:
+            return res_addr == 0 and res_data in ERROR_CODES
+        if res_type != RESULT_REG and res_type != RESULT_MEM and res_type != RESULT_PC:
+            return False
+        if last is None:
+            return res_type != RESULT_PC or res_addr == 0
+        last_type, last_cycle, last_addr = last
+        if last_type != RESULT_INFO and last_type != RESULT_ERROR and res_cycle != last_cycle:
+            return False # All the frames of a dump are reported at the same cycle
+        if res_type == RESULT_PC:
+            return res_addr == 0
+        return res_addr == (last_addr + 1 if last_type == res_type else 0)
+
+    def _accept(self, batch: FrameBatch) -> int:
+        """
+        Number of leading frames of batch that fit the stream.
+        """
+        fits = self._fits
+        last = self._last
+        for index, (res_type, res_cycle, res_addr, res_data) in enumerate(zip(*batch)):
+            if not fits(last, res_type, res_cycle, res_addr, res_data):
+                self._last = last
+                return index
+            last = (res_type, res_cycle, res_addr)
+        self._last = last
+        return len(batch.type)
+
+    def _find_boundary(self, data: bytes, offset: int) -> int:
+        """
+        First offset from which the stream is aligned again; clears syncing if found. If the bytes at hand
+        are not enough to tell, returns the offset to try again from once more bytes arrive.
+        """
+        while offset + FRAME_SIZE_BYTES <= len(data):
+            frames = decode_frames(data[offset:offset + 2 * FRAME_SIZE_BYTES])[0]
+            first = (frames.type[0], frames.cycle[0], frames.addr[0], frames.data[0])
+            if self._fits(None, *first):
+                if first[0] == RESULT_INFO or first[0] == RESULT_ERROR:
+                    self.syncing = False
+                    return offset
+                if len(frames.type) < 2:
+                    return offset # The next frame will tell
+                if self._fits(first[:3], frames.type[1], frames.cycle[1], frames.addr[1], frames.data[1]):
+                    self.syncing = False
+                    return offset
+            offset += 1
+        return offset
+
+    def decode(self, buffer) -> (FrameBatch, int):
+        """
+        Decode the frames of buffer as decode_frames, dropping the bytes that break the alignment.
+        Returns the batch and the number of bytes consumed (dropped bytes included); the bytes left over
+        must be passed again with the next ones.
+        """
+        data = bytes(buffer)
+        parts = []
+        offset = 0
+        while True:
+            if self.syncing:
+                start = offset
+                offset = self._find_boundary(data, offset)
+                self.discarded_bytes += offset - start
+                if self.syncing:
+                    break
+                self.resyncs += 1
+            batch = decode_frames(data[offset:])[0]
+            accepted = self._accept(batch)
+            if accepted:
+                parts.append(batch if accepted == len(batch.type) else slice_batch(batch, 0, accepted))
+            offset += accepted * FRAME_SIZE_BYTES
+            if accepted == len(batch.type):
+                break
+            # Misaligned from this frame on: it is not a boundary, look from the next byte
+            self.syncing = True
+            self._last = None
+            self.discarded_bytes += 1
+            offset += 1
+        batch = parts[0] if parts else decode_frames(b'')[0]
+        for part in parts[1:]:
+            batch = FrameBatch(*(column + more for column, more in zip(batch, part)))
+        return batch, offset
+
+class InterfaceBase():
+    def __init__(self, timeout: float = Utils.RESPONSE_TIMEOUT.value):
+        """
+        State of a session with the board, shared by the blocking Interface and the asyncio AsyncInterface:
+        results (registers, memory, PC, step history), latency and upload stats, frame decoding and the
+        bookkeeping of every command. Nothing here reads or writes the board: each interface does its own
+        I/O and calls these helpers, so both follow the protocol the same way.
+        timeout is the time in seconds to wait for each response frame (None waits forever).
+        """
+        self.timeout = timeout
+        self.latency = {cmd.name: [] for cmd in Command} # seconds from each command to its last frame
+        self.recorder = None    # TraceWriter of the session, see record()
+        self._rx = bytearray()  # received bytes not decoded yet
+        self._pending = None    # decoded frames not consumed yet
+        self.parser = FrameParser()
         self.step_mode_flg = False
-        self.registers = []
-        self.memory = []
+        self.step_count = 0     # cycle of the step session, counted by the host (not bound to 8 bits)
+        self.verbose = True     # print the end of every command
+        self.cancelled = threading.Event() # set by cancel(), from any thread
+        self.registers = TraceStore() # entries of the last dump (of every dump in RUN mode)
+        self.memory = TraceStore()
+        self.history = StepHistory()  # every step of the step session
         self.pc = 0
+        self.upload_stats = None
 
-    def load_program(self, inst: list):
+    def cancel(self):
         """
-        Load a program to the board by sending the instructions one by one.
-        Raises LoadProgramException if there's an error during the process.
+        Stop waiting for the board (callable from another thread): the command waiting for its response
+        raises OperationCancelled, run_until stops at the step it is at. The board itself can't be stopped:
+        a program running in RUN mode goes on until it ends or the board is reset.
         """
-        self._send_cmd(Command.LOAD.value)
-        
-        # Check initial response to see if loading can start
-        response_type, _, _, data = self._read_response()
-        if response_type is not None:
-            raise LoadProgramException(f"Error loading program: {hex(data)}")
-        
-        print("Loading program...")
-        
-        # Send instructions to the board in reverse order for each 4-byte block
-        for i in range(0, len(inst), 4):
-            for j in range(3, -1, -1):
-                if i + j < len(inst):
-                    # Send each byte as big-endian (most significant byte first)
-                    self.uart.write(int(inst[i + j], 16), byteorder='big')
-        
-        # Check if the program loaded successfully
-        response_type, _, _, data = self._read_response(locked=True)
+        self.cancelled.set()
+
+    def record(self, writer):
+        """
+        Record the session from now on: program images, commands and the raw response frames are appended
+        to writer (a trace_file.TraceWriter). Replay it with trace_file.ReplayInterface.
+        """
+        self.recorder = writer
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def _load_payload(self, program) -> bytes:
+        """
+        Wire payload of a program image (see upload_payload), recorded if the session is.
+        """
+        payload = upload_payload(program)
+        if self.recorder is not None:
+            self.recorder.image(payload)
+        return payload
+
+    def _load_done(self, cmd_start: float, start: float, sent: float, loaded: float, size: int):
+        """
+        Account for an upload of size bytes: latency of the LOAD command and upload_stats.
+        """
+        self.latency[Command.LOAD.name].append(time.monotonic() - cmd_start)
+        self.upload_stats = {
+            'bytes'         : size,
+            'write_seconds' : sent - start,
+            'seconds'       : loaded - start,
+            'bytes_per_sec' : size / (loaded - start) if loaded > start else float('inf')
+        }
+
+    def _check_loaded(self, response):
+        response_type, _, _, data = response
         if response_type == Result.ERROR.value:
             raise LoadProgramException(f"Error loading program: {hex(data)}")
 
-    def _send_cmd(self, cmd: int):
+    def _command_bytes(self, cmd: int, count: int = 1) -> bytes:
         """
-        Send a command to the board followed by three zero-filled bytes.
+        Bytes of cmd followed by three zero-filled bytes, count times; the commands are recorded.
         """
         # Command format: [CMD] + [0x00] + [0x00] + [0x00]
-        self.uart.write(cmd)
-        for _ in range(3):
-            self.uart.write(Utils.FILL_BYTES_ZERO.value)
-        time.sleep(0.1)  # Short delay to allow the board to process the command
+        if self.recorder is not None:
+            for _ in range(count):
+                self.recorder.command(cmd)
+        return bytes((cmd, Utils.FILL_BYTES_ZERO.value, Utils.FILL_BYTES_ZERO.value, Utils.FILL_BYTES_ZERO.value)) * count
 
-    def _read_response(self, locked=False):
+    def _decode_rx(self) -> FrameBatch:
         """
-        Read the board's response and extract relevant fields using bit masks.
-        Returns a tuple of (response type, cycle, address, data).
-        If no data is available and locked is False, returns (None, None, None, None).
+        Decode the whole frames of the bytes received (see FrameParser) and record them.
+        Returns None if no frame is complete yet.
         """
-        if self.uart.check_data_available(Utils.RES_SIZE_BYTES.value) or locked:
-            res = self.uart.read(Utils.RES_SIZE_BYTES.value)
+        if len(self._rx) < Utils.RES_SIZE_BYTES.value:
+            return None
+        batch, consumed = self.parser.decode(self._rx)
+        del self._rx[:consumed]
+        if not len(batch.type):
+            return None
+        if self.recorder is not None:
+            self.recorder.frames(batch)
+        return batch
 
-            # Extract different parts of the response using bit masks and shifts
-            res_type = (res & Mask.TYPE.value) >> Shift.TYPE.value
-            res_cycle = (res & Mask.CYCLE.value) >> Shift.CYCLE.value
-            res_addr = (res & Mask.ADDR.value) >> Shift.ADDR.value
-            res_data = (res & Mask.DATA.value) >> Shift.DATA.value
+    def _take_pending(self) -> FrameBatch:
+        batch, self._pending = self._pending, None
+        return batch
 
-            return res_type, res_cycle, res_addr, res_data
-        else:
-            return None, None, None, None
+    def _start_result(self):
+        """
+        Start reading the result of a command: in step mode the registers and memory stores hold the
+        last dump only, earlier ones are kept by self.history.
+        """
+        if self.step_mode_flg:
+            self.registers.clear()
+            self.memory.clear()
 
-    def _read_result(self) -> bool:
+    def _process_batch(self, batch: FrameBatch) -> bool:
         """
-        Continuously read and process results from the board.
-        Handles different result types: register data, memory data, program end, and errors.
-        Returns True if the program has ended, False if in step mode and a step has completed.
+        Store the registers, memory and PC of a batch of frames.
+        Returns True if the program has ended, False if in step mode and a step has completed, once the
+        frame that ends the command is found (the frames after it are kept for the next read), None if the
+        batch does not end the command.
         """
-        while True:
-            res_type, res_cycle, res_addr, res_data = self._read_response()
+        for index, (res_type, res_cycle, res_addr, res_data) in enumerate(zip(*batch)):
+            if res_type == RESULT_REG:
+                # Append register data to list
+                self.registers.add(res_cycle, res_addr, res_data)
+            elif res_type == RESULT_MEM:
+                # Append memory data to list
+                self.memory.add(res_cycle, res_addr, res_data)
+            elif res_type == RESULT_PC:
+                # Update program counter (PC)
+                self.pc = res_data
 
-            if res_type == Result.ERROR.value:
+            elif res_type == RESULT_ERROR:
+                self._keep_pending(batch, index + 1)
                 # Handle specific error cases
-                if res_data == Response.EMPTY_PROGRAM.value:
+                if res_data == BoardError.EMPTY_PROGRAM.value:
                     print("Empty program.")
+                    return True # The board is back to idle, nothing else is sent
                 else:
                     raise ValueError(f"Error: {hex(res_data)}")
 
-            elif res_type == Result.INFO.value:
+            elif res_type == RESULT_INFO:
                 # Handle program or step end
                 if res_data == Response.END.value:
-                    print("Program ended.")
+                    self._keep_pending(batch, index + 1)
+                    self._end_dump()
+                    if self.verbose:
+                        print("Program ended.")
                     return True
                 elif res_data == Response.STEP_END.value:
-                    print("Step ended.")
+                    self._keep_pending(batch, index + 1)
+                    self._end_dump()
+                    if self.verbose:
+                        print("Step ended.")
                     return False
+        return None
 
-            elif res_type == Result.REG.value:
-                # Append register data to list
-                self.registers.append({'cycle': res_cycle, 'addr': res_addr, 'data': res_data})
-            elif res_type == Result.MEM.value:
-                # Append memory data to list
-                self.memory.append({'cycle': res_cycle, 'addr': res_addr, 'data': res_data})
-            elif res_type == Result.PC.value:
-                # Update program counter (PC)
-                self.pc = res_data
-            else:
-                time.sleep(0.1)  # Short delay to avoid busy waiting
+    def _end_dump(self):
+        if self.step_mode_flg:
+            self.history.record(self.registers, self.memory, self.pc)
 
-    def run_program(self, mode: ExecMode):
+    def _keep_pending(self, batch: FrameBatch, start: int):
+        if start < len(batch.type):
+            self._pending = slice_batch(batch, start)
+
+    def _start_run(self, mode: ExecMode) -> Command:
         """
-        Start the execution of the program in the specified mode (RUN or STEP).
-        Resets registers and memory before execution.
+        Reset the state for a new execution in mode (RUN or STEP) and return the command that starts it.
         """
-        # Reset the state
-        self.registers = []
-        self.memory = []
+        self.registers = TraceStore()
+        self.memory = TraceStore()
+        self.history = StepHistory()
 
         self.step_mode_flg = False
+        self.step_count = 0
 
         if mode == ExecMode.RUN:
-            self._send_cmd(Command.EXEC.value)
+            return Command.EXEC
         elif mode == ExecMode.STEP:
-            self._send_cmd(Command.EXEC_BY_STEPS.value)
             self.step_mode_flg = True
+            return Command.EXEC_BY_STEPS
         else:
             raise ValueError("Invalid execution mode.")
-        
-        return self._read_result()
 
-    def run_next_step(self) -> bool:
-        """
-        Execute the next step in step mode. Raises an error if not in step mode.
-        Returns True if the program ends after this step, otherwise False.
-        """
+    def _start_step(self):
         if not self.step_mode_flg:
             raise ValueError("Not in step mode.")
-        
-        print("Running next step...")
-        self._send_cmd(Command.NEXT_STEP.value)
-        return self._read_result()
+        self.step_count += 1
+
+    def _command_done(self, cmd: Command, start: float, ended: bool) -> bool:
+        """
+        Record the latency of cmd, sent at start. Once the program ends the board is back to idle, so step
+        mode ends too.
+        """
+        self.latency[cmd.name].append(time.monotonic() - start)
+        if ended:
+            self.step_mode_flg = False
+        return ended
+
+    def latency_summary(self):
+        """
+        Print the number of commands sent and their mean and worst latency.
+        """
+        print("Command latency:")
+        for name, times in self.latency.items():
+            if times:
+                print(f"{name}: {len(times)} commands, mean {sum(times) / len(times) * 1000:.2f} ms, max {max(times) * 1000:.2f} ms")
 
     def reg_summary(self):
         """
@@ -204,13 +425,24 @@ class Interface:
         """
         Return a list of registers filtered by a specific cycle.
         """
-        return [reg for reg in self.registers if reg['cycle'] == cycle]
+        if len(self.history):
+            return [reg for step in self.history.steps_at(cycle) for reg in self.history.state(step)[0]]
+        return self.registers.by_cycle(cycle)
 
     def get_mem_by_cycle(self, cycle: int):
         """
         Return a list of memory entries filtered by a specific cycle.
         """
-        return [mem for mem in self.memory if mem['cycle'] == cycle]
+        if len(self.history):
+            return [mem for step in self.history.steps_at(cycle) for mem in self.history.state(step)[1]]
+        return self.memory.by_cycle(cycle)
+
+    def get_step(self, step: int):
+        """
+        Return the registers, memory entries and PC of a step of the step session (step back and forth
+        from the history, without the board). Negative steps count from the last one.
+        """
+        return self.history.state(step)
 
     def get_pc(self):
         """
@@ -222,20 +454,402 @@ class Interface:
         """
         Return the registers from the last cycle that was executed.
         """
-        if not self.registers:
-            return None
-        last_cycle = self.registers[-1]['cycle']
-        return self.get_reg_by_cycle(last_cycle)
+        return self.registers.last_cycle()
 
     def get_mem_last_cycle(self):
         """
         Return the memory entries from the last cycle that was executed.
         """
-        if not self.memory:
-            return None
-        last_cycle = self.memory[-1]['cycle']
-        return self.get_mem_by_cycle(last_cycle)
+        return self.memory.last_cycle()
+
+class StepRun():
+    def __init__(self, interface: InterfaceBase, condition, max_steps: int = None, window: int = Utils.STEPS_IN_FLIGHT.value):
+        """
+        Bookkeeping of a run_until: which NEXT_STEP commands to send, when to stop and the state to return.
+        The interface driving it sends the commands and reads the results:
+
+            run = StepRun(interface, condition, max_steps, window)
+            while not run.stopped:
+                send run.commands() NEXT_STEP commands (if any), then run.step_done(result)
+            while run.draining():
+                run.drained(result)
+            return run.result()
+
+        condition is a stop_conditions Breakpoint, Watchpoint or CycleCount, or a list of them. Must be in
+        step mode. Nothing is printed until close() (also called by result()).
+        """
+        if not interface.step_mode_flg:
+            raise ValueError("Not in step mode.")
+        self.interface = interface
+        self.conditions = list(condition) if isinstance(condition, (list, tuple)) else [condition]
+        for cond in self.conditions:
+            cond.start(interface)
+        self.max_steps = max_steps
+        self.window = window
+        self.start = time.monotonic()
+        self.steps = 0
+        self.in_flight = 0
+        self.ended = False
+        self.state = None
+        self._verbose, interface.verbose = interface.verbose, False
+        self.reason = self._due()
+        if self.reason is not None:
+            self.state = self._stop_state()
+
+    @property
+    def stopped(self) -> bool:
+        return self.reason is not None
+
+    def _due(self):
+        """
+        Reason to stop before any step: a cycle count already reached or no steps allowed.
+        """
+        for cond in self.conditions:
+            if cond.steps_left(self.interface.step_count) == 0:
+                return cond
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return 'max_steps'
+        return None
+
+    def commands(self) -> int:
+        """
+        NEXT_STEP commands to send now, to have in flight all the steps still needed if every condition can
+        tell how many (Utils.STEPS_IN_FLIGHT at most), window otherwise.
+        """
+        left = [cond.steps_left(self.interface.step_count) for cond in self.conditions]
+        wanted = self.window if None in left else min(left)
+        if self.max_steps is not None:
+            wanted = min(wanted, self.max_steps - self.steps)
+        wanted = max(1, min(wanted, Utils.STEPS_IN_FLIGHT.value))
+        if wanted <= self.in_flight:
+            return 0
+        count = wanted - self.in_flight
+        self.in_flight = wanted
+        return count
+
+    def step_done(self, ended: bool):
+        """
+        Account for the dump of a step (ended as returned by _process_batch) and check the conditions.
+        """
+        self.ended = ended
+        self.in_flight -= 1
+        self.steps += 1
+        self.interface.step_count += 1
+        self.reason = self._stop_reason()
+        if self.reason is not None:
+            self.state = self._stop_state()
+            # Answers of the commands still in flight are read now, cancelled or not
+            self.interface.cancelled.clear()
+
+    def _stop_reason(self):
+        if self.ended:
+            return 'end'
+        if self.interface.cancelled.is_set():
+            return 'cancelled'
+        for cond in self.conditions:
+            if cond.hit(self.interface):
+                return cond
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return 'max_steps'
+        return None
+
+    def _stop_state(self) -> dict:
+        interface = self.interface
+        return {
+            'reason'    : self.reason,
+            'cycle'     : interface.step_count,
+            'steps'     : self.steps,
+            'pc'        : interface.pc,
+            'registers' : interface.registers.last_cycle() or [],
+            'memory'    : interface.memory.last_cycle() or [],
+            'seconds'   : time.monotonic() - self.start
+        }
+
+    def draining(self) -> bool:
+        """
+        True while answers of commands sent past the stop are still to be read (the board ignores them
+        once the program ends).
+        """
+        return self.in_flight > 0 and not self.ended
+
+    def drained(self, ended: bool):
+        self.ended = ended
+        self.in_flight -= 1
+        self.interface.step_count += 1
+
+    def close(self):
+        self.interface.verbose = self._verbose
+
+    def result(self) -> dict:
+        """
+        The state that stopped, with 'ended' once the answers in flight are read. Step mode ends with the
+        program.
+        """
+        self.close()
+        if self.ended:
+            self.interface.step_mode_flg = False
+        self.state['ended'] = self.ended
+        return self.state
+
+class Interface(InterfaceBase):
+    def __init__(self, uart: Uart, timeout: float = Utils.RESPONSE_TIMEOUT.value):
+        """
+        Initialize the interface with a UART object and prepare internal state.
+        timeout is the time in seconds to wait for each response frame (None waits forever).
+        """
+        super().__init__(timeout)
+        self.uart = uart
+        self.reader = None
+        self._interrupted = False # a command was cancelled before its response arrived
+        self._until = False       # in run_until, which checks cancel() between dumps instead
+
+    def load_program(self, program):
+        """
+        Load a program to the board. program is the word image: an array('I') or list of words, bytes with
+        big endian words (the 'bin-be' image) or a list of hex byte strings (see upload_payload).
+        The wire payload (little endian words) is built at once and sent in a few large writes. The board only
+        answers once the whole image is in (LOAD_OK or an ERROR), and that answer is awaited with the timeout.
+        Raises LoadProgramException if there's an error during the process.
+        """
+        payload = self._load_payload(program)
+        self._begin()
+        cmd_start = self._send_cmd(Command.LOAD.value)
+
+        print("Loading program...")
+
+        start = time.perf_counter()
+        view = memoryview(payload)
+        for offset in range(0, len(view), Utils.UPLOAD_CHUNK_BYTES.value):
+            self.uart.write_bytes(view[offset:offset + Utils.UPLOAD_CHUNK_BYTES.value])
+        self.uart.flush()
+        sent = time.perf_counter()
+
+        # Check if the program loaded successfully
+        response = self._read_response(locked=True)
+        loaded = time.perf_counter()
+        self._load_done(cmd_start, start, sent, loaded, len(payload))
+        print(f"Sent {len(payload)} bytes in {(loaded - start) * 1000:.1f} ms "
+              f"({self.upload_stats['bytes_per_sec']:.0f} B/s)")
+        self._check_loaded(response)
+
+    def _send_cmd(self, cmd: int, count: int = 1) -> float:
+        """
+        Send a command to the board followed by three zero-filled bytes, count times in a single write.
+        No delay follows: responses are awaited by the blocking reads of _read_response.
+        Returns the monotonic time the command was sent at.
+        """
+        self.uart.write_bytes(self._command_bytes(cmd, count))
+        return time.monotonic()
+
+    def _begin(self):
+        """
+        Start of a command: clears cancel() and drops the responses a cancelled command left behind.
+        """
+        self.cancelled.clear()
+        if self._interrupted:
+            self._interrupted = False
+            self._pending = None
+            self._rx.clear()
+            if self.reader is not None:
+                while self.reader.available():
+                    self.reader.get_batch(0)
+            elif self.uart is not None and self.uart.bytes_waiting():
+                self.uart.read_bytes(self.uart.bytes_waiting(), timeout=0)
+
+    def _check_cancelled(self):
+        if self.cancelled.is_set() and not self._until:
+            self._interrupted = True
+            raise OperationCancelled("Cancelled while waiting for the board")
+
+    def start_reader(self):
+        """
+        Start a background thread that reads and decodes the responses as they arrive (see FrameReader).
+        From then on every response is taken from its queue.
+        """
+        if self.reader is None:
+            self.reader = FrameReader(self.uart, parser=self.parser)
+            self.reader.start()
+
+    def stop_reader(self):
+        """
+        Stop the background reader; frames still queued are dropped.
+        """
+        if self.reader is not None:
+            self.reader.stop()
+            self.reader = None
+            self._pending = None
+
+    def next_info(self):
+        """
+        Block until the next INFO or ERROR response and return it as (response type, cycle, address, data).
+        Responses before it are dropped.
+        """
+        while True:
+            response = self._read_response(locked=True)
+            if response[0] in (Result.INFO.value, Result.ERROR.value):
+                return response
+
+    def frames(self):
+        """
+        Iterate the responses as they stream in, as (response type, cycle, address, data) tuples.
+        """
+        while True:
+            yield self._read_response(locked=True)
+
+    def _wait_bytes(self, size: int):
+        """
+        Block until size bytes are buffered in self._rx or self.timeout expires (monotonic deadline).
+        Raises ResponseTimeoutException on timeout, OperationCancelled after cancel().
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while len(self._rx) < size:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise ResponseTimeoutException(f"No response from the board in {self.timeout} s")
+            # Everything already waiting, at least what is missing
+            wanted = max(size - len(self._rx), self.uart.bytes_waiting())
+            wait = Utils.CANCEL_POLL.value if remaining is None else min(remaining, Utils.CANCEL_POLL.value)
+            data = self.uart.read_bytes(wanted, timeout=wait)
+            if not data:
+                self._check_cancelled()
+            self._rx += data
+
+    def _read_batch(self, locked=False) -> FrameBatch:
+        """
+        Read every response available in one call and decode all the whole frames at once (see FrameParser).
+        Frames left over by a previous call come first. If no frame is available and locked is False,
+        returns None; if locked, waits for one (see _wait_bytes).
+        """
+        if self._pending is not None:
+            return self._take_pending()
+        if self.reader is not None:
+            if not (locked or self.reader.available()):
+                return None
+            batch = self._reader_batch()
+            if self.recorder is not None:
+                self.recorder.frames(batch)
+            return batch
+
+        waiting = self.uart.bytes_waiting()
+        if waiting:
+            self._rx += self.uart.read_bytes(waiting, timeout=0)
+        while True:
+            batch = self._decode_rx()
+            if batch is not None:
+                return batch
+            if not locked:
+                return None
+            # Nothing decoded yet, or only bytes dropped while resynchronizing: wait for more
+            self._wait_bytes(max(len(self._rx) + 1, Utils.RES_SIZE_BYTES.value))
+
+    def _reader_batch(self) -> FrameBatch:
+        """
+        Next batch of the background reader, waiting self.timeout at most and checking cancel() meanwhile.
+        """
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            wait = Utils.CANCEL_POLL.value
+            if deadline is not None:
+                wait = max(0, min(wait, deadline - time.monotonic()))
+            try:
+                return self.reader.get_batch(wait)
+            except TimeoutError:
+                self._check_cancelled()
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise ResponseTimeoutException(f"No response from the board in {self.timeout} s")
+
+    def _read_response(self, locked=False):
+        """
+        Read the board's next response.
+        Returns a tuple of (response type, cycle, address, data).
+        If no data is available and locked is False, returns (None, None, None, None).
+        If locked, waits for the response (see _read_batch).
+        """
+        batch = self._read_batch(locked)
+        if batch is None:
+            return None, None, None, None
+        if len(batch.type) > 1:
+            self._pending = slice_batch(batch, 1)
+        return batch.type[0], batch.cycle[0], batch.addr[0], batch.data[0]
+
+    def _read_result(self) -> bool:
+        """
+        Continuously read and process results from the board.
+        Handles different result types: register data, memory data, program end, and errors.
+        Returns True if the program has ended, False if in step mode and a step has completed.
+        Responses are read and decoded in batches (see _read_batch); frames after the one that ends
+        the command are kept for the next read.
+        """
+        self._start_result()
+        while True:
+            ended = self._process_batch(self._read_batch(locked=True))
+            if ended is not None:
+                return ended
+
+    def run_program(self, mode: ExecMode):
+        """
+        Start the execution of the program in the specified mode (RUN or STEP).
+        Resets registers and memory before execution.
+        """
+        self._begin()
+        return self._timed_result(self._start_run(mode))
+
+    def run_next_step(self) -> bool:
+        """
+        Execute the next step in step mode. Raises an error if not in step mode.
+        Returns True if the program ends after this step, otherwise False.
+        """
+        self._start_step()
+        print("Running next step...")
+        self._begin()
+        return self._timed_result(Command.NEXT_STEP)
+
+    def _timed_result(self, cmd: Command) -> bool:
+        """
+        Send cmd, read its result and record the latency until the last frame (see _command_done).
+        """
+        start = self._send_cmd(cmd.value)
+        return self._command_done(cmd, start, self._read_result())
+
+    def run_until(self, condition, max_steps: int = None, window: int = Utils.STEPS_IN_FLIGHT.value) -> dict:
+        """
+        Step until condition holds (a stop_conditions Breakpoint, Watchpoint or CycleCount, or a list of them:
+        the first one that holds stops), the program ends or max_steps steps are run. Must be in step mode.
+        NEXT_STEP commands go back to back and every dump is checked as it arrives, with nothing printed:
+        the steps a CycleCount still needs are sent at once (Utils.STEPS_IN_FLIGHT at most), otherwise window
+        commands are kept in flight, so a Breakpoint or Watchpoint does not wait a round trip per step. The
+        board then runs up to window - 1 steps past the stop (it can't be stepped back): their dumps go to the
+        history and the session goes on from the last one, but the state returned is the one that stopped,
+        at history step 'cycle' (see StepRun). window=1 stops the board exactly there.
+        Returns {'reason', 'ended', 'cycle', 'steps', 'pc', 'registers', 'memory', 'seconds'}: reason is the
+        condition that held, 'end', 'max_steps' or 'cancelled' (see cancel()); registers and memory are the
+        entries of the stopping dump.
+        """
+        run = StepRun(self, condition, max_steps, window)
+        self._begin()
+        # cancel() is seen once the dump being received is complete, so the step count stays in step with the board
+        self._until = True
+        try:
+            while not run.stopped:
+                count = run.commands()
+                if count:
+                    self._send_cmd(Command.NEXT_STEP.value, count)
+                run.step_done(self._read_result())
+            while run.draining():
+                run.drained(self._read_result())
+        finally:
+            self._until = False
+            run.close()
+        return run.result()
 
 # Custom exception for errors when loading the program
 class LoadProgramException(Exception):
     pass
+
+# Custom exception for a board that does not answer in time
+class ResponseTimeoutException(Exception):
+    pass
+
+# Custom exception for a wait stopped by Interface.cancel()
+class OperationCancelled(Exception):
+    pass
@@ -0,0 +1,336 @@
+import argparse
+import sys
+import time
+import mips_isa as iset
+from mipsAssambler import mipsAssambler
+
+DEFAULT_MEMORY_SIZE = 1 << 20 # bytes, program image at address 0
+DEFAULT_MAX_INSTRUCTIONS = 100000000
+MAX_BLOCK_SIZE = 256 # instructions translated into one block at most
+WORD_MASK = 0xffffffff
+SIGN_BIT = 0x80000000
+
+# Reverse tables: opcode / func code -> mnemonic
+opcodeTable = {iset.field_value(fields[0]): inst for inst, fields in iset.instructionTable.items()
+               if fields[0] != iset.OP_CODE_R and not fields[0].startswith('0x')}
+functTable = {iset.field_value(fields[1]): inst for inst, fields in iset.instructionTable.items()
+              if fields[0] == iset.OP_CODE_R}
+
+BRANCHES = ('BEQ', 'BNE')
+JUMPS = ('J', 'JAL', 'JR', 'JALR')
+
+def decode(word: int) -> tuple:
+    """
+    Split an instruction word into (mnemonic, rs, rt, rd, shamt, inm, target).
+    NOP, HALT and words that are not instructions decode as 'NOP', 'HALT' and None.
+    """
+    if word == iset.fixedFieldTable['NOP']:
+        inst = 'NOP'
+    elif word == iset.fixedFieldTable['HALT']:
+        inst = 'HALT'
+    else:
+        opcode = word >> iset.OPCODE_SHIFT
+        inst = functTable.get(word & 0x3f) if opcode == 0 else opcodeTable.get(opcode)
+    return (inst, (word >> iset.RS_SHIFT) & 0x1f, (word >> iset.RT_SHIFT) & 0x1f, (word >> iset.RD_SHIFT) & 0x1f,
+            (word >> iset.SHAMT_SHIFT) & iset.SHAMT_MASK, word & iset.INM_MASK, word & iset.DIR_MASK)
+
+def _sext16(inm: int) -> int:
+    return (inm | 0xffff0000) if inm & 0x8000 else inm
+
+def _reg(number: int) -> str:
+    return f"r[{number}]" if number else "0"
+
+# Straight line instructions: {mnemonic: template of the Python statement}, following the comments of
+# instructionTable, except where the RTL (and pipeline_sim) differs, so that the interpreter agrees with the
+# board: the variable shifts shift Rs by Rt (the whole register, not its low 5 bits), as ALU.v does, and LUI
+# adds Rs to the upper immediate, as the ALU is set up for it by ctrl_unit.v.
+# Fields: rd, rs, rt (register reads), shamt, inm, sinm (sign extended), slt (SLTI bound)
+statementTable = {
+    'SLL'  : "{rd} = ({rt} << {shamt}) & 0xffffffff",
+    'SRL'  : "{rd} = {rt} >> {shamt}",
+    'SRA'  : "{rd} = ((({rt} ^ 0x80000000) - 0x80000000) >> {shamt}) & 0xffffffff",
+    'SLLV' : "{rd} = (({rs} << {rt}) & 0xffffffff) if {rt} < 32 else 0",
+    'SRLV' : "{rd} = {rs} >> {rt}",
+    'SRAV' : "{rd} = ((({rs} ^ 0x80000000) - 0x80000000) >> {rt}) & 0xffffffff",
+    'ADDU' : "{rd} = ({rs} + {rt}) & 0xffffffff",
+    'SUBU' : "{rd} = ({rs} - {rt}) & 0xffffffff",
+    'AND'  : "{rd} = {rs} & {rt}",
+    'OR'   : "{rd} = {rs} | {rt}",
+    'XOR'  : "{rd} = {rs} ^ {rt}",
+    'NOR'  : "{rd} = ({rs} | {rt}) ^ 0xffffffff",
+    'SLT'  : "{rd} = int(({rs} ^ 0x80000000) < ({rt} ^ 0x80000000))",
+    'ADDI' : "{rt_w} = ({rs} + {sinm}) & 0xffffffff",
+    'ANDI' : "{rt_w} = {rs} & {inm}",
+    'ORI'  : "{rt_w} = {rs} | {inm}",
+    'XORI' : "{rt_w} = {rs} ^ {inm}",
+    'LUI'  : "{rt_w} = ({rs} + {upper}) & 0xffffffff",
+    'SLTI' : "{rt_w} = int(({rs} ^ 0x80000000) < {slt})",
+    'LW'   : "{rt_w} = m[{addr} >> 2]",
+    'LWU'  : "{rt_w} = m[{addr} >> 2]",
+    'LB'   : "{rt_w} = ((((m[{addr} >> 2] >> (({addr} & 3) << 3)) & 0xff) ^ 0x80) - 0x80) & 0xffffffff",
+    'LBU'  : "{rt_w} = (m[{addr} >> 2] >> (({addr} & 3) << 3)) & 0xff",
+    'LH'   : "{rt_w} = ((((m[{addr} >> 2] >> (({addr} & 2) << 3)) & 0xffff) ^ 0x8000) - 0x8000) & 0xffffffff",
+    'LHU'  : "{rt_w} = (m[{addr} >> 2] >> (({addr} & 2) << 3)) & 0xffff",
+    'SW'   : "m[{addr} >> 2] = {rt}",
+    'SH'   : "m[{addr} >> 2] = (m[{addr} >> 2] & ~(0xffff << (({addr} & 2) << 3))) | (({rt} & 0xffff) << (({addr} & 2) << 3))",
+    'SB'   : "m[{addr} >> 2] = (m[{addr} >> 2] & ~(0xff << (({addr} & 3) << 3))) | (({rt} & 0xff) << (({addr} & 3) << 3))",
+    'NOP'  : None
+}
+LOADS = ('LW', 'LWU', 'LB', 'LBU', 'LH', 'LHU')
+STORES = ('SW', 'SH', 'SB')
+
+class Interpreter():
+    def __init__(self, memory_size: int = DEFAULT_MEMORY_SIZE, data_base: int = 0):
+        """
+        Functional interpreter of the mips_isa instruction set: architectural results only, no pipeline timing.
+        Program and data share one little endian, byte addressed memory of memory_size bytes (a power of two,
+        addresses wrap around). data_base is added to the address of every load and store, so the data can be
+        kept apart from the program image (the board has separate instruction and data memories).
+        Straight line code is translated into cached Python functions, one per basic block.
+        """
+        if memory_size & (memory_size - 1) or memory_size < 4:
+            raise ValueError("Memory size must be a power of two")
+        if data_base & 3:
+            raise ValueError("Data base must be word aligned")
+        self.memory_size = memory_size
+        self.address_mask = memory_size - 1
+        self.data_base = data_base
+        self.registers = [0] * 32
+        self.memory = [0] * (memory_size // 4)
+        self.pc = 0
+        self.halted = False
+        self.instructions = 0
+        self.blocks = {}        # start address -> translated function
+        self.singles = {}       # address -> translated single instruction, used by step()
+        self.block_ends = {}    # start address -> address after the last instruction
+        self.decoded = {}       # word index -> decode() of the word
+        self.code_limit = [0]   # stores below this address may hit the image or translated code
+        self.translations = 0
+        self.invalidations = 0
+
+    def load_program(self, words):
+        """
+        Write the program image at address 0, pre-decode it and reset the registers, PC and translations.
+        """
+        words = list(words)
+        if len(words) * 4 > self.memory_size:
+            raise ValueError("Program does not fit in memory")
+        self.memory[:] = words + [0] * (len(self.memory) - len(words))
+        self.decoded = {index: decode(word) for index, word in enumerate(words)}
+        self.registers[:] = [0] * 32
+        self.pc = 0
+        self.halted = False
+        self.instructions = 0
+        self._flush_translations()
+        self.code_limit[0] = len(words) * 4
+
+    def run(self, max_instructions: int = DEFAULT_MAX_INSTRUCTIONS) -> bool:
+        """
+        Run until HALT or until about max_instructions have run (the limit is checked between blocks and
+        loop iterations). Returns True if the program halted.
+        """
+        if self.halted:
+            return True
+        blocks = self.blocks
+        translate = self._translate
+        regs = self.registers
+        mem = self.memory
+        pc = self.pc
+        executed = 0
+        while executed < max_instructions:
+            pc, count = (blocks.get(pc) or translate(pc))(regs, mem, max_instructions - executed)
+            executed += count
+            if pc < 0:
+                pc = ~pc
+                self.halted = True
+                break
+        self.pc = pc
+        self.instructions += executed
+        return self.halted
+
+    def step(self) -> bool:
+        """
+        Run a single instruction (single instruction translations are cached apart from the blocks).
+        Returns True if the program halted.
+        """
+        if self.halted:
+            return True
+        pc, count = (self.singles.get(self.pc) or self._translate(self.pc, 1))(self.registers, self.memory, 1)
+        if pc < 0:
+            pc = ~pc
+            self.halted = True
+        self.pc = pc
+        self.instructions += count
+        return self.halted
+
+    def read_word(self, address: int) -> int:
+        return self.memory[(address & self.address_mask) >> 2]
+
+    def _flush_translations(self):
+        self.blocks.clear()
+        self.singles.clear()
+        self.block_ends.clear()
+        self.code_limit[0] = 0
+
+    def _store_hit(self, address: int, next_pc: int, count: int) -> tuple:
+        """
+        Called by translated stores below code_limit: drop the blocks and decoded word the store overwrote.
+        The current block returns right after the store, so execution goes on with fresh translations.
+        """
+        index = address >> 2
+        self.decoded.pop(index, None)
+        self.singles.pop(address & ~3, None)
+        stale = [start for start, end in self.block_ends.items() if start <= address < end]
+        for start in stale:
+            del self.blocks[start]
+            del self.block_ends[start]
+        self.invalidations += bool(stale)
+        return next_pc, count
+
+    def _decode_at(self, address: int) -> tuple:
+        index = address >> 2
+        decoded = self.decoded.get(index)
+        if decoded is None:
+            decoded = self.decoded[index] = decode(self.memory[index])
+        return decoded
+
+    def _translate(self, start: int, max_size: int = MAX_BLOCK_SIZE):
+        """
+        Translate the basic block starting at start into a function (regs, mem, budget) -> (next pc, count).
+        The block ends with a branch, jump or HALT (or after max_size instructions); next pc is ~pc after
+        HALT. A block whose branch or jump goes back to its own start becomes a while loop.
+        Single instruction translations (max_size 1) go to the singles cache.
+        """
+        if start & 3:
+            raise ValueError(f"Unaligned PC: {hex(start)}")
+        mask = self.address_mask
+        body = []
+        stores = False
+        pc = start
+        size = 0
+        exit_code = None
+        while exit_code is None and size < max_size:
+            inst, rs, rt, rd, shamt, inm, target = self._decode_at(pc)
+            size += 1
+            next_pc = (pc + 4) & mask
+            if inst == 'HALT':
+                size -= 1 # HALT is not counted as executed, the PC stays on it
+                exit_code = ('halt', pc)
+            elif inst in BRANCHES:
+                offset = (_sext16(inm) << 2) & WORD_MASK
+                exit_code = ('branch', f"{_reg(rs)} {'==' if inst == 'BEQ' else '!='} {_reg(rt)}",
+                             (next_pc + offset) & mask, next_pc)
+            elif inst in ('J', 'JAL'):
+                if inst == 'JAL':
+                    body.append(f"r[31] = {next_pc}")
+                exit_code = ('jump', ((next_pc & 0xf0000000) | (target << 2)) & mask)
+            elif inst in ('JR', 'JALR'):
+                body.append(f"t = {_reg(rs)}")
+                if inst == 'JALR':
+                    body.append(f"r[31] = {next_pc}")
+                exit_code = ('jump_reg',)
+            else:
+                body.extend(self._statements(inst, rs, rt, rd, shamt, inm, next_pc, size))
+                stores |= inst in STORES
+            pc = next_pc
+        if exit_code is None:
+            exit_code = ('jump', pc)
+
+        end = pc if pc > start else self.memory_size
+        self.code_limit[0] = max(self.code_limit[0], end)
+        function = self._compile(start, body, size, exit_code)
+        if max_size == 1:
+            self.singles[start] = function
+        else:
+            self.block_ends[start] = end
+            self.blocks[start] = function
+        self.translations += 1
+        return function
+
+    def _statements(self, inst, rs, rt, rd, shamt, inm, next_pc, count) -> list:
+        template = statementTable.get(inst)
+        if template is None: # NOP and words that are not instructions
+            return []
+        if (template.startswith('{rt_w}') and rt == 0) or (template.startswith('{rd}') and rd == 0):
+            return [] # writes to r0 are discarded
+        fields = {
+            'rd'    : f"r[{rd}]",
+            'rs'    : _reg(rs),
+            'rt'    : _reg(rt),
+            'rt_w'  : f"r[{rt}]",
+            'shamt' : shamt,
+            'inm'   : inm,
+            'sinm'  : _sext16(inm) & WORD_MASK,
+            'upper' : inm << 16,
+            'slt'   : (_sext16(inm) & WORD_MASK) ^ SIGN_BIT,
+            'addr'  : 'a'
+        }
+        if inst not in LOADS and inst not in STORES:
+            return [template.format(**fields)]
+        # Memory address: data_base + Rs + unsigextend(INM), folded when Rs is r0
+        offset = self.data_base + inm
+        lines = [f"a = {offset & self.address_mask}" if rs == 0 else f"a = (r[{rs}] + {offset}) & {self.address_mask}"]
+        lines.append(template.format(**fields))
+        if inst in STORES:
+            lines.append(f"if a < cl[0]: return hit(a, {next_pc}, n + {count})")
+        return lines
+
+    def _compile(self, start: int, body: list, size: int, exit_code: tuple):
+        kind = exit_code[0]
+        loops = (kind == 'branch' and exit_code[2] == start) or (kind == 'jump' and exit_code[1] == start)
+        lines = ["def block(r, m, budget):", "    n = 0"]
+        indent = "    "
+        if loops:
+            lines.append("    while True:")
+            indent = "        "
+        lines += [indent + line for line in body]
+        if kind == 'halt':
+            lines.append(f"{indent}return {~exit_code[1]}, n + {size}")
+        elif kind == 'jump_reg':
+            lines.append(f"{indent}return t & {self.address_mask}, n + {size}")
+        elif loops and kind == 'branch':
+            lines += [f"{indent}n += {size}",
+                      f"{indent}if {exit_code[1]}:",
+                      f"{indent}    if n < budget: continue",
+                      f"{indent}    return {start}, n",
+                      f"{indent}return {exit_code[3]}, n"]
+        elif loops:
+            lines += [f"{indent}n += {size}",
+                      f"{indent}if n >= budget: return {start}, n"]
+        elif kind == 'branch':
+            lines.append(f"{indent}return ({exit_code[2]} if {exit_code[1]} else {exit_code[3]}), n + {size}")
+        else:
+            lines.append(f"{indent}return {exit_code[1]}, n + {size}")
+        namespace = {'hit': self._store_hit, 'cl': self.code_limit}
+        exec(compile('\n'.join(lines), f"<block {hex(start)}>", 'exec'), namespace)
+        return namespace['block']
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a MIPS32 program on the functional interpreter.")
+    parser.add_argument('source', help=".asm program")
+    parser.add_argument('-n', '--max-instructions', type=int, default=DEFAULT_MAX_INSTRUCTIONS, help="instruction limit")
+    parser.add_argument('-m', '--memory-size', type=int, default=DEFAULT_MEMORY_SIZE, help="memory size in bytes (power of two)")
+    args = parser.parse_args(argv)
+
+    with open(args.source, 'r') as src:
+        words = mipsAssambler().assemble_to_words(src.read())
+    interpreter = Interpreter(args.memory_size)
+    interpreter.load_program(words)
+    start = time.perf_counter()
+    halted = interpreter.run(args.max_instructions)
+    elapsed = time.perf_counter() - start
+
+    print(f"PC: {interpreter.pc:#010x}")
+    print("Registers:")
+    for number, value in enumerate(interpreter.registers):
+        if value:
+            print(f"  r{number:<3} {value:#010x} {value - ((value & SIGN_BIT) << 1):>12}")
+    if not halted:
+        print(f"Program did not halt in {args.max_instructions} instructions.")
+    if elapsed > 0:
+        print(f"{interpreter.instructions} instructions in {elapsed * 1000:.2f} ms "
+              f"({interpreter.instructions / elapsed:.0f} inst/s, {interpreter.translations} blocks translated)")
+    return 0 if halted else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
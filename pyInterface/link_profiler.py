@@ -0,0 +1,192 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from serial_com import Uart, get_serial_port
+from interface import Interface, ExecMode, Utils
+from mipsAssambler import mipsAssambler
+from pipeline_sim import DATA_MEMORY_WORDS, REGISTERS_BANK_SIZE
+
+# Frames of every dump: the registers, PC, the data memory, PC, and the INFO frame that ends the command
+DUMP_FRAMES = REGISTERS_BANK_SIZE + DATA_MEMORY_WORDS + 2 + 1
+DEFAULT_PROGRAM_WORDS = 16 # every step session goes through it all
+
+class CountingUart(Uart):
+    """
+    Uart that counts the bytes read.
+    """
+    def __init__(self, port, baudrate=None):
+        super().__init__(port, baudrate)
+        self.bytes_read = 0
+
+    def read_bytes(self, data_size=1, timeout=None):
+        data = super().read_bytes(data_size, timeout)
+        self.bytes_read += len(data)
+        return data
+
+def profile_program(size: int) -> str:
+    """
+    Program of size instructions (HALT included) that ends in a known state: r1 counts the instructions run.
+    """
+    return ''.join("ADDI r1,r1,1\n" for _ in range(size - 1)) + "HALT\n"
+
+def summarize(times: list) -> dict:
+    """
+    Min, mean, median, 95th percentile and max of a list of seconds.
+    """
+    if not times:
+        return {'count': 0}
+    ordered = sorted(times)
+    return {
+        'count' : len(ordered),
+        'min'   : ordered[0],
+        'mean'  : sum(ordered) / len(ordered),
+        'p50'   : ordered[len(ordered) // 2],
+        'p95'   : ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max'   : ordered[-1]
+    }
+
+def check_dump(interface: Interface) -> int:
+    """
+    Count the missing or misplaced entries of the last dump: every register and memory word once, in
+    address order, all with the same cycle.
+    """
+    errors = 0
+    for entries, size in ((interface.get_reg_last_cycle() or [], REGISTERS_BANK_SIZE),
+                          (interface.get_mem_last_cycle() or [], DATA_MEMORY_WORDS)):
+        errors += abs(len(entries) - size)
+        errors += sum(entry['addr'] != addr for addr, entry in enumerate(entries))
+    return errors
+
+class LinkProfiler():
+    def __init__(self, uart: CountingUart, timeout: float = Utils.RESPONSE_TIMEOUT.value):
+        """
+        Measures a UART link to a board (or a pty stand-in) through Interface: upload rate, frame rate,
+        latency per command, lost or misplaced frames and host CPU time per frame.
+        """
+        self.uart = uart
+        self.interface = Interface(uart, timeout)
+        self.frames = 0          # frames received
+        self.expected_frames = 0 # frames the commands should have produced
+        self.dump_errors = 0
+        self.receive_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.uploads = []
+
+    def _command(self, run, dumps: int):
+        """
+        Run one command (a callable) and account for its frames, time and CPU time.
+        """
+        bytes_before = self.uart.bytes_read
+        cpu = time.process_time()
+        start = time.perf_counter()
+        result = run()
+        self.receive_seconds += time.perf_counter() - start
+        self.cpu_seconds += time.process_time() - cpu
+        self.frames += (self.uart.bytes_read - bytes_before) // Utils.RES_SIZE_BYTES.value
+        self.expected_frames += dumps * DUMP_FRAMES
+        self.dump_errors += check_dump(self.interface)
+        return result
+
+    def run(self, words, repeat: int = 5) -> dict:
+        """
+        Load the program repeat times, run it repeat times and step through it repeat times. Step sessions
+        go on to the end of the program: the board ignores any other command until then. Returns the report.
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeat):
+                self.interface.load_program(words)
+                self.uploads.append(self.interface.upload_stats)
+            for _ in range(repeat):
+                self._command(lambda: self.interface.run_program(ExecMode.RUN), 1)
+            for _ in range(repeat):
+                ended = self._command(lambda: self.interface.run_program(ExecMode.STEP), 1)
+                while not ended:
+                    ended = self._command(self.interface.run_next_step, 1)
+        return self.report()
+
+    def report(self) -> dict:
+        upload_bytes = sum(upload['bytes'] for upload in self.uploads)
+        upload_seconds = sum(upload['seconds'] for upload in self.uploads)
+        return {
+            'baudrate'      : self.uart.baudrate,
+            'timeout'       : self.interface.timeout,
+            'upload'        : {
+                'programs'      : len(self.uploads),
+                'bytes'         : upload_bytes,
+                'bytes_per_sec' : upload_bytes / upload_seconds if upload_seconds > 0 else None,
+                'wire_limit'    : self.uart.baudrate / 10 # bytes/s of an 8N1 link
+            },
+            'latency'       : {name: summarize(times) for name, times in self.interface.latency.items()},
+            'frames'        : {
+                'received'    : self.frames,
+                'expected'    : self.expected_frames,
+                'lost'        : max(0, self.expected_frames - self.frames),
+                'extra'       : max(0, self.frames - self.expected_frames),
+                'dump_errors' : self.dump_errors,
+                **self.interface.parser.stats(), # bytes dropped to resynchronize
+                'per_sec'     : self.frames / self.receive_seconds if self.receive_seconds > 0 else None
+            },
+            'cpu_us_per_frame' : self.cpu_seconds / self.frames * 1e6 if self.frames else None
+        }
+
+def print_report(report: dict):
+    upload = report['upload']
+    frames = report['frames']
+    print(f"Link at {report['baudrate']} baud (wire limit {upload['wire_limit']:.0f} B/s)")
+    print(f"Upload: {upload['programs']} programs, {upload['bytes']} bytes, {upload['bytes_per_sec'] or 0:.0f} B/s")
+    print(f"Frames: {frames['received']} received of {frames['expected']} expected, {frames['lost']} lost, "
+          f"{frames['extra']} extra, {frames['dump_errors']} dump errors, {frames['per_sec'] or 0:.0f} frames/s")
+    print(f"Sync: {frames['discarded_bytes']} bytes discarded, {frames['resyncs']} resyncs")
+    print(f"Host CPU: {report['cpu_us_per_frame'] or 0:.1f} us per frame")
+    print(f"{'Command':<14} {'Count':>6} {'Min (ms)':>9} {'Mean (ms)':>10} {'p95 (ms)':>9} {'Max (ms)':>9}")
+    for name, stats in report['latency'].items():
+        if stats['count']:
+            print(f"{name:<14} {stats['count']:>6} {stats['min'] * 1000:>9.2f} {stats['mean'] * 1000:>10.2f} "
+                  f"{stats['p95'] * 1000:>9.2f} {stats['max'] * 1000:>9.2f}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Profile the UART link to a MIPS32 board.")
+    parser.add_argument('-p', '--port', help="serial port or pty (default: MIPS32_SERIAL_PORT or the USB port)")
+    parser.add_argument('--emulate', action='store_true', help="profile an emulated board paced at --baud")
+    parser.add_argument('-b', '--baud', type=int, default=Uart.baudrate, help="baud rate")
+    parser.add_argument('-t', '--timeout', type=float, default=Utils.RESPONSE_TIMEOUT.value, help="seconds to wait for each response")
+    parser.add_argument('--program', help=".asm program to use (default: a straight line program)")
+    parser.add_argument('--words', type=int, default=DEFAULT_PROGRAM_WORDS, help="size of the default program (instructions)")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="loads, runs and step sessions")
+    parser.add_argument('--json', help="write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    source = profile_program(args.words)
+    if args.program:
+        with open(args.program, 'r') as src:
+            source = src.read()
+    words = mipsAssambler().assemble_to_words(source)
+
+    emulator = None
+    if args.emulate:
+        from board_emulator import BoardEmulator # POSIX only, imported when an emulated board is used
+        emulator = BoardEmulator(baudrate=args.baud)
+        emulator.start()
+        port = emulator.port
+    else:
+        port = get_serial_port(args.port)
+    uart = CountingUart(port, args.baud)
+    try:
+        report = LinkProfiler(uart, args.timeout).run(words, args.repeat)
+    finally:
+        uart.close()
+        if emulator is not None:
+            emulator.stop()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+    lost = report['frames']['lost'] + report['frames']['extra'] + report['frames']['dump_errors'] + report['frames']['discarded_bytes']
+    return 1 if lost else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
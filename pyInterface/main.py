@@ -1,8 +1,14 @@
 from cli import Cli
 from ui import MIPS32UI
+import argparse
 import tkinter as tk
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MIPS32 board interface.")
+    parser.add_argument('--record', help="record the session to this trace file")
+    parser.add_argument('--replay', help="play this trace file back instead of using a board")
+    args = parser.parse_args(argv)
+
     print("Choose the interface:")
     print("1. Command Line Interface (CLI)")
     print("2. Graphical User Interface (GUI)")
@@ -10,11 +16,11 @@ def main():
     choice = input("Enter your choice (1 or 2): ")
     
     if choice == "1":
-        ui = Cli()
-        ui.__init__()
+        ui = Cli(args.replay, args.record)
+        ui.__init__(args.replay, args.record)
     elif choice == "2":
         root = tk.Tk()
-        app = MIPS32UI(root)
+        app = MIPS32UI(root, args.replay, args.record)
         root.mainloop()
     else:
         print("Invalid choice. Exiting.")
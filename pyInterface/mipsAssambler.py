@@ -1,20 +1,26 @@
 import mips_isa as iset
 import re
+import io
+import tempfile
+from array import array
+from image_formats import build_image
 
 class mipsAssambler():
     labels_address_table = {} # {label: address}
     instruction_set = {} # Set of instructions
-    instructions_asm = [] # Instructions in assembly
+    instructions_asm = [] # Instructions in assembly (Instruction IR)
     instructions_machine_code = [] # Instructions in machine code
     current_address = 0
     register_table = {} # {register: address}
     current_line = None
     variables_table = {} # {variable: (type, value)}
+    encoder_table = {} # {instruction: encoder}
 
     def __init__(self):
         self.labels_address_table = {}
         self.instruction_set = iset.instructionTable
         self.register_table = iset.registerTable
+        self.encoder_table = encoderTable
         self.instructions_asm = []
         self.instructions_machine_code = []
         self.variables_table = {}
@@ -22,276 +28,206 @@ class mipsAssambler():
         self.current_line = 1
 
     # Validate the syntax of the assembly code
-    def validate_asm_syntax(self, input: str) -> bool:
-        lines = input.split('\n')
-        lines = [line.strip() for line in lines if line != '']
-        #print(lines)
-        # Split input string into lines
-        for line in lines:
-            #self.current_line += 1
-            if line.startswith("DEFINE"):
-                self.get_variables(line)
-            if not line.startswith("#") and not line.startswith("DEFINE"): # Check if line is a comment
-                self.instructions_asm.append(line)
+    def validate_asm_syntax(self, input: str, verbose: bool = True) -> bool:
+        # Single lexing pass: every later stage works on the Instruction list
+        for line_number, line in enumerate(input.split('\n'), 1):
+            inst = self.tokenize_line(line, line_number)
+            if inst is not None:
+                self.instructions_asm.append(inst)
         if self.validate_operation():
-            print("OPCODES and LABELS Syntax OK!")
-            #print(self.labels_address_table)
+            if verbose:
+                print("OPCODES and LABELS Syntax OK!")
             if self.validate_arguments():
-                self.current_line = 1 # Reset line counter
-                print("ARGUMENTS Syntax OK!")
+                if verbose:
+                    print("ARGUMENTS Syntax OK!")
                 return True
             else:
                 return False
         else :
             return False
+
+    # Split a source line into an Instruction. Comments, blank lines and DEFINEs return None
+    def tokenize_line(self, line: str, line_number: int) -> 'Instruction':
+        self.current_line = line_number
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            return None
+        if line.startswith("DEFINE"):
+            self.get_variables(line)
+            return None
+        label, colon, body = line.partition(':')
+        if colon:
+            label = label.strip()
+            body = body.strip()
+            if not body:
+                raise Invalid_instruction_exception("Empty label on line " + str(line_number) + ": " + label)
+        else:
+            label = None
+            body = line
+        parts = body.split(None, 1)
+        args = tuple(''.join(parts[1].split()).split(',')) if len(parts) == 2 else ()
+        return Instruction(parts[0], args, label, line_number)
         
     # Assemble the code
     def assamble(self, input: str) -> str:
-        self.current_address = 0
-        self.current_line = 1
-        for line in self.instructions_asm:
-            inst = line.split(' ')
-            inst = [item.strip() for item in inst if item != '']
-            #print(self.labels_address_table)
-            machine_code = self.resolve_instruction(inst)
-            #print(machine_code)
-            self.instructions_machine_code.append(machine_code)
-            #print(str(hex(self.current_address*4)) + ": " + self.bin_to_hex(machine_code) + "  " + str(inst))
-            #print(self.bin_to_hex(machine_code))
-            self.current_address += 1
-            self.current_line += 1
+        self.encode()
         self.print_out()
+
+    # Validate and assemble the code straight to an array of 32 bit words
+    def assemble_to_words(self, input: str) -> array:
+        self.validate_asm_syntax(input, verbose=False)
+        self.encode()
+        return array('I', self.instructions_machine_code)
+
+    # Translate every validated instruction to its machine code word
+    def encode(self):
+        for address, inst in enumerate(self.instructions_asm):
+            self.current_address = address
+            self.current_line = inst.line
+            self.instructions_machine_code.append(self.resolve_instruction(inst))
         
-    # Validate the operation of the instructions
+    # Validate the operation of the instructions and assign an address to the labels
     def validate_operation(self) -> bool:
-        for inst in self.instructions_asm:
-            inst_parts = inst.split(' ')
-            # Remove empty strings from list
-            inst_parts = [item.strip() for item in inst_parts if item != '']
-            if inst_parts[0] in self.instruction_set:
-                self.current_line += 1
-            else: # if is not an instruction, check if it is a label
-                if ':' in inst_parts[0]:
-                    inst_parts[0] = inst_parts[0].replace(':', '')
-                    self.labels_address_table[inst_parts[0]] = self.current_address
-                    self.current_line += 1
-                else:
-                    raise Invalid_instruction_exception("Invalid instruction on line " + str(self.current_line) + ": " + inst_parts[0])
-            self.current_address += 1 # Increment address 
+        for address, inst in enumerate(self.instructions_asm):
+            self.validate_instruction_operation(inst, address)
         return True
+
+    def validate_instruction_operation(self, inst: 'Instruction', address: int):
+        if inst.mnemonic not in self.instruction_set:
+            raise Invalid_instruction_exception("Invalid instruction on line " + str(inst.line) + ": " + inst.mnemonic)
+        if inst.label is not None:
+            self.labels_address_table[inst.label] = address
     
     # Validate the arguments of the instructions
     def validate_arguments(self) -> bool:
         for inst in self.instructions_asm:
-            inst = inst.split(' ')
-            inst = [item.strip() for item in inst if item != '']
-            if len(inst) == 3: # Label: OP arg1,arg2,arg3
-                op = inst[1]
-                args = inst[2].split(',')
-                if op not in self.instruction_set:
-                    raise Invalid_instruction_exception("Invalid instruction on line " + str(self.current_line) + ": " + op)
-                
-            elif len(inst) == 2: # Op arg1,arg2,arg3 o Op Label
-                args = inst[1].split(',')
-                if len(args) == 1:
-                    if args[0] not in self.labels_address_table and args[0] not in self.variables_table and args[0] not in self.register_table:
-                        raise Label_not_found_exception("Label not found on line " + str(self.current_line) + ": " + args[0])
-            self.current_line += 1
+            self.validate_instruction_arguments(inst)
         return True
-                
-    # Resolve the instruction to machine code
-    def resolve_instruction(self, inst: str) -> str:
-        if inst[0] in self.instruction_set:
-            if self.instruction_set[inst[0]][0] == str(iset.OP_CODE_R): # R type instruction
-                #print("R type instruction: " + str(inst))
-                mach_code_r_type = self.resolve_R_type(inst)
-                return mach_code_r_type
-            elif (self.instruction_set[inst[0]][0] == str(iset.OP_CODE_J) or self.instruction_set[inst[0]][0] == str(iset.OP_CODE_JAL)): # J type instruction
-                mach_code_j_type = self.resolve_J_type(inst)
-                return mach_code_j_type
-            elif inst[0] == 'NOP' or inst[0] == 'HALT':
-                return self.translate_to_bin(self.instruction_set[inst[0]][0], 32)
-            else: # I type instruction
-                mach_code_i_type = self.resolve_I_type(inst)
-                return mach_code_i_type
+
+    def validate_instruction_arguments(self, inst: 'Instruction'):
+        if len(inst.args) != len(iset.formatTable[inst.mnemonic]):
+            raise Invalid_instruction_exception("Wrong number of arguments on line " + str(inst.line) + ": " + str(inst))
+        if len(inst.args) == 1: # Op Label
+            arg = inst.args[0]
+            if arg not in self.labels_address_table and arg not in self.variables_table and arg not in self.register_table:
+                raise Label_not_found_exception("Label not found on line " + str(inst.line) + ": " + arg)
+
+    # Streaming mode: yield the machine code of a program given as an open file or any iterable of lines.
+    # Only labels and variables are kept in memory, so memory use does not depend on the program length
+    def assemble_stream(self, source):
+        for _, machine_code, _ in self.stream_instructions(source):
+            yield machine_code
+
+    # Streaming mode: yield (address, machine code, instruction) for every instruction of the source
+    def stream_instructions(self, source):
+        if isinstance(source, str):
+            source = io.StringIO(source)
+        spool = None
+        if hasattr(source, 'seek') and source.seekable(): # Files are rewound for the second pass
+            start = source.tell()
+            self.scan_labels(source)
+            source.seek(start)
+        elif iter(source) is source: # One-shot iterators are spooled to disk for the second pass
+            spool = tempfile.TemporaryFile('w+')
+            self.scan_labels(self.spool_lines(source, spool))
+            spool.seek(0)
+            source = spool
         else:
-            label = inst[0].replace(':', '')
-            if label in self.labels_address_table:
-                inst_label = [inst[1], inst[2]]
-                label_mach_code = self.resolve_instruction(inst_label)
-                return label_mach_code
+            self.scan_labels(source)
+        try:
+            address = 0
+            for line_number, line in enumerate(source, 1):
+                inst = self.tokenize_line(line, line_number)
+                if inst is None:
+                    continue
+                self.validate_instruction_arguments(inst)
+                self.current_address = address
+                yield address, self.resolve_instruction(inst), inst
+                address += 1
+        finally:
+            if spool is not None:
+                spool.close()
+
+    # First pass of the streaming mode: collect labels and DEFINEs without keeping the instructions
+    def scan_labels(self, lines) -> int:
+        address = 0
+        for line_number, line in enumerate(lines, 1):
+            inst = self.tokenize_line(line, line_number)
+            if inst is not None:
+                self.validate_instruction_operation(inst, address)
+                address += 1
+        return address
+
+    # Copy the lines to the spool file while they are scanned
+    def spool_lines(self, lines, spool):
+        for line in lines:
+            line = line.rstrip('\n')
+            spool.write(line + '\n')
+            yield line
                 
-    # Resolve the R type instructions
-    def resolve_R_type(self, inst: str) -> str:
-        args = inst[1].split(',')
-        if len(args) == 3:
-            if (inst[0] == 'SLL' or inst[0] == 'SRL' or inst[0] == 'SRA'):
-                # XXXX $rd, $rt, shamt
-                rs = self.dec_to_bin(0, 5)
-                rt = self.to_register(args[1])
-                rd = self.to_register(args[0])
-                shamt = self.dec_to_bin(int(args[2]), 5)
-                func = self.instruction_set[inst[0]][1]
-                machine_code = self.instruction_set[inst[0]][0] + rs + rt + rd + shamt + func
-                return machine_code
-            
-            elif (inst[0] == 'SLLV' or inst[0] == 'SRLV' or inst[0] == 'SRAV'):
-                # XXXX $rd, $rt, $rs
-                rd = self.to_register(args[0])
-                rs = self.to_register(args[1])
-                rt = self.to_register(args[2])
-                shamt = self.dec_to_bin(0, 5)
-                func = self.instruction_set[inst[0]][1]
-                machine_code = self.instruction_set[inst[0]][0] + rs + rt + rd + shamt + func
-                return machine_code
-        
-            else: #From ADDU to SLT
-                # XXXX $rd, $rs, $rt
-                rd = self.to_register(args[0])
-                rs = self.to_register(args[1])
-                rt = self.to_register(args[2])
-                shamt = self.dec_to_bin(0, 5)
-                func = self.instruction_set[inst[0]][1]
-                machine_code = self.instruction_set[inst[0]][0] + rs + rt + rd + shamt + func
-                return machine_code
+    # Resolve the instruction to machine code with the encoder of its format
+    def resolve_instruction(self, inst: 'Instruction') -> int:
+        return self.encoder_table[inst.mnemonic](self, inst.args)
+
+    # Operand encoders: each one returns the operand bits already placed in the instruction word
+    def encode_rd(self, arg: str) -> int:
+        return self.to_register(arg, iset.rdFieldTable)
+
+    def encode_rs(self, arg: str) -> int:
+        return self.to_register(arg, iset.rsFieldTable)
+
+    def encode_rt(self, arg: str) -> int:
+        return self.to_register(arg, iset.rtFieldTable)
+
+    def encode_shamt(self, arg: str) -> int:
+        return (self.translate_to_int(arg) & iset.SHAMT_MASK) << iset.SHAMT_SHIFT
+
+    def encode_inm(self, arg: str) -> int:
+        return self.translate_to_int(arg) & iset.INM_MASK
+
+    def encode_mem(self, arg: str) -> int:
+        inm, rs = self.get_reg_and_offset(arg)
+        return inm | rs
+
+    def encode_branch(self, arg: str) -> int:
+        if arg in self.labels_address_table:
+            dir_dest = self.labels_address_table[arg]
         else:
-            if inst[0] == 'JALR': #rd = R31 = PC + 4; rs = PC 
-                # JARL $rd, $rs
-                rd = self.to_register(args[0])
-                rs = self.to_register(args[1])
-                rt = self.dec_to_bin(0, 5)
-                shamt = self.dec_to_bin(0, 5)
-                func = self.instruction_set[inst[0]][1]
-                machine_code = self.instruction_set[inst[0]][0] + rs + rt + rd + shamt + func
-                return machine_code
-            
-            elif inst[0] == 'JR': #PC = Rs
-                # JR $rs
-                rs = self.to_register(args[0])
-                rt = self.dec_to_bin(0, 5)
-                rd = self.dec_to_bin(0, 5)
-                shamt = self.dec_to_bin(0, 5)
-                func = self.instruction_set[inst[0]][1]
-                machine_code = self.instruction_set[inst[0]][0] + rs + rt + rd + shamt + func
-                return machine_code
-
-    # Resolve the J type instructions        
-    def resolve_J_type(self, inst: str) -> str:
-        if inst[0] == 'J':
-            # J DIR
-            if inst[1] in self.labels_address_table:
-                dir = self.translate_to_bin(str(self.labels_address_table[inst[1]]), 26)
-            else:
-                dir = self.translate_to_bin(inst[1], 26)
-            machine_code = self.instruction_set[inst[0]][0] + dir
-            return machine_code
-        if inst[0] == 'JAL':
-            # JAL DIR
-            if inst[1] in self.labels_address_table:
-                dir = self.translate_to_bin(str(self.labels_address_table[inst[1]]), 26)
-            else:
-                dir = self.translate_to_bin(inst[1], 26)
-            machine_code = self.instruction_set[inst[0]][0] + dir
-            return machine_code
-
-    # Resolve the I type instructions            
-    def resolve_I_type(self, inst: str) -> str:
-        args = inst[1].split(',')
-        #print("I-type: " + str(args))
-        if inst[0] == 'BNE' or inst[0] == 'BEQ':
-            # BXX $rs, $rt, INM
-            rs = self.to_register(args[0])
-            rt = self.to_register(args[1])
-            dir_src = self.bin_rezise(str(self.current_address), 16)
-            if args[2] in self.labels_address_table:
-                dir_dest = self.bin_rezise(str(self.labels_address_table[args[2]]), 16)
-            else:
-                dir_dest = self.translate_to_bin(args[2], 16)
-            inm = self.calculate_offset(dir_dest, dir_src)
-            return self.instruction_set[inst[0]][0] + rs + rt + inm
-        
-        if inst[0] in iset.load_and_store_inst: # XXXX $rt, INM($rs)
-            opcode = self.instruction_set[inst[0]][0]
-            rt = self.to_register(args[0])
-            inm, rs = self.get_reg_and_offset(args[1])
-            return opcode + rs + rt + inm
-        
-        if inst[0] == 'LUI': # LUI $rt, INM
-            opcode = self.instruction_set[inst[0]][0]
-            rt = self.to_register(args[0])
-            inm = self.translate_to_bin(args[1], 16)
-            return opcode + self.dec_to_bin(0, 5) + rt + inm
-        else:# XXXX $rt, $rs, INM
-            opcode = self.instruction_set[inst[0]][0]
-            rt = self.to_register(args[0])
-            rs = self.to_register(args[1])
-            inm = self.translate_to_bin(args[2], 16)
-            return opcode + rs + rt + inm
+            dir_dest = self.translate_to_int(arg)
+        return self.calculate_offset(dir_dest, self.current_address)
+
+    def encode_target(self, arg: str) -> int:
+        if arg in self.labels_address_table:
+            dir = self.labels_address_table[arg]
+        else:
+            dir = self.translate_to_int(arg)
+        return dir & iset.DIR_MASK
 
     # Calculate the offset of the branch instructions        
-    def calculate_offset(self, dest: str, src: str) -> str:
-        offset = int(dest, 16) - (int(src, 16) + 1) # + 1 porque se calcula el offset con respecto a la siguiente instrucción
+    def calculate_offset(self, dest: int, src: int) -> int:
+        offset = dest - (src + 1) # + 1 porque se calcula el offset con respecto a la siguiente instrucción
         if offset < -32768 or offset > 32767:
             raise ValueError("Offset out of range")
-        return self.dec_to_bin(offset, 16)
-
-
-    # Hexadecimal to binary
-    def hex_to_bin(self, hexnum: str, size: int) -> str:
-        intnum = int(hexnum, 16)
-        binnum = bin(intnum)[2:]
-        binnum_filled = binnum.zfill(size)
-        return binnum_filled
-
-    # Binary to hexadecimal
-    def bin_to_hex(self, binum: str) -> str:
-        intnum = int(binum, 2)
-        hexnum = hex(intnum)[2:]
-        hexnum_32 = hexnum.zfill(8)
-        return '0x' + hexnum_32
-        
-    # Decimal to binary
-    def dec_to_bin(self, num: str, size: int) -> int:
-        num = int(num)
-        if num < 0:
-            bin = format((1 << size) + num, '0{}b'.format(size))
-        else:
-            bin = format(num, '0{}b'.format(size))
-        return bin
-    
-    # 0b0 bin format to binary
-    def Ob_to_bin(self, num: str, size: int) -> str:
-        num_int = int(num, 2)
-        bin_str = format(num_int, '0{}b'.format(size))
-        return bin_str
-
-    # Get register to binary address
-    def to_register(self, reg: str) -> str:
-        if reg in self.register_table:
-            return self.dec_to_bin(self.register_table[reg], 5)
+        return offset & iset.INM_MASK
+
+    # Get the register field, already shifted to its position in the instruction
+    def to_register(self, reg: str, field_table: dict) -> int:
+        if reg in field_table:
+            return field_table[reg]
         else:
             raise Invalid_reg_exception("Invalid register on line " + str(self.current_line) + ": " + reg)
-    
-    # Resize binary number
-    def bin_rezise(self, binum: str, size: int) -> str:
-        if len(binum) < size:
-            binum_filled = binum.zfill(size)
-            return binum_filled
-        elif len(binum) > size:
-            binum_resized = binum[-size:]
-            return binum_resized
 
     # Extraer el registro y el offset de una cadena de texto. Formato: offset(registro)
-    def get_reg_and_offset(self, reg: str) -> (str, str):
+    def get_reg_and_offset(self, reg: str) -> (int, int):
         match = re.match(r'([0-9]+|0x[0-9a-fA-F]+|0b[01]+|\w+)\((\w+)\)', reg)
         if match:
             inm = match.group(1)
             rx = match.group(2)
             if inm in self.variables_table:
-                inm = self.translate_to_bin(str(self.variables_table[inm][1]), 16)
+                inm = self.variables_table[inm][1] & iset.INM_MASK
             else:
-                inm = self.translate_to_bin(inm, 16)
-            rx = self.to_register(rx)
+                inm = self.translate_to_int(inm) & iset.INM_MASK
+            rx = self.to_register(rx, iset.rsFieldTable)
             return inm, rx
         else:
             raise ValueError("El formato de entrada no es válido")
@@ -349,29 +285,93 @@ class mipsAssambler():
         # Imprimir o almacenar las variables extraídas
         self.variables_table[name] = (int_type, value)
     
-    # Translate any number to binary
-    def translate_to_bin(self, value: str, size: int) -> str:
+    # Translate any number (decimal, hexadecimal or binary) to int
+    def translate_to_int(self, value: str) -> int:
         if value.startswith("0x"):
-            return self.hex_to_bin(value, size)
+            return int(value, 16)
         elif value.startswith("0b"):
-            return self.Ob_to_bin(value, size)
+            return int(value, 2)
         else:
-            return self.dec_to_bin(value, size)
+            return int(value)
 
     def print_out(self):
-        print(f"{'Address':<8} {'Machine Code':<15} {'Instruction':<20}")
-        print("-" * 43)
-        for i in range(len(self.instructions_machine_code)):
-            address = f"{hex(i*4)}:"
-            hex_code = self.bin_to_hex(self.instructions_machine_code[i])
-            instruction = self.instructions_asm[i]
-            print(f"{address:<8} {hex_code:<15} {instruction:<20}")
+        print_listing(self.listing_rows())
+
+    # (address, machine code, instruction) rows of the assembled program
+    def listing_rows(self):
+        return zip(range(len(self.instructions_machine_code)), self.instructions_machine_code, self.instructions_asm)
 
     def get_compiled_code(self):
-        code = []
-        for line in self.instructions_machine_code:
-            code.append(self.bin_to_hex(line))
-        return code
+        return [f"0x{code:08x}" for code in self.instructions_machine_code]
+
+    # Image of the compiled code in one of the formats of image_formats (bin-be, bin-le, ihex, mem, coe)
+    def get_image(self, fmt: str = 'bin-be') -> bytes:
+        return build_image(array('I', self.instructions_machine_code), fmt)
+
+# Print (address, machine code, instruction) rows, as produced by stream_instructions
+def print_listing(rows):
+    for line in listing_lines(rows):
+        print(line)
+
+# Format (address, machine code, instruction) rows as the lines of the listing
+def listing_lines(rows):
+    yield f"{'Address':<8} {'Machine Code':<15} {'Instruction':<20}"
+    yield "-" * 43
+    for address, machine_code, inst in rows:
+        address = f"{hex(address*4)}:"
+        hex_code = f"0x{machine_code:08x}"
+        instruction = str(inst)
+        yield f"{address:<8} {hex_code:<15} {instruction:<20}"
+
+# Compact representation of one assembly line: instruction, operands, label and source line
+class Instruction():
+    __slots__ = ('mnemonic', 'args', 'label', 'line')
+
+    def __init__(self, mnemonic: str, args: tuple, label: str, line: int):
+        self.mnemonic = mnemonic
+        self.args = args
+        self.label = label
+        self.line = line
+
+    def __str__(self):
+        text = self.mnemonic + ' ' + ','.join(self.args) if self.args else self.mnemonic
+        return self.label + ': ' + text if self.label is not None else text
+
+# Operand kind of the format descriptors -> operand encoder
+operandEncoderTable = {
+    iset.RD     : mipsAssambler.encode_rd,
+    iset.RS     : mipsAssambler.encode_rs,
+    iset.RT     : mipsAssambler.encode_rt,
+    iset.SHAMT  : mipsAssambler.encode_shamt,
+    iset.INM    : mipsAssambler.encode_inm,
+    iset.MEM    : mipsAssambler.encode_mem,
+    iset.BRANCH : mipsAssambler.encode_branch,
+    iset.TARGET : mipsAssambler.encode_target
+}
+
+# Build the encoder of one instruction from its fixed fields and operand layout
+def build_encoder(fixed: int, layout: tuple):
+    if not layout:
+        return lambda assembler, args: fixed
+    operand_encoders = tuple(operandEncoderTable[kind] for kind in layout)
+    if len(operand_encoders) == 1:
+        encode_a, = operand_encoders
+        return lambda assembler, args: fixed | encode_a(assembler, args[0])
+    if len(operand_encoders) == 2:
+        encode_a, encode_b = operand_encoders
+        return lambda assembler, args: fixed | encode_a(assembler, args[0]) | encode_b(assembler, args[1])
+    if len(operand_encoders) == 3:
+        encode_a, encode_b, encode_c = operand_encoders
+        return lambda assembler, args: fixed | encode_a(assembler, args[0]) | encode_b(assembler, args[1]) | encode_c(assembler, args[2])
+    def encoder(assembler, args):
+        machine_code = fixed
+        for encode, arg in zip(operand_encoders, args):
+            machine_code |= encode(assembler, arg)
+        return machine_code
+    return encoder
+
+# Dispatch table built once at import: {instruction: encoder}
+encoderTable = {inst: build_encoder(iset.fixedFieldTable[inst], iset.formatTable[inst]) for inst in iset.instructionTable}
 
 class Invalid_instruction_exception(Exception):
     def __init__(self, msj):
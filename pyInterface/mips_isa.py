@@ -1,4 +1,5 @@
 # INSTRUCTION SET ARCHITECTURE FOR MIPS32
+import hashlib
 
 OP_CODE_R      = '000000'
 OP_CODE_J      = '000010'
@@ -86,6 +87,63 @@ instructionTable = {
 
 load_and_store_inst = ['LB', 'LH', 'LW', 'LBU', 'LHU', 'SB', 'SH', 'SW', 'LWU']
 
+# Operand kinds of the format descriptors
+RD     = 'rd'      # Register in the rd field
+RS     = 'rs'      # Register in the rs field
+RT     = 'rt'      # Register in the rt field
+SHAMT  = 'shamt'   # Shift amount
+INM    = 'inm'     # 16 bit immediate
+MEM    = 'inm(rs)' # 16 bit offset and base register
+BRANCH = 'branch'  # Label or address, encoded as an offset from PC + 4
+TARGET = 'target'  # Label or address, encoded as a 26 bit jump target
+
+# Operand layout of every instruction, in the order they are written in assembly.
+# Fixed fields come from instructionTable, so a new instruction only needs an entry in both tables
+formatTable = {
+    #R type
+    'SLL'  : ( RD, RT, SHAMT ),  # SLL rd,rt,shamt
+    'SRL'  : ( RD, RT, SHAMT ),
+    'SRA'  : ( RD, RT, SHAMT ),
+    'SLLV' : ( RD, RS, RT    ),  # SLLV rd,rs,rt
+    'SRLV' : ( RD, RS, RT    ),
+    'SRAV' : ( RD, RS, RT    ),
+    'ADDU' : ( RD, RS, RT    ),
+    'SUBU' : ( RD, RS, RT    ),
+    'AND'  : ( RD, RS, RT    ),
+    'OR'   : ( RD, RS, RT    ),
+    'XOR'  : ( RD, RS, RT    ),
+    'NOR'  : ( RD, RS, RT    ),
+    'SLT'  : ( RD, RS, RT    ),
+    'JALR' : ( RD, RS        ),  # JALR rd,rs
+    'JR'   : ( RS,           ),  # JR rs
+
+    #I type
+    'LB'   : ( RT, MEM       ),  # LB rt,inm(rs)
+    'LH'   : ( RT, MEM       ),
+    'LW'   : ( RT, MEM       ),
+    'LWU'  : ( RT, MEM       ),
+    'LBU'  : ( RT, MEM       ),
+    'LHU'  : ( RT, MEM       ),
+    'SB'   : ( RT, MEM       ),
+    'SH'   : ( RT, MEM       ),
+    'SW'   : ( RT, MEM       ),
+    'ADDI' : ( RT, RS, INM   ),  # ADDI rt,rs,inm
+    'ANDI' : ( RT, RS, INM   ),
+    'ORI'  : ( RT, RS, INM   ),
+    'XORI' : ( RT, RS, INM   ),
+    'LUI'  : ( RT, INM       ),  # LUI rt,inm
+    'SLTI' : ( RT, RS, INM   ),
+    'BEQ'  : ( RS, RT, BRANCH ), # BEQ rs,rt,label
+    'BNE'  : ( RS, RT, BRANCH ),
+
+    #J type
+    'J'    : ( TARGET, ),        # J label
+    'JAL'  : ( TARGET, ),
+
+    'NOP'  : (),
+    'HALT' : ()
+}
+
 registerTable = {
     'r0'  : 0,
     'r1'  : 1,
@@ -120,3 +178,37 @@ registerTable = {
     'r30' : 30,
     'r31' : 31
 }
+
+# Bit-field layout of a 32 bit instruction word
+OPCODE_SHIFT = 26
+RS_SHIFT     = 21
+RT_SHIFT     = 16
+RD_SHIFT     = 11
+SHAMT_SHIFT  = 6
+SHAMT_MASK   = 0x1f
+INM_MASK     = 0xffff
+DIR_MASK     = 0x3ffffff
+
+# Translate a field of the tables above (binary string or '0x' literal) to int
+def field_value(code: str) -> int:
+    if code.startswith('0x'):
+        return int(code, 16)
+    return int(code, 2)
+
+# Fixed bits of an instruction (opcode and func code), ready to be OR-ed with its operands
+def fixed_fields(fields: list) -> int:
+    if fields[0].startswith('0x'): # NOP and HALT are full words
+        return field_value(fields[0])
+    if fields[0] == OP_CODE_R:
+        return (field_value(fields[0]) << OPCODE_SHIFT) | field_value(fields[1])
+    return field_value(fields[0]) << OPCODE_SHIFT
+
+fixedFieldTable = {inst: fixed_fields(fields) for inst, fields in instructionTable.items()}
+
+# Register numbers already shifted to the rs, rt and rd positions
+rsFieldTable = {reg: num << RS_SHIFT for reg, num in registerTable.items()}
+rtFieldTable = {reg: num << RT_SHIFT for reg, num in registerTable.items()}
+rdFieldTable = {reg: num << RD_SHIFT for reg, num in registerTable.items()}
+
+# Fingerprint of the tables above, changes whenever the encoding of any instruction changes
+ISA_VERSION = hashlib.sha256(repr((instructionTable, formatTable, registerTable)).encode()).hexdigest()[:16]
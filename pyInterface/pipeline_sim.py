@@ -0,0 +1,448 @@
+import argparse
+import sys
+import time
+from array import array
+import mips_isa as iset
+from mipsAssambler import mipsAssambler
+
+# Sizes of the memories as instantiated in TOP.v
+INSTRUCTION_MEMORY_WORDS = 64
+DATA_MEMORY_ADDR_SIZE = 5
+DATA_MEMORY_WORDS = 2 ** DATA_MEMORY_ADDR_SIZE
+DATA_MEMORY_ADDR_MASK = DATA_MEMORY_WORDS - 1
+REGISTERS_BANK_SIZE = 32
+WORD_MASK = 0xffffffff
+CLK_COUNTER_MASK = 0xff # the debug unit reports an 8 bit cycle counter
+DEFAULT_MAX_CYCLES = 1000000
+HALT_WORD = iset.fixedFieldTable['HALT']
+
+def _op(inst: str) -> int:
+    return iset.field_value(iset.instructionTable[inst][0])
+
+def _funct(inst: str) -> int:
+    return iset.field_value(iset.instructionTable[inst][1])
+
+OP_R, OP_J, OP_JAL, OP_BEQ, OP_BNE = _op('SLL'), _op('J'), _op('JAL'), _op('BEQ'), _op('BNE')
+OP_HALT = HALT_WORD >> iset.OPCODE_SHIFT
+FUNCT_JR, FUNCT_JALR = _funct('JR'), _funct('JALR')
+
+# Opcodes that make hazard_detection.v stall the next instruction (LUI included, as in the RTL)
+LOAD_OPS = frozenset(_op(inst) for inst in ('LW', 'LB', 'LBU', 'LH', 'LHU', 'LUI', 'LWU'))
+
+# Control signal encodings of ctrl_unit.v ('don't care' values are modelled as 0)
+REG_DST_RT, REG_DST_RD, REG_DST_GPR_31 = 0, 1, 2
+SRC_A_SHAMT, SRC_A_BUS_A = 0, 1
+SRC_B_NEXT_SEQ_PC, SRC_B_UPPER_INM, SRC_B_SIG_INM, SRC_B_USIG_INM, SRC_B_BUS_B = 0, 1, 2, 3, 4
+MEM_RD_WORD, MEM_RD_SIG_HALF, MEM_RD_SIG_BYTE, MEM_RD_USIG_HALF, MEM_RD_USIG_BYTE = 0, 1, 2, 3, 4
+MEM_WR_WORD, MEM_WR_HALF, MEM_WR_BYTE = 0, 1, 2
+MEM_TO_REG_MEM, MEM_TO_REG_ALU = 0, 1
+ALU_OP_LOAD, ALU_OP_BRANCH, ALU_OP_ANDI, ALU_OP_ORI, ALU_OP_XORI, ALU_OP_SLTI, ALU_OP_R_TYPE, ALU_OP_JUMP = range(8)
+
+# Source of the next PC decided in ID
+NPC_SEQ, NPC_BEQ, NPC_BNE, NPC_DIR, NPC_REG = range(5)
+
+# ctrl_unit.v: {opcode: (next pc, reg dst, ALU source A, ALU source B, ALU op, mem read src, mem write src, mem write, wb, mem to reg)}
+ctrlTable = {
+    _op('LB')   : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   MEM_RD_SIG_BYTE,  0,           0, 1, MEM_TO_REG_MEM),
+    _op('LH')   : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   MEM_RD_SIG_HALF,  0,           0, 1, MEM_TO_REG_MEM),
+    _op('LW')   : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   MEM_RD_WORD,      0,           0, 1, MEM_TO_REG_MEM),
+    _op('LWU')  : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   MEM_RD_WORD,      0,           0, 1, MEM_TO_REG_MEM),
+    _op('LBU')  : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   MEM_RD_USIG_BYTE, 0,           0, 1, MEM_TO_REG_MEM),
+    _op('LHU')  : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   MEM_RD_USIG_HALF, 0,           0, 1, MEM_TO_REG_MEM),
+    _op('SB')   : (NPC_SEQ, 0,          SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   0,                MEM_WR_BYTE, 1, 0, 0),
+    _op('SH')   : (NPC_SEQ, 0,          SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   0,                MEM_WR_HALF, 1, 0, 0),
+    _op('SW')   : (NPC_SEQ, 0,          SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   0,                MEM_WR_WORD, 1, 0, 0),
+    _op('ADDI') : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_LOAD,   0,                0,           0, 1, MEM_TO_REG_ALU),
+    _op('ANDI') : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_USIG_INM,  ALU_OP_ANDI,   0,                0,           0, 1, MEM_TO_REG_ALU),
+    _op('ORI')  : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_USIG_INM,  ALU_OP_ORI,    0,                0,           0, 1, MEM_TO_REG_ALU),
+    _op('XORI') : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_USIG_INM,  ALU_OP_XORI,   0,                0,           0, 1, MEM_TO_REG_ALU),
+    _op('LUI')  : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_UPPER_INM, ALU_OP_LOAD,   0,                0,           0, 1, MEM_TO_REG_ALU),
+    _op('SLTI') : (NPC_SEQ, REG_DST_RT, SRC_A_BUS_A, SRC_B_SIG_INM,   ALU_OP_SLTI,   0,                0,           0, 1, MEM_TO_REG_ALU),
+    OP_BEQ      : (NPC_BEQ, 0,          0,           0,               ALU_OP_BRANCH, 0,                0,           0, 0, 0),
+    OP_BNE      : (NPC_BNE, 0,          0,           0,               ALU_OP_BRANCH, 0,                0,           0, 0, 0),
+    OP_J        : (NPC_DIR, 0,          0,           0,               ALU_OP_JUMP,   0,                0,           0, 0, 0),
+    OP_JAL      : (NPC_DIR, REG_DST_GPR_31, 0,   SRC_B_NEXT_SEQ_PC,   ALU_OP_JUMP,   0,                0,           0, 1, MEM_TO_REG_ALU)
+}
+
+# ctrl_unit.v, R type: {funct: control}, every other funct uses R_TYPE_CTRL
+rTypeCtrlTable = {
+    _funct('SLL') : (NPC_SEQ, REG_DST_RD, SRC_A_SHAMT, SRC_B_BUS_B, ALU_OP_R_TYPE, 0, 0, 0, 1, MEM_TO_REG_ALU),
+    _funct('SRL') : (NPC_SEQ, REG_DST_RD, SRC_A_SHAMT, SRC_B_BUS_B, ALU_OP_R_TYPE, 0, 0, 0, 1, MEM_TO_REG_ALU),
+    _funct('SRA') : (NPC_SEQ, REG_DST_RD, SRC_A_SHAMT, SRC_B_BUS_B, ALU_OP_R_TYPE, 0, 0, 0, 1, MEM_TO_REG_ALU),
+    FUNCT_JR      : (NPC_REG, 0,          0,           0,           ALU_OP_R_TYPE, 0, 0, 0, 0, 0),
+    FUNCT_JALR    : (NPC_REG, REG_DST_GPR_31, SRC_A_BUS_A, SRC_B_NEXT_SEQ_PC, ALU_OP_R_TYPE, 0, 0, 0, 1, MEM_TO_REG_ALU)
+}
+R_TYPE_CTRL = (NPC_SEQ, REG_DST_RD, SRC_A_BUS_A, SRC_B_BUS_B, ALU_OP_R_TYPE, 0, 0, 0, 1, MEM_TO_REG_ALU)
+NO_CTRL = (NPC_SEQ, 0, 0, 0, ALU_OP_LOAD, 0, 0, 0, 0, 0) # NOP, HALT and unknown opcodes
+
+def _signed(value: int) -> int:
+    return value - ((value & 0x80000000) << 1)
+
+# ALU.v: {ALU control code: function(A, B)}. Shifts by 32 or more give 0 (or the sign) as in Verilog
+aluTable = {
+    _funct('SLL')  : lambda a, b: (b << a) & WORD_MASK if a < 32 else 0,
+    _funct('SRL')  : lambda a, b: b >> a,
+    _funct('SRA')  : lambda a, b: (_signed(b) >> a) & WORD_MASK,
+    0b100000       : lambda a, b: (a + b) & WORD_MASK, # ADD
+    _funct('ADDU') : lambda a, b: (a + b) & WORD_MASK,
+    0b100010       : lambda a, b: (a - b) & WORD_MASK, # SUB
+    _funct('SUBU') : lambda a, b: (a - b) & WORD_MASK,
+    _funct('AND')  : lambda a, b: a & b,
+    _funct('OR')   : lambda a, b: a | b,
+    _funct('XOR')  : lambda a, b: a ^ b,
+    _funct('NOR')  : lambda a, b: ~(a | b) & WORD_MASK,
+    _funct('SLT')  : lambda a, b: int(_signed(a) < _signed(b)),
+    _funct('SLLV') : lambda a, b: (a << b) & WORD_MASK if b < 32 else 0,
+    _funct('SRLV') : lambda a, b: a >> b,
+    _funct('SRAV') : lambda a, b: (_signed(a) >> b) & WORD_MASK,
+    FUNCT_JALR     : lambda a, b: b # SC_B: short circuit B (return address of JAL and JALR)
+}
+_alu_none = lambda a, b: 0 # high impedance output of undefined ALU controls
+
+# ALU_ctrl.v: {ALU op: ALU control code}, R type uses the funct field
+aluCtrlTable = {
+    ALU_OP_LOAD : 0b100000,
+    ALU_OP_JUMP : FUNCT_JALR,
+    ALU_OP_ANDI : _funct('AND'),
+    ALU_OP_ORI  : _funct('OR'),
+    ALU_OP_XORI : _funct('XOR'),
+    ALU_OP_SLTI : _funct('SLT')
+}
+
+# Operand B kinds of the EX stage
+B_CONST, B_BUS_B, B_NEXT_SEQ_PC = 0, 1, 2
+
+def decode(word: int) -> tuple:
+    """
+    Decode an instruction word once into everything the ID and EX stages need:
+    (rs, rt, rd, jump stop, halt, next pc source, jump target, branch offset, EX fields, EX fields of a stall bubble).
+    EX fields are (rs, rt, is load, wb, mem write, destination, ALU function, shamt or -1, B kind, B constant,
+    mem read src, mem write src, mem to reg).
+    """
+    op = word >> iset.OPCODE_SHIFT
+    rs = (word >> iset.RS_SHIFT) & 0x1f
+    rt = (word >> iset.RT_SHIFT) & 0x1f
+    rd = (word >> iset.RD_SHIFT) & 0x1f
+    shamt = (word >> iset.SHAMT_SHIFT) & iset.SHAMT_MASK
+    funct = word & 0x3f
+    inm = word & iset.INM_MASK
+    inm_signed = inm | 0xffff0000 if inm & 0x8000 else inm
+
+    if word == 0:
+        ctrl = NO_CTRL
+    elif op == OP_R:
+        ctrl = rTypeCtrlTable.get(funct, R_TYPE_CTRL)
+    else:
+        ctrl = ctrlTable.get(op, NO_CTRL)
+    npc, reg_dst, src_a, src_b, alu_op, mem_rd, mem_wr, mem_write, wb, mem_to_reg = ctrl
+
+    alu_code = funct if alu_op == ALU_OP_R_TYPE else aluCtrlTable.get(alu_op)
+    dest = (rt, rd, 31)[reg_dst]
+    b_kind, b_const = {
+        SRC_B_NEXT_SEQ_PC : (B_NEXT_SEQ_PC, 0),
+        SRC_B_UPPER_INM   : (B_CONST, inm << 16),
+        SRC_B_SIG_INM     : (B_CONST, inm_signed),
+        SRC_B_USIG_INM    : (B_CONST, inm),
+        SRC_B_BUS_B       : (B_BUS_B, 0)
+    }[src_b]
+    is_load = op in LOAD_OPS
+    ex = (rs, rt, is_load, wb, mem_write, dest, aluTable.get(alu_code, _alu_none),
+          shamt if src_a == SRC_A_SHAMT else -1, b_kind, b_const, mem_rd, mem_wr, mem_to_reg)
+    bubble = (rs, rt, is_load, 0, 0, dest, _alu_none, 0, B_CONST, 0, 0, 0, 0)
+
+    # hazard_detection.v: funct JALR stops for any opcode, funct JR only for R type
+    jump_stop = funct == FUNCT_JALR or (funct == FUNCT_JR and op == OP_R) or op in (OP_BEQ, OP_BNE)
+    return (rs, rt, rd, jump_stop, op == OP_HALT, npc, (word & iset.DIR_MASK) << 2,
+            (inm_signed << 2) & WORD_MASK, ex, bubble)
+
+NOP_DECODED = decode(iset.fixedFieldTable['NOP'])
+
+class PipelineSimulator():
+    def __init__(self, instruction_memory_words: int = INSTRUCTION_MEMORY_WORDS):
+        """
+        Cycle accurate model of the 5 stage pipeline in mips32/sources/cpu (mips.v) and of the state
+        the debug unit reports: 32 registers, 32 data memory words, the PC and the 8 bit cycle counter.
+        """
+        self.instruction_memory_words = instruction_memory_words
+        self.program = array('I', bytes(4 * instruction_memory_words))
+        self.decoded = [NOP_DECODED] * instruction_memory_words
+        self.program_size = 0
+        self.registers = [0] * REGISTERS_BANK_SIZE
+        self.memory = [0] * DATA_MEMORY_WORDS
+        self._decode_cache = {}
+        self.flush()
+
+    def clear_program(self):
+        """
+        Clear the instruction memory (the debug unit does it on every LOAD command).
+        """
+        for i in range(self.instruction_memory_words):
+            self.program[i] = 0
+            self.decoded[i] = NOP_DECODED
+        self.program_size = 0
+
+    def load_program(self, words) -> bool:
+        """
+        Write a program to the instruction memory the way the debug unit does: words are stored
+        until HALT is stored or the memory is full, and no word is taken from words after that.
+        Returns True if the HALT was stored (LOAD_OK), False if the memory got full (or the words ran out) before.
+        """
+        self.clear_program()
+        for word in words:
+            self.program[self.program_size] = word
+            self.decoded[self.program_size] = self._decode(word)
+            self.program_size += 1
+            if word == HALT_WORD:
+                return True
+            if self.program_size == self.instruction_memory_words:
+                return False
+        return False
+
+    def is_empty(self) -> bool:
+        return self.program_size == 0
+
+    def flush(self):
+        """
+        Reset the pipeline latches, PC, registers and data memory (flush sent by the EXEC and EXEC_BY_STEPS commands).
+        The instruction memory is kept.
+        """
+        for i in range(REGISTERS_BANK_SIZE):
+            self.registers[i] = 0
+        for i in range(DATA_MEMORY_WORDS):
+            self.memory[i] = 0
+        # PC, PC frozen by HALT, IF/ID, ID/EX, EX/MEM and MEM/WB latches (see _run)
+        self._latches = (0, False, NOP_DECODED, 0, False,
+                         NOP_DECODED[9], 0, 0, 0, False, False,
+                         0, 0, 0, 0, 0, 0, 0, 0, False,
+                         0, 0, 0, False)
+        self.cycle = 0
+        self.clk_counter = 1
+
+    @property
+    def pc(self) -> int:
+        return self._latches[0]
+
+    @property
+    def end_program(self) -> bool:
+        """
+        HALT reached the MEM/WB latch (o_end_program of mips.v).
+        """
+        return self._latches[-1]
+
+    def step(self) -> bool:
+        """
+        Run one clock cycle, as the NEXT_STEP command does. Returns True once the program has ended.
+        """
+        self._run(1, False)
+        self.clk_counter = (self.clk_counter + 1) & CLK_COUNTER_MASK
+        return self.end_program
+
+    def run(self, max_cycles: int = DEFAULT_MAX_CYCLES) -> bool:
+        """
+        Run until the program ends, as the EXEC command does, or for max_cycles at most.
+        Like the debug unit, the cycle counter stops one cycle after HALT reaches MEM/WB and the CPU is
+        disabled two cycles later. Returns True if the program ended.
+        """
+        cycles = self._run(max_cycles, True)
+        if not self.end_program:
+            self.clk_counter = (self.clk_counter + cycles) & CLK_COUNTER_MASK
+            return False
+        self.clk_counter = (self.clk_counter + cycles + 1) & CLK_COUNTER_MASK
+        self._run(2, False)
+        return True
+
+    def dump(self) -> (list, list, int):
+        """
+        Return the registers and memory as the debug unit prints them, in the format of
+        Interface.registers and Interface.memory ({'cycle', 'addr', 'data'}), and the PC.
+        """
+        cycle = self.clk_counter
+        registers = [{'cycle': cycle, 'addr': addr, 'data': data} for addr, data in enumerate(self.registers)]
+        memory = [{'cycle': cycle, 'addr': addr, 'data': data} for addr, data in enumerate(self.memory)]
+        return registers, memory, self.pc
+
+    def _decode(self, word: int) -> tuple:
+        decoded = self._decode_cache.get(word)
+        if decoded is None:
+            decoded = self._decode_cache[word] = decode(word)
+        return decoded
+
+    def _fetch(self, pc: int) -> tuple:
+        """
+        Slow path of the instruction fetch: unaligned or out of range PCs.
+        Instruction_Memory.v reads 4 bytes from any byte address; outside of the memory the word reads as a NOP.
+        """
+        index, offset = pc >> 2, (pc & 3) * 8
+        if index >= self.instruction_memory_words:
+            return NOP_DECODED
+        word = self.program[index] >> offset
+        if offset and index + 1 < self.instruction_memory_words:
+            word |= (self.program[index + 1] << (32 - offset)) & WORD_MASK
+        return self._decode(word)
+
+    def _run(self, max_cycles: int, stop_on_halt: bool) -> int:
+        """
+        Core loop: every cycle is the negative edge (PC update) followed by the positive edge (latches and
+        data memory) and the register bank write of the MEM/WB instruction, which the register bank does
+        on the next negative edge, before the debug unit or the next ID stage can read it.
+        Returns the number of cycles run.
+        """
+        regs = self.registers
+        dmem = self.memory
+        imem = self.decoded
+        fetch = self._fetch
+        pc_limit = self.instruction_memory_words * 4
+        (pc, pc_end, ifid, d_pc4, d_hflag,
+         x_ex, x_bus_a, x_bus_b, x_pc4, x_stop, x_halt,
+         m_alu, m_bus_b, m_wb, m_mw, m_dest, m_rd, m_wr, m_m2r, m_halt,
+         w_wb, w_dest, w_data, w_halt) = self._latches
+        d_rs, d_rt, d_rd, d_jcond, d_halt, d_npc, d_target, d_offset, d_ex, d_bubble = ifid
+        x_rs, x_rt, x_load, x_wb, x_mw, x_dest, x_fn, x_shamt, x_bk, x_bc, x_mrd, x_mwr, x_m2r = x_ex
+
+        cycles = 0
+        while cycles < max_cycles:
+            cycles += 1
+
+            # Forwarding (shortcut.v) of the operands of the instruction in ID/EX
+            if m_wb and m_dest == x_rs and x_rs:
+                fa = m_alu
+            elif w_wb and w_dest == x_rs and x_rs:
+                fa = w_data
+            else:
+                fa = x_bus_a
+            if m_wb and m_dest == x_rt and x_rt:
+                fb = m_alu
+            elif w_wb and w_dest == x_rt and x_rt:
+                fb = w_data
+            else:
+                fb = x_bus_b
+
+            # Hazards (hazard_detection.v)
+            jmp_stop = d_jcond and not x_stop
+            not_load = jmp_stop or (x_load and (x_rt == d_rs or x_rt == d_rd))
+
+            # Negative edge: PC (branches and jumps are resolved in ID)
+            if not pc_end:
+                if d_halt:
+                    pc_end = True
+                elif not not_load:
+                    if d_npc == NPC_SEQ:
+                        pc = d_pc4
+                    elif d_npc == NPC_BEQ:
+                        pc = (d_pc4 + d_offset) & WORD_MASK if fa == fb else d_pc4
+                    elif d_npc == NPC_BNE:
+                        pc = (d_pc4 + d_offset) & WORD_MASK if fa != fb else d_pc4
+                    elif d_npc == NPC_DIR:
+                        pc = (d_pc4 & 0xf0000000) | d_target
+                    else:
+                        pc = fa
+
+            # Positive edge, from the last stage to the first one so every latch reads the previous values
+            # MEM -> MEM/WB (data memory is read before the write of this edge)
+            if m_wb:
+                if m_m2r:
+                    w_data = m_alu
+                else:
+                    value = dmem[m_alu & DATA_MEMORY_ADDR_MASK]
+                    if m_rd == MEM_RD_WORD:
+                        w_data = value
+                    elif m_rd == MEM_RD_SIG_BYTE:
+                        w_data = (((value & 0xff) ^ 0x80) - 0x80) & WORD_MASK
+                    elif m_rd == MEM_RD_SIG_HALF:
+                        w_data = (((value & 0xffff) ^ 0x8000) - 0x8000) & WORD_MASK
+                    elif m_rd == MEM_RD_USIG_BYTE:
+                        w_data = value & 0xff
+                    else:
+                        w_data = value & 0xffff
+            if m_mw:
+                dmem[m_alu & DATA_MEMORY_ADDR_MASK] = m_bus_b if m_wr == MEM_WR_WORD else \
+                    m_bus_b & (0xffff if m_wr == MEM_WR_HALF else 0xff)
+            w_wb, w_dest, w_halt = m_wb, m_dest, m_halt
+
+            # EX -> EX/MEM (instructions without write back or memory write leave nothing to compute)
+            if x_wb or x_mw:
+                if x_bk == B_BUS_B:
+                    b = fb
+                elif x_bk == B_CONST:
+                    b = x_bc
+                else:
+                    b = x_pc4
+                m_alu = x_fn(fa if x_shamt < 0 else x_shamt, b)
+                m_bus_b, m_dest, m_rd, m_wr, m_m2r = fb, x_dest, x_mrd, x_mwr, x_m2r
+            m_wb, m_mw, m_halt = x_wb, x_mw, x_halt
+
+            # ID -> ID/EX (a stall zeroes the control signals but keeps the operands)
+            x_bus_a, x_bus_b, x_pc4, x_stop, x_halt = regs[d_rs], regs[d_rt], d_pc4, jmp_stop, d_hflag
+            x_rs, x_rt, x_load, x_wb, x_mw, x_dest, x_fn, x_shamt, x_bk, x_bc, x_mrd, x_mwr, x_m2r = \
+                d_bubble if not_load else d_ex
+
+            # IF -> IF/ID
+            d_hflag = d_halt
+            ifid = imem[pc >> 2] if pc < pc_limit and not pc & 3 else fetch(pc)
+            d_pc4 = (pc + 4) & WORD_MASK
+            d_rs, d_rt, d_rd, d_jcond, d_halt, d_npc, d_target, d_offset, d_ex, d_bubble = ifid
+
+            # Register bank write (register 0 is always written with 0)
+            if w_wb and w_dest:
+                regs[w_dest] = w_data
+
+            if w_halt and stop_on_halt:
+                break
+
+        self._latches = (pc, pc_end, ifid, d_pc4, d_hflag,
+                         (x_rs, x_rt, x_load, x_wb, x_mw, x_dest, x_fn, x_shamt, x_bk, x_bc, x_mrd, x_mwr, x_m2r),
+                         x_bus_a, x_bus_b, x_pc4, x_stop, x_halt,
+                         m_alu, m_bus_b, m_wb, m_mw, m_dest, m_rd, m_wr, m_m2r, m_halt,
+                         w_wb, w_dest, w_data, w_halt)
+        self.cycle += cycles
+        return cycles
+
+def print_state(simulator: PipelineSimulator):
+    """
+    Print the non zero registers and memory words, the PC and the cycle counter.
+    """
+    print(f"PC: {simulator.pc:#010x}  Cycle: {simulator.clk_counter} ({simulator.cycle} cycles run)")
+    print("Registers:")
+    for addr, data in enumerate(simulator.registers):
+        if data:
+            print(f"  r{addr:<3} {data:#010x} {_signed(data):>12}")
+    print("Memory:")
+    for addr, data in enumerate(simulator.memory):
+        if data:
+            print(f"  {addr:<4} {data:#010x} {_signed(data):>12}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a MIPS32 program on a cycle accurate model of the pipeline.")
+    parser.add_argument('source', help=".asm program")
+    parser.add_argument('-s', '--step', action='store_true', help="print the state after every cycle")
+    parser.add_argument('-c', '--max-cycles', type=int, default=DEFAULT_MAX_CYCLES, help="cycle limit")
+    parser.add_argument('-w', '--imem-words', type=int, default=INSTRUCTION_MEMORY_WORDS,
+                        help="instruction memory size in words (default: 64, as in TOP.v)")
+    args = parser.parse_args(argv)
+
+    with open(args.source, 'r') as src:
+        words = mipsAssambler().assemble_to_words(src.read())
+    simulator = PipelineSimulator(args.imem_words)
+    if not simulator.load_program(words):
+        print("Error loading program: instruction memory full or HALT missing.")
+        return 1
+
+    start = time.perf_counter()
+    if args.step:
+        print_state(simulator)
+        ended = False
+        while not ended and simulator.cycle < args.max_cycles:
+            ended = simulator.step()
+            print_state(simulator)
+    else:
+        ended = simulator.run(args.max_cycles)
+        print_state(simulator)
+    elapsed = time.perf_counter() - start
+    if not ended:
+        print(f"Program did not end in {args.max_cycles} cycles.")
+    if elapsed > 0:
+        print(f"{simulator.cycle} cycles in {elapsed * 1000:.2f} ms ({simulator.cycle / elapsed:.0f} cycles/s)")
+    return 0 if ended else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
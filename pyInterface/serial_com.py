@@ -1,14 +1,20 @@
+import os
 import serial
 from serial.tools import list_ports
 
+PORT_ENV = 'MIPS32_SERIAL_PORT' # Port used instead of the USB ports, e.g. the pty of board_emulator.py
+USB_MATCH = 'USB'                # Substring of the device names of the boards
+
 class Uart():
     port = None
     baudrate = 19200
     data_size = 1 # one byte default
     endiantype = 'little' # little endian default
 
-    def __init__(self, port):
+    def __init__(self, port, baudrate=None):
         self.port = port
+        if baudrate is not None:
+            self.baudrate = baudrate
         self.ser = serial.Serial(
             port=self.port,
             baudrate=self.baudrate,
@@ -24,12 +30,29 @@ class Uart():
         res = int.from_bytes(self.ser.read(data_size), byteorder = byteorder)
         return res
 
+    # Read up to data_size bytes, waiting timeout seconds at most (None waits forever):
+    def read_bytes(self, data_size=1, timeout=None):
+        self.ser.timeout = timeout
+        return self.ser.read(data_size)
+
     # Write data to serial port:
     def write(self, data, byteorder = 'little'):
         self.ser.write(
             int(data).to_bytes(self.data_size, byteorder = byteorder)
         )
     
+    # Write a whole buffer to serial port:
+    def write_bytes(self, data):
+        self.ser.write(data)
+
+    # Wait until all data is written:
+    def flush(self):
+        self.ser.flush()
+
+    # Number of bytes waiting to be read:
+    def bytes_waiting(self):
+        return self.ser.in_waiting
+
     # Check if data is available to read (size of data_size):
     def check_data_available(self, data_size = 1):
         return self.ser.in_waiting >= data_size
@@ -51,10 +74,18 @@ if __name__ == '__main__':
 else:
     pass
 
-def get_serial_port():
+def list_usb_ports(match=USB_MATCH):
+    # Devices of all the serial ports whose name contains match
+    return [port.device for port in list_ports.comports() if match in port.device]
+
+def get_serial_port(port=None):
+    # An explicit port, or the one in MIPS32_SERIAL_PORT, is used as is (no USB enumeration)
+    port = port or os.environ.get(PORT_ENV)
+    if port:
+        print(f"Using serial port: {port}")
+        return port
     try:
-        ports_avail = list_ports.comports()
-        usb_ports = [port for port in ports_avail if 'USB' in port.device]
+        usb_ports = list_usb_ports()
     except:
         print("Error getting serial ports.")
         input("Press Enter to exit...")
@@ -65,18 +96,18 @@ def get_serial_port():
         input("Press Enter to exit...")
         exit(1)
     elif len(usb_ports) == 1:
-        print(f"Automatically selected USB port: {usb_ports[0].device}")
-        return usb_ports[0].device
+        print(f"Automatically selected USB port: {usb_ports[0]}")
+        return usb_ports[0]
     else:
         print("Available USB ports:")
         for i, port in enumerate(usb_ports):
-            print(f"{i + 1}. {port.device}")
+            print(f"{i + 1}. {port}")
         
         while True:
             try:
                 choice = int(input("Select port number: "))
                 if 1 <= choice <= len(usb_ports):
-                    return usb_ports[choice - 1].device
+                    return usb_ports[choice - 1]
                 else:
                     print("Invalid choice. Please try again.")
             except ValueError:
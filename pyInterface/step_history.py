@@ -0,0 +1,118 @@
+from array import array
+
+class StepHistory():
+    def __init__(self):
+        """
+        History of a step session kept as the first dump (the base snapshot) plus, for every step after it,
+        the registers and memory words that changed, in typed arrays: a step costs its cycle and PC plus 10
+        bytes per changed word. Any step is rebuilt from the nearest of the base and the last step rebuilt,
+        applying only the changes in between, so stepping back or forward one step costs its own changes.
+        Registers and memory words are numbered together in slots: the registers first, then the memory.
+        """
+        self.reg_count = 0
+        self.mem_count = 0
+        self.base = array('I')   # data of every slot at step 0
+        self.cycles = array('B') # cycle reported by each step (the 8 bit counter of the board)
+        self.pcs = array('I')
+        self.starts = array('I') # first change of each step; the changes of step s are starts[s]:starts[s + 1]
+        self.slot = array('H')   # changes: slot, data before and after the step
+        self.old = array('I')
+        self.new = array('I')
+        self._last = array('I')  # data of every slot at the last step
+        self._cursor = array('I') # data of every slot at step _cursor_step
+        self._cursor_step = 0
+
+    def __len__(self) -> int:
+        return len(self.pcs)
+
+    def clear(self):
+        self.__init__()
+
+    def record(self, registers, memory, pc: int):
+        """
+        Append the step whose dump is the last cycle of the registers and memory trace stores.
+        """
+        reg_data = registers.last_data()
+        mem_data = memory.last_data()
+        state = reg_data + mem_data
+        self.starts.append(len(self.slot))
+        self.cycles.append(registers.cycle[-1] if len(registers) else 0)
+        self.pcs.append(pc)
+        if len(self.pcs) == 1:
+            self.reg_count = len(reg_data)
+            self.mem_count = len(mem_data)
+            self.base = array('I', state)
+            self._last = array('I', state)
+            self._cursor = array('I', state)
+            self._cursor_step = 0
+            return
+        last = self._last
+        if state == last:
+            return
+        for slot, (before, after) in enumerate(zip(last, state)):
+            if before != after:
+                self.slot.append(slot)
+                self.old.append(before)
+                self.new.append(after)
+                last[slot] = after
+
+    def _changes(self, step: int) -> range:
+        stop = self.starts[step + 1] if step + 1 < len(self.starts) else len(self.slot)
+        return range(self.starts[step], stop)
+
+    def _seek(self, step: int) -> array:
+        """
+        Move the cursor to step, from the base if that is nearer, and return its slots.
+        """
+        if not 0 <= step < len(self.pcs):
+            raise IndexError("step out of the history")
+        if step < self._cursor_step - step:
+            self._cursor = array('I', self.base)
+            self._cursor_step = 0
+        cursor = self._cursor
+        while self._cursor_step < step:
+            self._cursor_step += 1
+            for change in self._changes(self._cursor_step):
+                cursor[self.slot[change]] = self.new[change]
+        while self._cursor_step > step:
+            for change in self._changes(self._cursor_step):
+                cursor[self.slot[change]] = self.old[change]
+            self._cursor_step -= 1
+        return cursor
+
+    def state(self, step: int) -> (list, list, int):
+        """
+        Registers, memory (lists of {'cycle', 'addr', 'data'}, as Interface.get_reg_last_cycle) and PC at step
+        (negative steps count from the last one).
+        """
+        if step < 0:
+            step += len(self.pcs)
+        slots = self._seek(step)
+        cycle = self.cycles[step]
+        registers = [{'cycle': cycle, 'addr': addr, 'data': slots[addr]} for addr in range(self.reg_count)]
+        memory = [{'cycle': cycle, 'addr': addr, 'data': slots[self.reg_count + addr]} for addr in range(self.mem_count)]
+        return registers, memory, self.pcs[step]
+
+    def changes(self, step: int) -> list:
+        """
+        What step changed, as ('reg' or 'mem', addr, data before, data after) tuples.
+        """
+        changes = []
+        for change in self._changes(step):
+            slot = self.slot[change]
+            kind, addr = ('reg', slot) if slot < self.reg_count else ('mem', slot - self.reg_count)
+            changes.append((kind, addr, self.old[change], self.new[change]))
+        return changes
+
+    def steps_at(self, cycle: int) -> list:
+        """
+        Steps that reported cycle (several if the 8 bit counter wrapped).
+        """
+        return [step for step, reported in enumerate(self.cycles) if reported == cycle]
+
+    def size_bytes(self) -> int:
+        """
+        Bytes held by the history arrays.
+        """
+        columns = (self.base, self.cycles, self.pcs, self.starts, self.slot, self.old, self.new, self._last, self._cursor)
+        return sum(column.itemsize * len(column) for column in columns)
@@ -0,0 +1,96 @@
+# Conditions of Interface.run_until, checked against the interface after every step dump:
+#   start(interface)     : called once before the first step
+#   hit(interface)       : True to stop at the dump just received
+#   steps_left(steps)    : steps still needed for sure (None if it can't be known), so that many NEXT_STEP
+#                          commands can be sent at once; steps is the cycle the step session is at
+
+class Breakpoint():
+    def __init__(self, pc: int):
+        """
+        Stop when the PC reported by a dump is pc.
+        """
+        self.pc = pc
+
+    def start(self, interface):
+        pass
+
+    def hit(self, interface) -> bool:
+        return interface.get_pc() == self.pc
+
+    def steps_left(self, steps: int):
+        return None
+
+    def __repr__(self) -> str:
+        return f"pc={self.pc:#x}"
+
+class Watchpoint():
+    def __init__(self, kind: str, addr: int, value: int = None):
+        """
+        Stop when register ('reg') or data memory word ('mem') addr holds value, or changes if value is None.
+        """
+        if kind not in ('reg', 'mem'):
+            raise ValueError(f"Invalid watchpoint kind: {kind}")
+        self.kind = kind
+        self.addr = addr
+        self.value = value
+        self._initial = None
+
+    def _read(self, interface):
+        store = interface.registers if self.kind == 'reg' else interface.memory
+        return store.last_value(self.addr)
+
+    def start(self, interface):
+        self._initial = self._read(interface)
+
+    def hit(self, interface) -> bool:
+        current = self._read(interface)
+        if self.value is None:
+            return current != self._initial
+        return current == self.value
+
+    def steps_left(self, steps: int):
+        return None
+
+    def __repr__(self) -> str:
+        name = f"{'r' if self.kind == 'reg' else 'm'}{self.addr}"
+        return name if self.value is None else f"{name}={self.value:#x}"
+
+class CycleCount():
+    def __init__(self, cycle: int):
+        """
+        Stop at cycle cycle of the step session (counted by the host, so past the 8 bit counter of the board).
+        """
+        self.cycle = cycle
+
+    def start(self, interface):
+        pass
+
+    def hit(self, interface) -> bool:
+        return interface.step_count >= self.cycle
+
+    def steps_left(self, steps: int):
+        return max(0, self.cycle - steps)
+
+    def __repr__(self) -> str:
+        return f"cycle={self.cycle}"
+
+def parse_condition(text: str):
+    """
+    Condition from its text form, as typed in the CLI and GUI:
+    'pc=0x20' (breakpoint), 'r3=81' or 'm5=0x10' (watchpoint on a value), 'r3' or 'm5' (watchpoint on
+    any change), 'cycle=500' or 'c500' (cycle count). Numbers may be decimal or 0x hexadecimal.
+    Raises ValueError if the text is not a condition.
+    """
+    name, _, value = text.strip().lower().replace(' ', '').partition('=')
+    try:
+        if name == 'pc' and value:
+            return Breakpoint(int(value, 0))
+        if name in ('cycle', 'c') and value:
+            return CycleCount(int(value, 0))
+        if name[:1] == 'c' and name[1:].isdigit():
+            return CycleCount(int(name[1:]))
+        if name[:1] in ('r', 'm') and name[1:].isdigit():
+            return Watchpoint('reg' if name[0] == 'r' else 'mem', int(name[1:]), int(value, 0) if value else None)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid condition: {text}")
@@ -0,0 +1,27 @@
+import os
+import sys
+import pytest
+
+# The modules of pyInterface import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board_emulator import BoardEmulator
+from serial_com import Uart
+from interface import Interface
+from mipsAssambler import mipsAssambler
+
+LOOP_SOURCE = "ADDI r1,r0,0\nADDI r2,r0,300\nL: ADDI r1,r1,1\nSW r1,0(r0)\nBNE r1,r2,L\nNOP\nHALT\n"
+
+def assemble(source: str) -> list:
+    return mipsAssambler().assemble_to_words(source)
+
+@pytest.fixture
+def board():
+    """
+    Interface to an emulated board on a pty, unthrottled.
+    """
+    with BoardEmulator() as emulator:
+        interface = Interface(Uart(emulator.port), timeout=10)
+        yield interface
+        interface.stop_reader()
+        interface.uart.close()
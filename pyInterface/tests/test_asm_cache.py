@@ -0,0 +1,19 @@
+import os
+from asm_cache import AssemblyCache
+from conftest import LOOP_SOURCE, assemble
+
+def test_hit_after_miss(tmp_path):
+    cache = AssemblyCache(str(tmp_path))
+    words, listing = cache.assemble(LOOP_SOURCE)
+    cached_words, cached_listing = cache.assemble(LOOP_SOURCE)
+    assert list(words) == list(cached_words) == list(assemble(LOOP_SOURCE))
+    assert listing == cached_listing
+    assert (cache.misses, cache.hits) == (1, 1)
+
+def test_unwritable_cache_still_assembles(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    cache = AssemblyCache(os.path.join(str(blocker), 'cache')) # its parent is a file: makedirs fails
+    words, _ = cache.assemble(LOOP_SOURCE)
+    assert list(words) == list(assemble(LOOP_SOURCE))
+    assert cache.misses == 1
@@ -0,0 +1,175 @@
+import glob
+import os
+from array import array
+import pytest
+from conftest import assemble
+import mips_isa as iset
+from mipsAssambler import mipsAssambler, encoderTable, build_encoder, Invalid_instruction_exception, Invalid_reg_exception, Label_not_found_exception
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'asm_examples')
+
+# Machine code of asm_examples, as the string based assembler produced it (combined1's BEQ back to function1
+# is 27 words before the next instruction: 0xffe5)
+EXPECTED_WORDS = {
+    'combinedtest/combined1.asm': [
+        0x20040c33, 0x20030051, 0x00832821, 0x00833023, 0x00833824, 0x00834025,
+        0x00834826, 0x00645027, 0x0064582a, 0x000a6080, 0x000a6882, 0x000a7083,
+        0x014b7804, 0x014b8006, 0x014b8807, 0xa00d0004, 0xa40d0008, 0xac0d000c,
+        0x8012000c, 0x3253104c, 0x8414000c, 0x3695104c, 0x8c16000c, 0x3ad7104c,
+        0x9c18000c, 0x3c19104c, 0x901a000c, 0x2a7b1256, 0x1064ffe5, 0x00000000,
+        0xffffffff,
+    ],
+    'combinedtest/combined2.asm': [
+        0x2004000c, 0x2005000c, 0x10850002, 0x20040063, 0x20050063, 0x20070057,
+        0x08000009, 0x20040063, 0x20050063, 0x20040001, 0x20050001, 0xffffffff,
+    ],
+    'combinedtest/combined3.asm': [
+        0x08000001, 0x00833824, 0x08000003, 0x00833823, 0x00000000, 0xffffffff,
+    ],
+    'combinedtest/comparison_branch.asm': [
+        0x20010005, 0x2002000a, 0x20030007, 0x2004000c, 0x10220002, 0x00642825,
+        0x08000008, 0x00642824, 0x00000000, 0xffffffff,
+    ],
+    'combinedtest/fowarding.asm': [
+        0x2001000a, 0x20020019, 0x2003001e, 0x20040028, 0x20050032, 0x00223021,
+        0x00c33823, 0x00854021, 0x00000000, 0x01014821, 0x00435021, 0xac2a0000,
+        0x00225821, 0x01636021, 0x01846821, 0x202e0005, 0x01c27821, 0x8c300000,
+        0x02028821, 0xffffffff,
+    ],
+    'simpletest/beq.asm': [
+        0x20010005, 0x20020005, 0x20030008, 0x2004000a, 0x20050000, 0x10220002,
+        0x00642825, 0x08000009, 0x00642824, 0x00000000, 0xffffffff,
+    ],
+    'simpletest/bne.asm': [
+        0x20010005, 0x20020005, 0x20030008, 0x2004000a, 0x20050000, 0x14640001,
+        0x00842825, 0x00a32824, 0x00000000, 0xffffffff,
+    ],
+    'simpletest/jal-jalr-jr.asm': [
+        0x21ad0020, 0x3c0b000a, 0x0c000004, 0x20e70007, 0x21290009, 0x20420002,
+        0x01a0f809, 0x20840004, 0x20c6002c, 0x00c00008, 0x20c70007, 0xffffffff,
+    ],
+    'simpletest/loads.asm': [
+        0x3c010001, 0x3c020002, 0x3c030003, 0x3c040004, 0x3c050005, 0xffffffff,
+    ],
+    'simpletest/shifts.asm': [
+        0x20010005, 0x00011080, 0x2003fff8, 0x00032043, 0x20050014, 0x00053082,
+        0xffffffff,
+    ],
+}
+
+def example(name: str) -> str:
+    with open(os.path.join(EXAMPLES_DIR, name), 'r') as src:
+        return src.read()
+
+def test_every_example_is_checked():
+    found = glob.glob(os.path.join(EXAMPLES_DIR, '**', '*.asm'), recursive=True)
+    assert sorted(os.path.relpath(path, EXAMPLES_DIR).replace(os.sep, '/') for path in found) == sorted(EXPECTED_WORDS)
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_WORDS))
+def test_examples_assemble_to_known_words(name):
+    words = assemble(example(name))
+    assert isinstance(words, array) and words.typecode == 'I'
+    assert list(words) == EXPECTED_WORDS[name]
+
+def test_immediates_are_masked_to_their_fields():
+    # Negative immediate, hexadecimal and binary operands, shift amount and jump target
+    words = assemble("ADDI r1,r2,-1\nORI r3,r4,0x8001\nANDI r5,r6,0b101\nSRA r7,r8,31\nJ end\nend: HALT\n")
+    assert list(words) == [0x2041ffff, 0x34838001, 0x30c50005, 0x00083fc3, 0x08000005, 0xffffffff]
+
+def test_tokenizer_keeps_source_lines():
+    assembler = mipsAssambler()
+    source = "# header\n\nDEFINE INT16 OFFSET = 8\nstart:  ADDI r1 , r0, 7   # inline comment\n\tSW r1,OFFSET(r0)\nHALT # end\n"
+    words = assembler.assemble_to_words(source)
+    program = [(inst.label, inst.mnemonic, inst.args, inst.line) for inst in assembler.instructions_asm]
+    assert program == [('start', 'ADDI', ('r1', 'r0', '7'), 4), (None, 'SW', ('r1', 'OFFSET(r0)'), 5), (None, 'HALT', (), 6)]
+    assert assembler.labels_address_table == {'start': 0}
+    assert list(words) == [0x20010007, 0xac010008, 0xffffffff]
+
+@pytest.mark.parametrize('source, exception, line', [
+    ("ADDI r1,r0,1\n\n# comment\nFOO r1,r2\nHALT\n", Invalid_instruction_exception, 4),
+    ("ADDI r1,r0,1\nADD r1,r2\nHALT\n", Invalid_instruction_exception, 2),
+    ("ADDI r1,r0,1\n# comment\nJ nowhere\nHALT\n", Label_not_found_exception, 3),
+    ("NOP\nNOP\nNOP\nADDU r1,r2,r99 # bad register\nHALT\n", Invalid_reg_exception, 4),
+    ("NOP\nempty:\nHALT\n", Invalid_instruction_exception, 2),
+])
+def test_errors_report_their_line(source, exception, line):
+    with pytest.raises(exception, match=f"on line {line}:"):
+        assemble(source)
+
+# One line per instruction of the set and its machine code
+EVERY_INSTRUCTION = [
+    ('top: SLL r1,r2,3', 0x000208c0),
+    ('SRL r3,r4,5', 0x00041942),
+    ('SRA r5,r6,31', 0x00062fc3),
+    ('SLLV r7,r8,r9', 0x01093804),
+    ('SRLV r10,r11,r12', 0x016c5006),
+    ('SRAV r13,r14,r15', 0x01cf6807),
+    ('ADDU r16,r17,r18', 0x02328021),
+    ('SUBU r19,r20,r21', 0x02959823),
+    ('AND r22,r23,r24', 0x02f8b024),
+    ('OR r25,r26,r27', 0x035bc825),
+    ('XOR r28,r29,r30', 0x03bee026),
+    ('NOR r31,r1,r2', 0x0022f827),
+    ('SLT r3,r4,r5', 0x0085182a),
+    ('JALR r6,r7', 0x00e03009),
+    ('JR r8', 0x01000008),
+    ('LB r1,1(r2)', 0x80410001),
+    ('LH r3,2(r4)', 0x84830002),
+    ('LW r5,4(r6)', 0x8cc50004),
+    ('LWU r7,8(r8)', 0x9d070008),
+    ('LBU r9,16(r10)', 0x91490010),
+    ('LHU r11,32(r12)', 0x958b0020),
+    ('SB r13,64(r14)', 0xa1cd0040),
+    ('SH r15,128(r16)', 0xa60f0080),
+    ('SW r17,0x100(r18)', 0xae510100),
+    ('ADDI r19,r20,-2', 0x2293fffe),
+    ('ANDI r21,r22,0xff00', 0x32d5ff00),
+    ('ORI r23,r24,0b1010', 0x3717000a),
+    ('XORI r25,r26,4095', 0x3b590fff),
+    ('LUI r27,0x1234', 0x3c1b1234),
+    ('SLTI r28,r29,-32768', 0x2bbc8000),
+    ('BEQ r1,r2,top', 0x1022ffe1),
+    ('BNE r3,r4,end', 0x14640003),
+    ('J top', 0x08000000),
+    ('JAL end', 0x0c000023),
+    ('NOP', 0x00000000),
+    ('end: ADDU r0,r0,r0', 0x00000021),
+    ('HALT', 0xffffffff),
+]
+
+def test_every_instruction_has_an_encoder():
+    assert set(encoderTable) == set(iset.instructionTable) == set(iset.formatTable)
+    assert {line.split(':')[-1].split()[0] for line, _ in EVERY_INSTRUCTION} == set(iset.instructionTable)
+
+def test_every_instruction_encodes():
+    words = assemble('\n'.join(line for line, _ in EVERY_INSTRUCTION))
+    assert list(words) == [word for _, word in EVERY_INSTRUCTION]
+
+def test_encoder_built_from_a_descriptor():
+    # A new instruction only needs its fixed fields and operand layout (MUL rd,rs,rt, func 0x18)
+    encode = build_encoder((int(iset.OP_CODE_R, 2) << iset.OPCODE_SHIFT) | 0x18, (iset.RD, iset.RS, iset.RT))
+    assert encode(mipsAssambler(), ('r3', 'r1', 'r2')) == 0x00221818
+
+def stream(source) -> list:
+    return list(mipsAssambler().assemble_stream(source))
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_WORDS))
+def test_stream_of_a_file_matches_assemble_to_words(name):
+    with open(os.path.join(EXAMPLES_DIR, name), 'r') as src: # seekable: rewound for the second pass
+        assert stream(src) == list(assemble(example(name)))
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_WORDS))
+def test_stream_of_an_iterator_matches_assemble_to_words(name):
+    lines = iter(example(name).splitlines()) # one-shot: spooled for the second pass
+    assert stream(lines) == list(assemble(example(name)))
+
+def test_stream_of_a_string_and_a_list():
+    source = example('combinedtest/combined1.asm')
+    assert stream(source) == stream(source.splitlines(keepends=True)) == EXPECTED_WORDS['combinedtest/combined1.asm']
+
+def test_stream_is_lazy():
+    # Words come out while the generator is consumed, past an error further down
+    words = mipsAssambler().assemble_stream(iter(["ADDI r1,r0,1", "ADDU r2,r1,r99", "HALT"]))
+    assert next(words) == 0x20010001
+    with pytest.raises(Invalid_reg_exception, match="on line 2:"):
+        next(words)
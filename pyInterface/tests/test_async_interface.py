@@ -0,0 +1,47 @@
+import asyncio
+import inspect
+from conftest import LOOP_SOURCE, assemble
+from board_emulator import BoardEmulator
+from async_interface import AsyncInterface, open_transport
+from interface import InterfaceBase, ExecMode
+from stop_conditions import Breakpoint, CycleCount
+
+def run_board(session):
+    """
+    Run session(board) on an AsyncInterface to an emulated board and return its result.
+    """
+    async def main(port):
+        board = AsyncInterface(await open_transport(port), timeout=10)
+        try:
+            return await session(board)
+        finally:
+            board.close()
+    with BoardEmulator() as emulator:
+        return asyncio.run(main(emulator.port))
+
+def test_no_sync_method_is_made_async():
+    # A coroutine replacing an inherited method would be called without await by the base class
+    for name, member in inspect.getmembers(AsyncInterface, inspect.iscoroutinefunction):
+        assert not hasattr(InterfaceBase, name), name
+
+def test_run_program():
+    async def session(board):
+        await board.load_program(assemble(LOOP_SOURCE))
+        assert await board.run_program(ExecMode.RUN)
+        return [reg['data'] for reg in board.get_reg_last_cycle()]
+    assert run_board(session)[1:3] == [300, 300]
+
+def test_run_until_matches_interface(board):
+    words = assemble(LOOP_SOURCE)
+    board.load_program(words)
+    board.run_program(ExecMode.STEP)
+    expected = [board.run_until(CycleCount(20)), board.run_until(Breakpoint(0x8))]
+
+    async def session(board):
+        await board.load_program(words)
+        await board.run_program(ExecMode.STEP)
+        return [await board.run_until(CycleCount(20)), await board.run_until(Breakpoint(0x8))]
+    for state, want in zip(run_board(session), expected):
+        assert repr(state['reason']) == repr(want['reason'])
+        for key in ('cycle', 'steps', 'pc', 'registers', 'memory', 'ended'):
+            assert state[key] == want[key], key
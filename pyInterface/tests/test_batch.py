@@ -0,0 +1,48 @@
+import os
+import pytest
+from batch import find_sources, assemble_batch, main
+from conftest import LOOP_SOURCE, assemble
+
+@pytest.fixture
+def sources(tmp_path):
+    """
+    A good and a bad program, in a directory tree with a file that is not a source.
+    """
+    (tmp_path / 'sub').mkdir()
+    good = tmp_path / 'good.asm'
+    good.write_text(LOOP_SOURCE)
+    bad = tmp_path / 'sub' / 'bad.asm'
+    bad.write_text("ADDI r1,r0,1\nFOO r1\nHALT\n")
+    (tmp_path / 'notes.txt').write_text("ADDI r1,r0,1\n")
+    return str(good), str(bad)
+
+def test_find_sources(tmp_path, sources):
+    good, bad = sources
+    assert find_sources([str(tmp_path)]) == [good, bad]
+    assert find_sources([str(tmp_path / '*.asm')]) == [good]
+    assert find_sources([bad, good, bad]) == [good, bad]
+    assert find_sources([str(tmp_path)], '.txt') == [str(tmp_path / 'notes.txt')]
+    assert find_sources([str(tmp_path / 'missing.asm')]) == []
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_bad_source_does_not_abort_the_batch(sources, workers):
+    good, bad = sources
+    results = assemble_batch([good, bad], workers, ('mem', 'bin-be'))
+    assert [source for source, _, _, _ in results] == [good, bad]
+    (_, good_words, _, good_error), (_, _, _, bad_error) = results
+    assert good_error is None and good_words == len(assemble(LOOP_SOURCE))
+    assert bad_error.startswith("Invalid_instruction_exception")
+    with open(os.path.splitext(good)[0] + '.mem') as mem:
+        assert [int(line, 16) for line in mem] == list(assemble(LOOP_SOURCE))
+    assert os.path.exists(os.path.splitext(good)[0] + '.bin')
+    assert sorted(os.listdir(os.path.dirname(bad))) == ['bad.asm'] # nor its image nor a temporary file
+
+def test_main_exit_status(tmp_path, sources, capsys):
+    good, _ = sources
+    assert main([str(tmp_path), '-j', '2']) == 1
+    output = capsys.readouterr().out
+    assert "2 files, 1 failed" in output
+    assert main([good, '-f', 'coe']) == 0
+    assert os.path.exists(os.path.splitext(good)[0] + '.coe')
+    assert main([str(tmp_path / 'empty' / '*.asm')]) == 1
+    assert "No source files found." in capsys.readouterr().out
@@ -0,0 +1,48 @@
+import pytest
+from conftest import LOOP_SOURCE, assemble
+from board_emulator import BoardEmulator, FunctionalCpu
+from serial_com import Uart
+from interface import Interface, ExecMode, Command, Result, Response, BoardError, LoadProgramException
+from pipeline_sim import DATA_MEMORY_WORDS, INSTRUCTION_MEMORY_WORDS
+
+def run_on(cpu, source: str) -> Interface:
+    with BoardEmulator(cpu) as emulator:
+        interface = Interface(Uart(emulator.port), timeout=10)
+        interface.load_program(assemble(source))
+        interface.run_program(ExecMode.RUN)
+        interface.uart.close()
+    return interface
+
+def test_functional_data_memory_apart_from_the_program():
+    interface = run_on(FunctionalCpu(), LOOP_SOURCE)
+    memory = [mem['data'] for mem in interface.get_mem_last_cycle()]
+    assert len(memory) == DATA_MEMORY_WORDS
+    assert memory == [300] + [0] * (DATA_MEMORY_WORDS - 1) # no program words
+
+def test_functional_store_does_not_overwrite_code():
+    # Stores to the addresses of the instructions still to run
+    source = "ADDI r1,r0,-1\nSW r1,8(r0)\nSW r1,12(r0)\nADDI r2,r0,5\nHALT\n"
+    interface = run_on(FunctionalCpu(), source)
+    assert interface.get_reg_last_cycle()[2]['data'] == 5
+
+@pytest.mark.parametrize('cpu', [None, FunctionalCpu])
+def test_empty_program_error(cpu):
+    with BoardEmulator(cpu() if cpu else None) as emulator:
+        interface = Interface(Uart(emulator.port), timeout=10)
+        assert interface.run_program(ExecMode.RUN) # EMPTY_PROGRAM ends the command
+        interface.uart.close()
+
+def test_instruction_memory_full_error(board):
+    # No HALT before the instruction memory is full: ERROR 0x1, the code END has in INFO frames
+    assert BoardError(0x1) is BoardError.INSTRUCTION_MEMORY_FULL and Response(0x1) is Response.END
+    with pytest.raises(LoadProgramException, match="0x1"):
+        board.load_program([0] * (INSTRUCTION_MEMORY_WORDS + 1))
+
+def test_info_frames_carry_no_cycle(board):
+    board.load_program(assemble(LOOP_SOURCE))
+    board.run_program(ExecMode.STEP)
+    board._send_cmd(Command.NEXT_STEP.value)
+    frames = [board._read_response(locked=True) for _ in range(DATA_MEMORY_WORDS + 32 + 3)]
+    res_type, cycle, addr, data = frames[-1]
+    assert (res_type, cycle, addr, data) == (Result.INFO.value, 0, 0, Response.STEP_END.value)
+    assert frames[0][1] == 2 # the dump carries the cycle counter
@@ -0,0 +1,25 @@
+import glob
+import os
+import pytest
+from disassembler import disassemble, listing
+from conftest import assemble
+
+EXAMPLES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', '..', 'asm_examples', '**', '*.asm'), recursive=True))
+
+@pytest.mark.parametrize('path', EXAMPLES, ids=os.path.basename)
+def test_labelled_output_assembles_to_the_same_image(path):
+    with open(path, 'r') as src:
+        words = assemble(src.read())
+    assert list(assemble('\n'.join(disassemble(words)))) == list(words)
+
+def test_targets_outside_the_image_are_addresses():
+    assert disassemble([0x08000100]).tolist() == ['J 256']
+    assert disassemble([0x1022fff0, 0x08000000, 0xffffffff]).tolist() == ['L0: BEQ r1,r2,-15', 'J L0', 'HALT']
+
+def test_without_labels():
+    words = assemble("L: ADDI r1,r0,-2\nBNE r1,r0,L\nJ L\nHALT\n")
+    assert disassemble(words, labels=False).tolist() == ['ADDI r1,r0,-2', 'BNE r1,r0,0', 'J 0', 'HALT']
+
+def test_unknown_words():
+    assert disassemble([0xfc000000, 0x00000000]).tolist() == ['.word 0xfc000000', 'NOP']
+    assert listing([0x00000000]).splitlines()[-1].split() == ['0x0:', '0x00000000', 'NOP']
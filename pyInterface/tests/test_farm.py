@@ -0,0 +1,72 @@
+from farm import Farm, EmulatedPorts
+from board_emulator import BoardEmulator, FunctionalCpu
+from conftest import LOOP_SOURCE, assemble
+
+MISSING_PORT = '/dev/nonexistent-mips32-board'
+
+def test_dead_port_leaves_programs_to_the_others():
+    programs = [(f"loop{index}", assemble(LOOP_SOURCE)) for index in range(4)]
+    boards = EmulatedPorts(1)
+    try:
+        farm = Farm([MISSING_PORT] + boards.ports())
+        results = farm.run(programs)
+    finally:
+        boards.close()
+    assert [result['error'] for result in results] == [None] * 4
+    assert all(result['registers'][1] == 300 for result in results)
+    assert farm.stats[MISSING_PORT].error is not None
+    assert farm.stats[MISSING_PORT].programs == 0
+
+def test_no_board_available():
+    results = Farm([MISSING_PORT]).run([("loop", assemble(LOOP_SOURCE))])
+    assert results[0]['error'] == "No board available"
+
+class HangingCpu(FunctionalCpu):
+    def __init__(self, programs: int):
+        """
+        Board that runs programs and then never ends another one, as a board that stopped answering.
+        """
+        super().__init__()
+        self.programs = programs
+
+    def run(self, max_cycles: int) -> bool:
+        if self.programs == 0:
+            return False
+        if super().run(max_cycles):
+            self.programs -= 1
+            return True
+        return False
+
+def test_board_that_stops_answering_is_retired():
+    programs = [(f"loop{index}", assemble(LOOP_SOURCE)) for index in range(6)]
+    # The healthy board is paced so the other one surely takes a program after its first
+    boards = [BoardEmulator(HangingCpu(1), max_cycles=1), BoardEmulator(baudrate=19200)]
+    for board in boards:
+        board.start()
+    try:
+        ports = [board.port for board in boards]
+        farm = Farm(ports, timeout=0.5)
+        results = farm.run(programs)
+    finally:
+        for board in boards:
+            board.stop()
+    assert [result['error'] for result in results] == [None] * 6
+    assert all(result['registers'][1] == 300 for result in results)
+    assert farm.stats[ports[0]].error.startswith("ResponseTimeoutException")
+    assert farm.stats[ports[0]].programs == 1
+    assert farm.stats[ports[1]].programs == 5
+    assert farm.stats[ports[1]].error is None
+
+def test_program_that_never_ends_is_not_retried_forever():
+    programs = [("loop", assemble(LOOP_SOURCE))]
+    boards = [BoardEmulator(HangingCpu(0), max_cycles=1) for _ in range(3)]
+    for board in boards:
+        board.start()
+    try:
+        farm = Farm([board.port for board in boards], timeout=0.5)
+        results = farm.run(programs)
+    finally:
+        for board in boards:
+            board.stop()
+    assert results[0]['error'].startswith("ResponseTimeoutException")
+    assert sum(stats.error is not None for stats in farm.stats.values()) == 2
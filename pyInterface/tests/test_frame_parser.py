@@ -0,0 +1,83 @@
+import pytest
+from board_emulator import pack_frame
+from interface import Interface, FrameParser, ExecMode, Result, Response
+
+REGISTERS = 32
+WORDS = 32
+
+def dump(cycle: int, info: int = Response.END.value) -> bytes:
+    """
+    Frames of a dump as the board sends them: registers, PC, memory, PC, INFO.
+    """
+    pc = pack_frame(Result.PC.value, cycle, 0, 0x40)
+    return (b''.join(pack_frame(Result.REG.value, cycle, addr, addr + 100) for addr in range(REGISTERS)) + pc +
+            b''.join(pack_frame(Result.MEM.value, cycle, addr, addr + 200) for addr in range(WORDS)) + pc +
+            pack_frame(Result.INFO.value, cycle, 0, info))
+
+class StreamUart():
+    """
+    Stand-in for Uart that answers every read from a fixed byte stream and ignores writes.
+    """
+    def __init__(self, stream: bytes):
+        self.stream = bytearray(stream)
+
+    def write_bytes(self, data):
+        pass
+
+    def bytes_waiting(self) -> int:
+        return len(self.stream)
+
+    def read_bytes(self, data_size=1, timeout=None) -> bytes:
+        data = bytes(self.stream[:data_size])
+        del self.stream[:data_size]
+        return data
+
+def test_aligned_stream():
+    parser = FrameParser()
+    stream = dump(3) + dump(4)
+    batch, consumed = parser.decode(stream)
+    assert consumed == len(stream)
+    assert len(batch.type) == 2 * (REGISTERS + WORDS + 3)
+    assert parser.stats() == {'discarded_bytes': 0, 'resyncs': 0}
+
+def test_partial_frame_is_left_over():
+    parser = FrameParser()
+    stream = dump(3)
+    batch, consumed = parser.decode(stream[:100])
+    assert consumed == 98 and len(batch.type) == 14
+    rest, consumed = parser.decode(stream[98:])
+    assert consumed == len(stream) - 98
+    assert len(batch.type) + len(rest.type) == REGISTERS + WORDS + 3
+
+@pytest.mark.parametrize('fault', ['extra', 'lost'])
+def test_resync_after_a_bad_byte(fault):
+    first = bytearray(dump(3))
+    at = 10 * 7 + 3 # inside register 10
+    if fault == 'extra':
+        first[at:at] = b'\x55'
+    else:
+        del first[at]
+    parser = FrameParser()
+    batch, consumed = parser.decode(bytes(first) + dump(4))
+    assert parser.resyncs >= 1 and parser.discarded_bytes > 0
+    # The frames around the bad byte are lost, the second dump is whole
+    frames = list(zip(*batch))
+    assert frames[-(REGISTERS + WORDS + 3):] == [tuple(frame) for frame in zip(*FrameParser().decode(dump(4))[0])]
+    assert len(frames) >= 2 * (REGISTERS + WORDS + 3) - 3
+
+@pytest.mark.parametrize('reader', [False, True])
+def test_interface_reads_through_a_bad_byte(reader):
+    stream = bytearray(dump(5))
+    stream[20 * 7 + 1:20 * 7 + 1] = b'\xff' # extra byte in register 20
+    interface = Interface(StreamUart(bytes(stream)), timeout=1)
+    if reader:
+        interface.start_reader()
+    assert interface.run_program(ExecMode.RUN)
+    interface.stop_reader()
+    registers = {reg['addr']: reg['data'] for reg in interface.get_reg_last_cycle()}
+    memory = [mem['data'] for mem in interface.get_mem_last_cycle()]
+    # Only the frame the byte fell in may be wrong: the parser can't check data bytes
+    assert [addr for addr in registers if registers[addr] != addr + 100] in ([], [20])
+    assert len(registers) >= REGISTERS - 2
+    assert memory == [addr + 200 for addr in range(WORDS)]
+    assert interface.parser.resyncs == 1
@@ -0,0 +1,62 @@
+import struct
+import pytest
+from image_formats import to_bin, to_intel_hex, to_readmemh, to_coe, build_image, write_image, FORMATS
+
+WORDS = [0x20010001, 0x00221821, 0xffffffff]
+
+def ihex_records(image: bytes) -> list:
+    """
+    (address, type, data) of every record, checking the start code and the checksum of each.
+    """
+    records = []
+    for line in image.decode().splitlines():
+        assert line.startswith(':')
+        record = bytes.fromhex(line[1:])
+        assert sum(record) & 0xff == 0
+        assert record[0] == len(record) - 5
+        records.append(((record[1] << 8) | record[2], record[3], record[4:-1]))
+    return records
+
+def test_intel_hex_records():
+    image = to_intel_hex(WORDS[::2])
+    assert image == b':0800000001000120FFFFFFFFDA\n:00000001FF\n'
+
+def test_intel_hex_data_is_the_little_endian_image():
+    words = list(range(0x20010000, 0x20010000 + 21))
+    records = ihex_records(to_intel_hex(words))
+    assert records[-1] == (0, 0x01, b'')
+    assert [record[1] for record in records[:-1]] == [0x00] * 6
+    assert [record[0] for record in records[:-1]] == [0, 16, 32, 48, 64, 80]
+    assert b''.join(record[2] for record in records[:-1]) == to_bin(words, 'little')
+
+def test_intel_hex_extended_linear_address():
+    words = [index & 0xffffffff for index in range(0x4001)] # 4 bytes past 64 KiB
+    records = ihex_records(to_intel_hex(words))
+    assert records[-3] == (0, 0x04, b'\x00\x01')
+    assert records[-2] == (0, 0x00, struct.pack('<I', 0x4000))
+    data = bytearray()
+    for address, record_type, payload in records:
+        if record_type == 0x00:
+            data += payload
+    assert bytes(data) == to_bin(words, 'little')
+
+def test_readmemh_layout():
+    assert to_readmemh(WORDS) == b'20010001\n00221821\nffffffff\n'
+
+def test_coe_layout():
+    assert to_coe(WORDS) == (b'memory_initialization_radix=16;\nmemory_initialization_vector=\n'
+                             b'20010001,\n00221821,\nffffffff;\n')
+
+@pytest.mark.parametrize('byteorder', ['big', 'little'])
+def test_bin_round_trips_to_the_words(byteorder):
+    image = to_bin(WORDS, byteorder)
+    assert len(image) == 4 * len(WORDS)
+    assert [int.from_bytes(image[i:i + 4], byteorder) for i in range(0, len(image), 4)] == WORDS
+
+def test_build_and_write_every_format(tmp_path):
+    for fmt, (builder, extension) in FORMATS.items():
+        path = tmp_path / ('program' + extension)
+        write_image(str(path), WORDS, fmt)
+        assert path.read_bytes() == build_image(WORDS, fmt) == builder(WORDS)
+    with pytest.raises(ValueError):
+        build_image(WORDS, 'srec')
@@ -0,0 +1,55 @@
+import threading
+import time
+import pytest
+from conftest import LOOP_SOURCE, assemble
+from board_emulator import BoardEmulator
+from serial_com import Uart
+from interface import Interface, ExecMode
+from pipeline_sim import PipelineSimulator
+from stop_conditions import CycleCount
+
+class SlowCpu(PipelineSimulator):
+    """
+    Pipeline model that takes a while to step, so the host is left waiting between dumps.
+    """
+    def step(self):
+        time.sleep(0.1) # longer than Utils.CANCEL_POLL
+        return super().step()
+
+def test_run_program(board):
+    board.load_program(assemble(LOOP_SOURCE))
+    assert board.run_program(ExecMode.RUN)
+    registers = [reg['data'] for reg in board.get_reg_last_cycle()]
+    assert registers[1] == registers[2] == 300
+    assert board.get_mem_last_cycle()[0]['data'] == 300
+
+def test_step_program(board):
+    board.load_program(assemble("ADDI r1,r0,5\nADDI r2,r1,1\nHALT\n"))
+    assert not board.run_program(ExecMode.STEP)
+    ended = False
+    while not ended:
+        ended = board.run_next_step()
+    assert not board.step_mode_flg
+    registers = [reg['data'] for reg in board.get_reg_last_cycle()]
+    assert registers[1:3] == [5, 6]
+
+@pytest.mark.parametrize('reader', [False, True])
+def test_run_until_cancelled(reader):
+    # The cancel lands while the host waits for a dump
+    with BoardEmulator(SlowCpu()) as emulator:
+        interface = Interface(Uart(emulator.port), timeout=10)
+        if reader:
+            interface.start_reader()
+        interface.load_program(assemble(LOOP_SOURCE))
+        interface.run_program(ExecMode.STEP)
+        threading.Timer(0.25, interface.cancel).start()
+        state = interface.run_until(CycleCount(1000))
+        assert state['reason'] == 'cancelled'
+        assert not state['ended'] and interface.step_mode_flg
+        assert 0 < state['cycle'] < 1000
+        # The answers in flight were read: the next step is the one the host counts
+        assert not interface.run_next_step()
+        assert interface.get_reg_last_cycle()[0]['cycle'] == (interface.step_count + 1) & 0xff
+        assert len(interface.history) == interface.step_count + 1
+        interface.stop_reader()
+        interface.uart.close()
@@ -0,0 +1,38 @@
+import glob
+import os
+import pytest
+import mips_isa as iset
+from conftest import assemble
+from isa_interpreter import Interpreter
+from pipeline_sim import PipelineSimulator
+
+EXAMPLES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', '..', 'asm_examples', '**', '*.asm'), recursive=True))
+
+def run_pipeline(words):
+    cpu = PipelineSimulator()
+    cpu.load_program(words)
+    cpu.flush()
+    assert cpu.run(100000)
+    return list(cpu.registers)
+
+def run_interpreter(words):
+    interpreter = Interpreter()
+    interpreter.load_program(words)
+    assert interpreter.run(100000)
+    return list(interpreter.registers)
+
+@pytest.mark.parametrize('path', EXAMPLES, ids=os.path.basename)
+def test_interpreter_agrees_with_pipeline(path):
+    with open(path, 'r') as src:
+        words = assemble(src.read())
+    assert run_interpreter(words) == run_pipeline(words)
+
+def test_variable_shifts_follow_the_rtl():
+    # Rs shifted by Rt, by the whole register
+    source = ("ADDI r1,r0,1\nADDI r2,r0,4\nADDI r3,r0,40\nADDI r4,r0,-16\n"
+              "SLLV r5,r1,r2\nSRLV r6,r4,r2\nSRAV r7,r4,r2\nSLLV r8,r1,r3\nSRAV r9,r4,r3\nLUI r10,2\nHALT\n")
+    words = assemble(source)
+    words[9] |= 1 << iset.RS_SHIFT # LUI r10 with Rs = r1, which the assembler leaves at 0
+    registers = run_interpreter(words)
+    assert registers[5:11] == [0x10, 0x0fffffff, 0xffffffff, 0, 0xffffffff, 0x20001]
+    assert registers == run_pipeline(words)
@@ -0,0 +1,77 @@
+import pytest
+from conftest import LOOP_SOURCE, assemble
+from interface import ExecMode
+from stop_conditions import Breakpoint, Watchpoint, CycleCount, parse_condition
+
+def start(board, source: str = LOOP_SOURCE):
+    board.load_program(assemble(source))
+    board.run_program(ExecMode.STEP)
+
+def step_until(board, hit) -> int:
+    """
+    Step one command at a time until hit(board) or the end; returns the cycle reached.
+    """
+    while board.step_mode_flg:
+        ended = board.run_next_step()
+        if ended or hit(board):
+            break
+    return board.step_count
+
+@pytest.mark.parametrize('text, cls', [
+    ('pc=0x20', Breakpoint), ('r3=81', Watchpoint), ('m5', Watchpoint), ('cycle=500', CycleCount), ('c12', CycleCount)
+])
+def test_parse_condition(text, cls):
+    assert isinstance(parse_condition(text), cls)
+
+@pytest.mark.parametrize('text', ['', 'pc', 'x3', 'r3=abc'])
+def test_parse_condition_invalid(text):
+    with pytest.raises(ValueError):
+        parse_condition(text)
+
+@pytest.mark.parametrize('condition, hit', [
+    (Breakpoint(0x10), lambda board: board.get_pc() == 0x10),
+    (Watchpoint('reg', 1, 5), lambda board: board.registers.last_value(1) == 5),
+    (Watchpoint('mem', 0), lambda board: board.memory.last_value(0) != 0),
+    (CycleCount(40), lambda board: board.step_count >= 40),
+])
+@pytest.mark.parametrize('window', [1, None])
+def test_stops_where_stepping_does(board, condition, hit, window):
+    start(board)
+    expected = step_until(board, hit)
+    registers = board.get_reg_last_cycle()
+    step_until(board, lambda board: False) # The board takes no other command until the session ends
+    start(board)
+    state = board.run_until(condition) if window is None else board.run_until(condition, window=window)
+    assert state['reason'] is condition
+    assert state['cycle'] == expected
+    assert state['registers'] == registers
+    assert board.get_step(state['cycle'])[2] == state['pc']
+    if window == 1:
+        assert board.step_count == expected # exact stop
+    else:
+        assert board.step_count >= expected # pipelined: the board may be past the stop
+    assert not state['ended'] and board.step_mode_flg
+
+def test_end_and_max_steps(board):
+    start(board, "ADDI r1,r0,1\nADDI r2,r0,2\nHALT\n")
+    assert board.run_until(Breakpoint(0x100), max_steps=2)['reason'] == 'max_steps'
+    state = board.run_until(Breakpoint(0x100))
+    assert state['reason'] == 'end' and state['ended']
+    assert not board.step_mode_flg
+    with pytest.raises(ValueError):
+        board.run_until(Breakpoint(0x100))
+
+def test_window_runs_past_the_stop(board):
+    start(board)
+    state = board.run_until(Breakpoint(0x10), window=4)
+    assert state['pc'] == 0x10
+    # The steps sent ahead were read too: the session goes on from the last one
+    assert board.step_count == len(board.history) - 1 >= state['cycle']
+    assert not board.run_next_step()
+    assert board.get_reg_last_cycle()[0]['cycle'] == (board.step_count + 1) & 0xff
+
+def test_first_condition_that_holds(board):
+    start(board)
+    breakpoint_ = Breakpoint(0x1000) # never reached
+    count = CycleCount(7)
+    assert board.run_until([breakpoint_, count])['reason'] is count
@@ -0,0 +1,67 @@
+import random
+import pytest
+from conftest import LOOP_SOURCE, assemble
+from interface import ExecMode
+from step_history import StepHistory
+from trace_store import TraceStore
+
+def record(history: StepHistory, cycle: int, registers: list, memory: list, pc: int):
+    reg_store, mem_store = TraceStore(), TraceStore()
+    for addr, data in enumerate(registers):
+        reg_store.add(cycle, addr, data)
+    for addr, data in enumerate(memory):
+        mem_store.add(cycle, addr, data)
+    history.record(reg_store, mem_store, pc)
+
+def random_session(steps: int, seed: int = 1):
+    """
+    Registers, memory and PC of every step: a few words change per step.
+    """
+    rng = random.Random(seed)
+    registers, memory = [0] * 32, [0] * 32
+    states = []
+    for step in range(steps):
+        for _ in range(rng.randrange(3)):
+            words = registers if rng.random() < 0.7 else memory
+            words[rng.randrange(1, 32)] = rng.getrandbits(32)
+        states.append((list(registers), list(memory), step * 4))
+    return states
+
+def test_seek_in_any_order():
+    states = random_session(300)
+    history = StepHistory()
+    for step, (registers, memory, pc) in enumerate(states):
+        record(history, (step + 1) & 0xff, registers, memory, pc)
+    order = list(range(len(states))) + list(reversed(range(len(states)))) + random.Random(2).choices(range(len(states)), k=200)
+    for step in order:
+        registers, memory, pc = history.state(step)
+        assert ([reg['data'] for reg in registers], [mem['data'] for mem in memory], pc) == states[step]
+        assert registers[0]['cycle'] == (step + 1) & 0xff
+    assert history.state(-1)[2] == states[-1][2]
+    with pytest.raises(IndexError):
+        history.state(len(states))
+
+def test_changes_and_wrapped_cycles():
+    states = random_session(600)
+    history = StepHistory()
+    for step, (registers, memory, pc) in enumerate(states):
+        record(history, (step + 1) & 0xff, registers, memory, pc)
+    for step in range(1, len(states)):
+        before, after = states[step - 1], states[step]
+        expected = [('reg', addr, old, new) for addr, (old, new) in enumerate(zip(before[0], after[0])) if old != new]
+        expected += [('mem', addr, old, new) for addr, (old, new) in enumerate(zip(before[1], after[1])) if old != new]
+        assert history.changes(step) == expected
+    assert history.steps_at(10) == [9, 265, 521] # the 8 bit counter wrapped twice
+    assert history.size_bytes() < len(states) * 64 # far below a full dump per step
+
+def test_interface_history_matches_the_dumps(board):
+    board.load_program(assemble(LOOP_SOURCE))
+    board.run_program(ExecMode.STEP)
+    dumps = [(board.get_reg_last_cycle(), board.get_mem_last_cycle(), board.get_pc())]
+    for _ in range(50):
+        board.run_next_step()
+        dumps.append((board.get_reg_last_cycle(), board.get_mem_last_cycle(), board.get_pc()))
+    for step in reversed(range(len(dumps))):
+        assert board.get_step(step) == dumps[step]
+    cycle = dumps[20][0][0]['cycle']
+    assert board.get_reg_by_cycle(cycle) == dumps[20][0]
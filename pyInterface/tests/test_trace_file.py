@@ -0,0 +1,72 @@
+import pytest
+from conftest import LOOP_SOURCE, assemble
+from board_emulator import pack_frame
+from frame_reader import decode_frames
+from interface import Command, ExecMode, Result, Response
+from trace_file import TraceWriter, TraceReader, ReplayInterface, ReplayDivergedException, main
+
+def test_replay_matches_the_session(board, tmp_path):
+    path = str(tmp_path / 'session.trace')
+    board.record(TraceWriter(path))
+    board.load_program(assemble(LOOP_SOURCE))
+    board.run_program(ExecMode.STEP)
+    for _ in range(3):
+        board.run_next_step()
+    board.stop_recording()
+
+    with TraceReader(path) as trace:
+        replay = ReplayInterface(trace)
+        replay.load_program(assemble(LOOP_SOURCE))
+        replay.run_program(ExecMode.STEP)
+        for _ in range(3):
+            replay.run_next_step()
+        assert replay.get_reg_last_cycle() == board.get_reg_last_cycle()
+        assert replay.get_pc() == board.get_pc()
+
+def test_replay_diverged(tmp_path):
+    path = str(tmp_path / 'diverged.trace')
+    writer = TraceWriter(path)
+    writer.command(Command.LOAD.value)
+    writer.command(Command.EXEC.value) # LOAD was never answered
+    writer.close()
+    with TraceReader(path) as trace:
+        with pytest.raises(ReplayDivergedException):
+            ReplayInterface(trace).load_program(assemble(LOOP_SOURCE))
+
+def test_main_dump_without_pc(tmp_path, capsys):
+    path = str(tmp_path / 'truncated.trace')
+    writer = TraceWriter(path)
+    writer.command(Command.EXEC.value)
+    frames = pack_frame(Result.REG.value, 7, 0, 1) + pack_frame(Result.INFO.value, 7, 0, Response.END.value)
+    writer.frames(decode_frames(frames)[0])
+    writer.close()
+    assert main([path, '-c', '7']) == 0
+    assert "PC: -" in capsys.readouterr().out
+
+def board_dump(cycle: int, info: int) -> bytes:
+    """
+    Frames of a dump as the debug unit sends them: the INFO frame carries cycle 0.
+    """
+    pc = pack_frame(Result.PC.value, cycle, 0, cycle * 4)
+    return (b''.join(pack_frame(Result.REG.value, cycle, addr, cycle) for addr in range(32)) + pc +
+            b''.join(pack_frame(Result.MEM.value, cycle, addr, 0) for addr in range(32)) + pc +
+            pack_frame(Result.INFO.value, 0, 0, info))
+
+def test_cycles_of_a_hardware_recording(tmp_path, capsys):
+    path = str(tmp_path / 'board.trace')
+    writer = TraceWriter(path)
+    writer.command(Command.EXEC_BY_STEPS.value)
+    writer.frames(decode_frames(board_dump(1, Response.STEP_END.value))[0])
+    for cycle in range(2, 5):
+        writer.command(Command.NEXT_STEP.value)
+        frames = board_dump(cycle, Response.END.value if cycle == 4 else Response.STEP_END.value)
+        # A dump split across two reads
+        writer.frames(decode_frames(frames[:280])[0])
+        writer.frames(decode_frames(frames[280:])[0])
+    writer.close()
+    with TraceReader(path) as trace:
+        assert [trace.find_cycle(cycle) for cycle in range(1, 5)] == [0, 1, 2, 3]
+        assert trace.find_cycle(0) is None
+        assert trace.state(trace.find_cycle(3))[2] == 12
+    assert main([path, '-c', '3']) == 0
+    assert "PC: 0x0000000c" in capsys.readouterr().out
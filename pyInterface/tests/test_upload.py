@@ -0,0 +1,21 @@
+from array import array
+import pytest
+from interface import upload_payload, LoadProgramException
+
+WORDS = [0x20010005, 0xfc000000]
+PAYLOAD = bytes.fromhex('05000120000000fc')
+
+@pytest.mark.parametrize('program', [
+    WORDS,
+    array('I', WORDS),
+    bytes.fromhex('20010005fc000000'),
+    bytearray.fromhex('20010005fc000000'),
+    memoryview(bytes.fromhex('20010005fc000000')),
+    ['20', '01', '00', '05', 'fc', '00', '00', '00'],
+])
+def test_upload_payload(program):
+    assert upload_payload(program) == PAYLOAD
+
+def test_upload_payload_partial_word():
+    with pytest.raises(LoadProgramException):
+        upload_payload(memoryview(b'\x00\x01\x02'))
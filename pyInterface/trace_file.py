@@ -0,0 +1,281 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from enum import Enum
+from interface import Interface, Command, Result, LoadProgramException, ResponseTimeoutException
+from frame_reader import FrameBatch, FRAME_SIZE_BYTES, DATA_SIZE_BYTES, TYPE_OFFSET, CYCLE_OFFSET, decode_frames, encode_frames
+
+# Trace file: HEADER, then records appended as the session goes, each one RECORD followed by its payload
+#   IMAGE   : the program payload sent after LOAD (little endian words)
+#   COMMAND : the command byte sent to the board
+#   FRAMES  : response frames, as received (7 bytes each)
+MAGIC = b'MIPS32TR'
+VERSION = 1
+HEADER = struct.Struct('<8sHxx')
+RECORD = struct.Struct('<BxxxIq') # kind, payload size, time.time_ns() of the record
+
+class RecordKind(Enum):
+    IMAGE = 1
+    COMMAND = 2
+    FRAMES = 3
+
+class TraceFormatException(Exception):
+    pass
+
+class ReplayDivergedException(Exception):
+    pass
+
+class TraceWriter():
+    def __init__(self, path: str):
+        """
+        Append-only trace of a session: every record is written and flushed as it happens, so a trace
+        is readable up to the last record even if the program stops. An existing trace is appended to.
+        """
+        self.path = path
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+            self.file.flush()
+
+    def _record(self, kind: RecordKind, payload: bytes):
+        self.file.write(RECORD.pack(kind.value, len(payload), time.time_ns()) + payload)
+        self.file.flush()
+
+    def image(self, payload: bytes):
+        self._record(RecordKind.IMAGE, bytes(payload))
+
+    def command(self, cmd: int):
+        self._record(RecordKind.COMMAND, bytes((cmd,)))
+
+    def frames(self, batch: FrameBatch):
+        if len(batch.type):
+            self._record(RecordKind.FRAMES, encode_frames(batch))
+
+    def close(self):
+        self.file.close()
+
+class TraceReader():
+    def __init__(self, path: str):
+        """
+        Memory mapped reader of a trace file. Opening it reads the record headers and the type and cycle
+        bytes of the frames to index every dump (the frames answering one command, up to its INFO or
+        ERROR frame); frames are decoded only when a dump is requested.
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < HEADER.size:
+            raise TraceFormatException(f"{path} is not a trace file")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise TraceFormatException(f"{path} is not a version {VERSION} trace file")
+        self.records = [] # (kind, payload offset, payload size, timestamp ns)
+        self.dumps = []   # {'command', 'cycle', 'chunks': [(offset, frames)], 'end': (type, data), 'time', 'session'}
+        self.sessions = []  # [first dump, last dump + 1] of every EXEC / EXEC_BY_STEPS
+        self.cycles = []    # per session: cycle -> first dump reported at it
+        self.images = []  # record numbers of the images
+        self._index()
+
+    def _index(self):
+        offset = HEADER.size
+        size = len(self.mm)
+        command = None
+        chunks = []
+        cycle = None # cycle of the dump being indexed, from its first REG, MEM or PC frame
+        while offset + RECORD.size <= size:
+            kind, length, stamp = RECORD.unpack_from(self.mm, offset)
+            payload = offset + RECORD.size
+            if payload + length > size:
+                break # Record cut short by an interrupted session
+            self.records.append((kind, payload, length, stamp))
+            if kind == RecordKind.IMAGE.value:
+                self.images.append(len(self.records) - 1)
+            elif kind == RecordKind.COMMAND.value:
+                command = self.mm[payload]
+                chunks = []
+                cycle = None
+                if command in (Command.EXEC.value, Command.EXEC_BY_STEPS.value):
+                    self.sessions.append([len(self.dumps), len(self.dumps)])
+                    self.cycles.append({})
+            elif kind == RecordKind.FRAMES.value:
+                types = self.mm[payload + TYPE_OFFSET:payload + length:FRAME_SIZE_BYTES]
+                start = 0
+                for index, res_type in enumerate(types):
+                    if res_type != Result.INFO.value and res_type != Result.ERROR.value:
+                        if cycle is None:
+                            cycle = self.mm[payload + index * FRAME_SIZE_BYTES + CYCLE_OFFSET]
+                        continue
+                    chunks.append((payload + start * FRAME_SIZE_BYTES, index + 1 - start))
+                    frame = payload + index * FRAME_SIZE_BYTES
+                    data = int.from_bytes(self.mm[frame:frame + DATA_SIZE_BYTES], 'little')
+                    # The board sends INFO and ERROR frames with cycle 0: a dump is at the cycle of its frames
+                    if cycle is None:
+                        cycle = self.mm[frame + CYCLE_OFFSET]
+                    self.dumps.append({'command': command, 'cycle': cycle, 'chunks': chunks, 'end': (res_type, data),
+                                       'time': stamp, 'session': len(self.sessions) - 1})
+                    if self.sessions and command != Command.LOAD.value:
+                        self.sessions[-1][1] = len(self.dumps)
+                        self.cycles[-1].setdefault(cycle, len(self.dumps) - 1)
+                    chunks = []
+                    cycle = None
+                    start = index + 1
+                if start < len(types):
+                    chunks.append((payload + start * FRAME_SIZE_BYTES, len(types) - start))
+            offset = payload + length
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def payload(self, record: int) -> bytes:
+        _, offset, length, _ = self.records[record]
+        return self.mm[offset:offset + length]
+
+    def image(self, number: int = -1) -> bytes:
+        """
+        Payload of a recorded program image (the last one by default).
+        """
+        return self.payload(self.images[number])
+
+    def frames(self, dump: int) -> FrameBatch:
+        """
+        Decode the frames of one dump.
+        """
+        data = b''.join(self.mm[offset:offset + count * FRAME_SIZE_BYTES] for offset, count in self.dumps[dump]['chunks'])
+        return decode_frames(data)[0]
+
+    def state(self, dump: int) -> (list, list, int):
+        """
+        Registers, memory (lists of {'cycle', 'addr', 'data'}) and PC reported by one dump.
+        """
+        registers = []
+        memory = []
+        pc = None
+        for res_type, cycle, addr, data in zip(*self.frames(dump)):
+            if res_type == Result.REG.value:
+                registers.append({'cycle': cycle, 'addr': addr, 'data': data})
+            elif res_type == Result.MEM.value:
+                memory.append({'cycle': cycle, 'addr': addr, 'data': data})
+            elif res_type == Result.PC.value:
+                pc = data
+        return registers, memory, pc
+
+    def find_cycle(self, cycle: int, session: int = -1) -> int:
+        """
+        Number of the dump of a session (the last one by default) reported at cycle, or None.
+        In step mode the 8 bit cycle counter may wrap; the first match is returned.
+        """
+        return self.cycles[session].get(cycle)
+
+class ReplayInterface(Interface):
+    def __init__(self, trace: TraceReader):
+        """
+        Interface that plays a recorded trace back instead of talking to a board, so the CLI and GUI
+        table views can inspect a session offline. Each command sent replays the response recorded after
+        the next occurrence of the same command in the trace.
+        """
+        super().__init__(uart=None, timeout=None)
+        self.trace = trace
+        self._record = 0 # next record to replay
+
+    def start_reader(self):
+        pass
+
+    def load_program(self, program):
+        """
+        Replay the answer of the next recorded LOAD. The program itself is not sent anywhere.
+        """
+        self._send_cmd(Command.LOAD.value)
+        response_type, _, _, data = self.next_info()
+        if response_type == Result.ERROR.value:
+            raise LoadProgramException(f"Error loading program: {hex(data)}")
+        print("Program load replayed.")
+
+    def _send_cmd(self, cmd: int, count: int = 1) -> float:
+        for _ in range(count):
+            self._replay_cmd(cmd)
+        return time.monotonic()
+
+    def _replay_cmd(self, cmd: int):
+        records = self.trace.records
+        for record in range(self._record, len(records)):
+            kind, offset, _, _ = records[record]
+            if kind == RecordKind.FRAMES.value:
+                self._pending = None # Responses skipped over: what is left of them is dropped too
+            elif kind == RecordKind.COMMAND.value and self.trace.mm[offset] == cmd:
+                self._record = record + 1
+                return
+        raise ValueError(f"No more {Command(cmd).name} commands in the trace.")
+
+    def _read_batch(self, locked=False) -> FrameBatch:
+        if self._pending is not None:
+            batch, self._pending = self._pending, None
+            return batch
+        kind = None
+        if self._record < len(self.trace.records):
+            kind, offset, length, _ = self.trace.records[self._record]
+            if kind == RecordKind.FRAMES.value:
+                self._record += 1
+                return decode_frames(self.trace.mm[offset:offset + length])[0]
+        if not locked:
+            return None
+        if kind is None:
+            raise ResponseTimeoutException("End of the recorded response.")
+        # The recording went on to another command while this one still waits for its response
+        sent = Command(self.trace.mm[offset]).name if kind == RecordKind.COMMAND.value else "a program image"
+        raise ReplayDivergedException(f"Replay diverged from the recording: {sent} was recorded next, "
+                                      f"not the rest of the response")
+
+def print_summary(trace: TraceReader):
+    """
+    Print the images, sessions and dumps of a trace.
+    """
+    print(f"{trace.path}: {len(trace.records)} records, {len(trace.images)} images, "
+          f"{len(trace.sessions)} sessions, {len(trace.dumps)} dumps")
+    start = trace.records[0][3] if trace.records else 0
+    for number, (first, last) in enumerate(trace.sessions):
+        if first == last:
+            continue
+        command = Command(trace.dumps[first]['command']).name
+        seconds = (trace.dumps[last - 1]['time'] - start) / 1e9
+        print(f"Session {number}: {command}, {last - first} dumps, cycles {trace.dumps[first]['cycle']}.."
+              f"{trace.dumps[last - 1]['cycle']}, ends at {seconds:.3f} s")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect a MIPS32 trace file.")
+    parser.add_argument('trace', help="trace file written by Interface.record")
+    parser.add_argument('-c', '--cycle', type=int, help="print the registers, memory and PC at this cycle")
+    parser.add_argument('-s', '--session', type=int, default=-1, help="session of --cycle (default: the last one)")
+    args = parser.parse_args(argv)
+
+    with TraceReader(args.trace) as trace:
+        if args.cycle is None:
+            print_summary(trace)
+            return 0
+        if not trace.sessions:
+            print("No sessions in the trace.")
+            return 1
+        dump = trace.find_cycle(args.cycle, args.session)
+        if dump is None:
+            print(f"Cycle {args.cycle} not found.")
+            return 1
+        registers, memory, pc = trace.state(dump)
+        print(f"PC: {pc:#010x}" if pc is not None else "PC: -") # No PC frame in a truncated dump
+        for reg in registers:
+            print(f"R{reg['addr']:<3} {reg['data']:#010x}")
+        for mem in memory:
+            print(f"M{mem['addr']:<3} {mem['data']:#010x}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
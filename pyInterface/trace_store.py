@@ -0,0 +1,112 @@
+from array import array
+
+class TraceStore():
+    def __init__(self):
+        """
+        Columnar store of the register or memory entries reported by the board: cycle, addr and data
+        columns in typed arrays plus an index from cycle to the row ranges holding it, so the entries of
+        a cycle and of the last cycle are found without scanning the history.
+        Behaves as a read only list of {'cycle', 'addr', 'data'} dicts (len, indexing, iteration).
+        """
+        self.cycle = array('B')
+        self.addr = array('B')
+        self.data = array('I')
+        self.index = {}     # cycle -> [[start, stop], ...] row ranges, several if the 8 bit counter wrapped
+        self._open = None   # [start, stop] range the next row of the same cycle extends
+        self._open_cycle = None
+
+    def add(self, cycle: int, addr: int, data: int):
+        """
+        Append one entry in O(1).
+        """
+        row = len(self.cycle)
+        self.cycle.append(cycle)
+        self.addr.append(addr)
+        self.data.append(data)
+        if self._open is not None and self._open_cycle == cycle:
+            self._open[1] = row + 1
+        else:
+            self._open = [row, row + 1]
+            self._open_cycle = cycle
+            self.index.setdefault(cycle, []).append(self._open)
+
+    def append(self, entry: dict):
+        """
+        Append a {'cycle', 'addr', 'data'} dict, as on the list the store replaces.
+        """
+        self.add(entry['cycle'], entry['addr'], entry['data'])
+
+    def clear(self):
+        del self.cycle[:], self.addr[:], self.data[:]
+        self.index.clear()
+        self._open = None
+
+    def __len__(self) -> int:
+        return len(self.cycle)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self._entry(i) for i in range(*row.indices(len(self.cycle)))]
+        if row < 0:
+            row += len(self.cycle)
+        if not 0 <= row < len(self.cycle):
+            raise IndexError("trace row out of range")
+        return self._entry(row)
+
+    def __iter__(self):
+        for cycle, addr, data in zip(self.cycle, self.addr, self.data):
+            yield {'cycle': cycle, 'addr': addr, 'data': data}
+
+    def _entry(self, row: int) -> dict:
+        return {'cycle': self.cycle[row], 'addr': self.addr[row], 'data': self.data[row]}
+
+    def rows(self, start: int, stop: int) -> list:
+        return [{'cycle': cycle, 'addr': addr, 'data': data}
+                for cycle, addr, data in zip(self.cycle[start:stop], self.addr[start:stop], self.data[start:stop])]
+
+    def by_cycle(self, cycle: int) -> list:
+        """
+        Entries reported at cycle, in order (one index lookup, no scan of the history).
+        """
+        entries = []
+        for start, stop in self.index.get(cycle, ()):
+            entries += self.rows(start, stop)
+        return entries
+
+    def last_cycle(self) -> list:
+        """
+        Entries of the last cycle reported (its last row range, so earlier cycles with the same 8 bit
+        counter value are left out), or None if the store is empty.
+        """
+        if self._open is None:
+            return None
+        return self.rows(*self._open)
+
+    def last_data(self) -> array:
+        """
+        Data of the last cycle reported, indexed by address (empty if the store is empty).
+        """
+        if self._open is None:
+            return array('I')
+        start, stop = self._open
+        if self.addr[start:stop] == array('B', range(stop - start)):
+            return self.data[start:stop] # In address order, as the board sends it
+        data = array('I', bytes(4 * (max(self.addr[start:stop]) + 1)))
+        for addr, value in zip(self.addr[start:stop], self.data[start:stop]):
+            data[addr] = value
+        return data
+
+    def last_value(self, addr: int):
+        """
+        Data of addr in the last cycle reported, or None. Dumps come in address order, so this is
+        usually a single lookup.
+        """
+        if self._open is None:
+            return None
+        start, stop = self._open
+        if start + addr < stop and self.addr[start + addr] == addr:
+            return self.data[start + addr]
+        for row in range(start, stop):
+            if self.addr[row] == addr:
+                return self.data[row]
+        return None
@@ -1,14 +1,68 @@
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from mipsAssambler import mipsAssambler
+from asm_cache import AssemblyCache
 from serial_com import Uart, get_serial_port
-from interface import Interface, ExecMode
+from interface import Interface, ExecMode, OperationCancelled
+from trace_file import TraceReader, TraceWriter, ReplayInterface
+from stop_conditions import parse_condition
+
+WORKER_POLL_MS = 20   # how often the Tk thread collects the results of the worker
+PROGRESS_MS = 200     # refresh of the elapsed time while the worker is busy
+
+class Worker():
+    def __init__(self, root, poll_ms: int = WORKER_POLL_MS):
+        """
+        Runs the board and assembler operations of the GUI one at a time on a background thread, so the Tk
+        main loop never blocks on the serial port. Results are queued back and handed to their callbacks
+        on the Tk thread by a root.after poll; Tk is never touched from the worker thread.
+        """
+        self.root = root
+        self.poll_ms = poll_ms
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0 # jobs submitted whose callback has not run yet
+        self.thread = threading.Thread(target=self._run, name='gui-worker', daemon=True)
+        self.thread.start()
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, job, on_done, on_error):
+        """
+        Run job() on the worker thread, then on_done(result) or on_error(exception) on the Tk thread.
+        """
+        self.pending += 1
+        self.jobs.put((job, on_done, on_error))
+
+    def busy(self) -> bool:
+        return self.pending > 0
+
+    def _run(self):
+        while True:
+            job, on_done, on_error = self.jobs.get()
+            try:
+                result = job()
+            except Exception as e:
+                self.results.put((on_error, e))
+            else:
+                self.results.put((on_done, result))
+
+    def _poll(self):
+        while True:
+            try:
+                callback, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            callback(value)
+        self.root.after(self.poll_ms, self._poll)
 
 class MIPS32UI:
-    def __init__(self, root):
+    def __init__(self, root, replay: str = None, record: str = None):
         self.root = root
         self.root.title("MIPS32 Simulator")
-        self.root.geometry("400x300")
+        self.root.geometry("400x400")
         self.root.configure(bg="#f0f0f0")
         
         self.style = ttk.Style()
@@ -16,10 +70,22 @@ class MIPS32UI:
         self.style.configure("TButton", padding=10, relief="flat", background="#4CAF50", foreground="white")
         self.style.map("TButton", background=[("active", "#45a049")])
         
-        self.uart = self.uart_init()
-        self.interface = self.Interface_init(self.uart)
+        if replay: # Play a recorded trace back instead of using a board
+            self.uart = None
+            self.interface = ReplayInterface(TraceReader(replay))
+        else:
+            self.uart = self.uart_init()
+            self.interface = self.Interface_init(self.uart)
+            if record:
+                self.interface.record(TraceWriter(record))
+        self.asm_cache = AssemblyCache()
+        self.worker = Worker(self.root)
+        self.task = None       # text of the operation the worker is busy with
+        self.task_start = 0.0
         self.create_widgets()
         self.table_window = None
+        self.table_by_cycle = None
+        self.finish_label = None
         self.prev_registers = None
         self.prev_memory = None
         self.min_font_size = 10
@@ -47,62 +113,175 @@ class MIPS32UI:
         self.exit_button = ttk.Button(button_frame, text="Exit", command=self.root.quit)
         self.exit_button.pack(fill=tk.X, pady=5)
 
+        # Progress of the operation running on the worker
+        progress_frame = ttk.Frame(main_frame)
+        progress_frame.pack(fill=tk.X, pady=(10, 0))
+        self.progress = ttk.Progressbar(progress_frame, mode="indeterminate")
+        self.progress.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", command=self.cancel, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=(10, 0))
+        self.progress_label = ttk.Label(main_frame, text="Ready")
+        self.progress_label.pack(fill=tk.X, pady=(5, 0))
+
+    def start_task(self, text: str, job, on_done):
+        """
+        Run job on the worker with the progress bar going and the board buttons disabled; on_done gets its
+        result on the Tk thread.
+        """
+        if self.task is not None:
+            return # One operation at a time on the interface
+        self.task = text
+        self.task_start = time.monotonic()
+        self.worker.submit(job, lambda result: self.finish_task(on_done, result), self.task_failed)
+        self.set_busy(True)
+        self.progress.start(10)
+        self.update_progress()
+
+    def finish_task(self, on_done, result):
+        self.end_task(f"{self.task} done in {time.monotonic() - self.task_start:.2f} s")
+        on_done(result)
+
+    def task_failed(self, error: Exception):
+        if isinstance(error, OperationCancelled):
+            self.end_task(f"{self.task} cancelled. The board may still be running: reset it if it does not answer.")
+        else:
+            self.end_task(f"{self.task} failed")
+            messagebox.showerror("Error", str(error))
+
+    def end_task(self, text: str):
+        self.task = None
+        self.progress.stop()
+        self.progress_label.config(text=text)
+        self.set_busy(False)
+
+    def update_progress(self):
+        if self.task is not None:
+            self.progress_label.config(text=f"{self.task}... {time.monotonic() - self.task_start:.1f} s")
+            self.root.after(PROGRESS_MS, self.update_progress)
+
+    def cancel(self):
+        if self.task is not None:
+            self.interface.cancel()
+            self.progress_label.config(text=f"Cancelling {self.task.lower()}...")
+
+    def set_busy(self, busy: bool):
+        state = tk.DISABLED if busy else tk.NORMAL
+        for button in (self.compile_button, self.run_button, self.step_button):
+            button.config(state=state)
+        self.cancel_button.config(state=tk.NORMAL if busy else tk.DISABLED)
+        self.update_step_buttons()
+
     def compile_and_load(self):
         input_file = filedialog.askopenfilename(title="Select Assembly File")
         if input_file:
-            assembler = mipsAssambler()
-            file_content = self.input_file(input_file)
-            try:
-                if assembler.validate_asm_syntax(file_content):
-                    messagebox.showinfo("Info", "Syntax OK!")
-                    assembler.assamble(file_content)
-                    code = self.prepare_code(assembler.get_compiled_code())
-                    self.interface.load_program(code)
-                    messagebox.showinfo("Info", "Program loaded successfully.")
-                else:
-                    messagebox.showerror("Error", "Syntax validation failed.")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+            def assemble():
+                return self.asm_cache.assemble(self.input_file(input_file))
+            self.start_task("Assembling", assemble, self.load_assembled)
+
+    def load_assembled(self, assembled):
+        words, _ = assembled # the listing is for the CLI, the GUI has no console to show it
+        messagebox.showinfo("Info", "Syntax OK!")
+        self.end_step_session()
+        self.start_task("Loading program", lambda: self.interface.load_program(words),
+                        lambda _: messagebox.showinfo("Info", "Program loaded successfully."))
 
     def run_program(self):
-        self.interface.run_program(ExecMode.RUN)
+        self.end_step_session()
+        self.start_task("Running program", lambda: self.interface.run_program(ExecMode.RUN), self.show_run)
+
+    def show_run(self, _):
         reg = self.interface.registers
         mem = self.interface.memory
         pc = self.interface.get_pc()
         self.print_table(reg, mem, pc, False)
 
     def step_program(self):
+        if hasattr(self, 'program_state'):
+            self.show_step()
+            return
+        self.start_task("Starting step mode", lambda: self.interface.run_program(ExecMode.STEP), self.step_started)
+
+    def step_started(self, program_state: bool):
+        self.program_state = program_state
+        self.prev_registers = None
+        self.prev_memory = None
+        self.view_step = 0
+        self.show_step()
+
+    def execute_next_step(self):
+        if self.view_step < len(self.interface.history) - 1:
+            self.view_step += 1 # Already run, taken from the history
+            self.show_step()
+        elif not self.program_state:
+            self.start_task("Running next step", self.interface.run_next_step, self.step_done)
+
+    def step_done(self, program_state: bool):
+        self.program_state = program_state
+        self.view_step = len(self.interface.history) - 1
+        self.show_step()
+
+    def step_back(self):
+        if self.view_step > 0:
+            self.view_step -= 1
+            self.show_step()
+
+    def show_step(self):
+        reg, mem, pc = self.interface.get_step(self.view_step)
+        self.print_table(reg, mem, pc, True)
+        self.status_label.config(text=f"Step {self.view_step} of {len(self.interface.history) - 1}")
+        self.update_step_buttons()
+        if self.program_state and self.view_step == len(self.interface.history) - 1:
+            self.show_program_finished()
+
+    def update_step_buttons(self):
+        """
+        Enable the step controls that can be used now: nothing while the worker is busy, no Next Step at the
+        end of a finished program, no Step Back at the first step.
+        """
+        if not self.table_by_cycle or self.table_window is None or not self.table_window.winfo_exists():
+            return
+        busy = self.task is not None or self.worker.busy()
+        last = len(self.interface.history) - 1
+        at_end = self.program_state and self.view_step >= last
+        self.next_step_button.config(state=tk.DISABLED if busy or at_end else tk.NORMAL)
+        self.back_button.config(state=tk.NORMAL if not busy and self.view_step > 0 else tk.DISABLED)
+        self.until_button.config(state=tk.DISABLED if busy or self.program_state else tk.NORMAL)
+
+    def run_until(self):
         try:
-            if not hasattr(self, 'program_state'):
-                self.program_state = self.interface.run_program(ExecMode.STEP)
-                self.prev_registers = None
-                self.prev_memory = None
-            self.execute_next_step()
+            condition = parse_condition(self.until_entry.get())
         except ValueError as e:
             messagebox.showerror("Error", str(e))
+            return
+        self.start_task(f"Running until {condition}", lambda: self.interface.run_until(condition), self.until_done)
 
-    def execute_next_step(self):
-        if not self.program_state:
-            reg = self.interface.get_reg_last_cycle()
-            mem = self.interface.get_mem_last_cycle()
-            pc = self.interface.get_pc()
-            self.print_table(reg, mem, pc, True)
-            self.program_state = self.interface.run_next_step()
-        else:
-            reg = self.interface.get_reg_last_cycle()
-            mem = self.interface.get_mem_last_cycle()
-            pc = self.interface.get_pc()
-            self.print_table(reg, mem, pc, True)
-            self.show_program_finished()
+    def until_done(self, result: dict):
+        self.program_state = result['ended']
+        self.view_step = result['cycle'] # The steps the board ran past the stop come next
+        self.show_step()
+        self.status_label.config(text=f"Stopped by {result['reason']} at cycle {result['cycle']} after {result['steps']} steps")
 
     def show_program_finished(self):
+        if self.finish_label is not None and self.finish_label.winfo_exists():
+            return # Already shown
         if self.table_window:
             self.finish_label = ttk.Label(self.table_window, text="Program finished!", foreground="green", font=("Helvetica", 14, "bold"))
             self.finish_label.pack(pady=10)
             self.next_step_button.config(state=tk.DISABLED)
+            self.until_button.config(state=tk.DISABLED)
             self.restart_button = ttk.Button(self.table_window, text="Restart Step-by-Step", command=self.restart_step_program)
             self.restart_button.pack(pady=5)
 
+    def end_step_session(self):
+        """
+        Forget the step session: the board is about to leave it (RUN or LOAD).
+        """
+        if hasattr(self, 'program_state'):
+            del self.program_state
+        if self.table_by_cycle and self.table_window is not None and self.table_window.winfo_exists():
+            self.table_window.destroy()
+            self.table_window = None
+
     def restart_step_program(self):
         if hasattr(self, 'program_state'):
             del self.program_state
@@ -130,17 +309,14 @@ class MIPS32UI:
 
     def Interface_init(self, uart: Uart) -> Interface:
         interface = Interface(uart)
+        interface.start_reader()
         return interface
 
-    def prepare_code(self, codes: str) -> list:
-        byte_list = []
-        for code in codes:
-            hex_byte = code[2:].zfill(8)
-            byte_list.extend([hex_byte[i:i+2] for i in range(0, len(hex_byte), 2)])
-        return byte_list
-
     def print_table(self, register: list, memory: list, pc: int, by_cycle: bool):
+        if self.table_window is not None and self.table_window.winfo_exists() and self.table_by_cycle != by_cycle:
+            self.table_window.destroy() # Run and step views have different controls
         if self.table_window is None or not self.table_window.winfo_exists():
+            self.table_by_cycle = by_cycle
             self.table_window = tk.Toplevel(self.root)
             self.table_window.title("Registers and Memory")
             self.table_window.geometry("800x600")
@@ -163,8 +339,18 @@ class MIPS32UI:
             self.pc_label.grid(row=1, column=0, columnspan=2, pady=(10, 0))
 
             if by_cycle:
+                self.back_button = ttk.Button(main_frame, text="Step Back", command=self.step_back)
+                self.back_button.grid(row=2, column=0, sticky="e", padx=(0, 10), pady=(10, 0))
                 self.next_step_button = ttk.Button(main_frame, text="Next Step", command=self.execute_next_step)
-                self.next_step_button.grid(row=2, column=0, columnspan=2, pady=(10, 0))
+                self.next_step_button.grid(row=2, column=1, sticky="w", padx=(10, 0), pady=(10, 0))
+
+                # Breakpoint (pc=0x20), watchpoint (r3=81, m5) or cycle (cycle=500) to run to
+                self.until_entry = ttk.Entry(main_frame)
+                self.until_entry.grid(row=3, column=0, sticky="ew", pady=(10, 0))
+                self.until_button = ttk.Button(main_frame, text="Run Until", command=self.run_until)
+                self.until_button.grid(row=3, column=1, sticky="w", padx=(10, 0), pady=(10, 0))
+                self.status_label = ttk.Label(main_frame, text="")
+                self.status_label.grid(row=4, column=0, columnspan=2, pady=(5, 0))
 
             self.reg_text.tag_configure('red', foreground='red')
             self.mem_text.tag_configure('blue', foreground='blue')